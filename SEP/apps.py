@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class SEPConfig(AppConfig):
+    name = 'SEP'
+
+    def ready(self):
+        # Connect the signal receivers invalidating the cached dashboards
+        import SEP.dashboards  # noqa: F401
@@ -0,0 +1,13 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+
+
+class EmployeeBackend(ModelBackend):
+    """Loads the employee of each request with their role, in a single query."""
+
+    def get_user(self, user_id):
+        try:
+            user = get_user_model()._default_manager.select_related("role").get(pk=user_id)
+        except get_user_model().DoesNotExist:
+            return None
+        return user if self.user_can_authenticate(user) else None
@@ -0,0 +1,41 @@
+"""Small timing helpers shared by the benchmark commands."""
+
+import statistics
+import time
+
+
+class Rollback(Exception):
+    """Raised to roll back the seeded rows once a benchmark is over."""
+
+
+def measure(function, repeat: int = 5) -> list[float]:
+    """Runs `function` `repeat` times, returns the durations in milliseconds."""
+
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        durations.append((time.perf_counter() - start) * 1000)
+    return durations
+
+
+def percentile(samples: list[float], p: float) -> float:
+    """Returns the p-th percentile (0-100) of the samples, interpolating between ranks."""
+
+    if not samples:
+        return 0.0
+    if len(samples) == 1:
+        return samples[0]
+    return statistics.quantiles(samples, n=100, method="inclusive")[min(max(round(p), 1), 99) - 1]
+
+
+def summarize(samples: list[float]) -> dict:
+    """Summary statistics of a list of durations."""
+
+    return {
+        "count": len(samples),
+        "p50": percentile(samples, 50),
+        "p95": percentile(samples, 95),
+        "p99": percentile(samples, 99),
+        "max": max(samples, default=0.0),
+    }
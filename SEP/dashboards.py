@@ -0,0 +1,249 @@
+"""Querysets backing the employee dashboards, one builder per role.
+
+Each builder joins the relations its template displays and only loads the
+columns that are shown, so a dashboard costs the same number of queries
+whatever the number of rows.
+
+The queues of the managers are the same for every employee of the role, so
+they are rendered once into a cached fragment, invalidated whenever one of
+the displayed models changes.
+"""
+
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import Q, QuerySet
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from project import counters, finance
+from project.models import FinancialRequest, RawRequest, Project, Task, RecruitementPost
+from project.signals import status_changed
+from SEP.models import Customer
+
+HISTORY_SIZE = 25
+
+# Columns displayed by the project tables of the dashboards
+PROJECT_ROW_FIELDS = ("title", "status", "client__name")
+
+
+def project_rows(queryset: QuerySet) -> QuerySet:
+    """Restricts a project queryset to the columns of a dashboard table."""
+
+    return queryset.select_related("client").only(*PROJECT_ROW_FIELDS)
+
+
+def cse_dashboard(user) -> dict:
+    """Requests to process and history of the projects filled by the CS employee."""
+
+    return {
+        "raw_requests": RawRequest.objects.filter(Q(project=None) | Q(project__status="draft"))
+            .select_related("project")
+            .only("name", "title", "project__id"),
+        "project_history": project_rows(
+            Project.objects.filter(created_by=user).exclude(status="draft").order_by("-created_at")
+        )[:HISTORY_SIZE],
+    }
+
+
+def csm_dashboard(user) -> dict:
+    """Projects waiting for the approval of the CS manager."""
+
+    return {
+        "waiting_approval": project_rows(Project.objects.filter(status="pending")),
+        "project_history": project_rows(
+            Project.objects.exclude(status="draft").exclude(status="pending").order_by("-created_at")
+        )[:HISTORY_SIZE],
+    }
+
+
+def fim_dashboard(user) -> dict:
+    """Projects waiting for financial feedback, pending financial requests and the totals by department.
+
+        The projects reviewed are listed with the totals of their requests, in the same query.
+    """
+
+    return {
+        "waiting_feedback": project_rows(Project.objects.filter(status="cs_approved")),
+        "project_history": finance.projects_with_totals(project_rows(
+            Project.objects.filter(status__in=("admin_approved", "admin_rejected", "fin_review")).order_by("-created_at")
+        ).only(*PROJECT_ROW_FIELDS, "estimated_budget"))[:HISTORY_SIZE],
+        "financial_requests": FinancialRequest.objects.filter(status="pending")
+            .select_related("project")
+            .only("requesting_department", "amount", "reason", "project__title", "project__estimated_budget")
+            .annotate(granted=finance.granted_to_project()),
+        "department_totals": finance.department_totals(),
+    }
+
+
+def adm_dashboard(user) -> dict:
+    """Projects reviewed by the financial manager, waiting for the administration."""
+
+    return {
+        "waiting_approval": project_rows(Project.objects.filter(status="fin_review")),
+        "project_history": project_rows(
+            Project.objects.filter(status__in=("admin_approved", "admin_rejected")).order_by("-created_at")
+        )[:HISTORY_SIZE],
+    }
+
+
+def psdm_dashboard(user) -> dict:
+    """Active projects for the production & service managers, with their task counters."""
+
+    return {
+        "projects": project_rows(Project.objects.filter(status="admin_approved").order_by("-created_at"))
+            .select_related("task_counts")
+            .only(*PROJECT_ROW_FIELDS, "task_counts__open", "task_counts__completed")
+            .annotate(overdue_count=counters.overdue_count())[:HISTORY_SIZE],
+    }
+
+
+def psde_dashboard(user) -> dict:
+    """Open tasks of the employee along with the active projects."""
+
+    return {
+        "tasks": Task.objects.filter(completed=False, assignee=user)
+            .only("subject", "due_date", "priority", "project_id")
+            .order_by("due_date")[:HISTORY_SIZE],
+        **psdm_dashboard(user),
+    }
+
+
+def hrm_dashboard(user) -> dict:
+    """Recruitment campaigns waiting to start or ongoing."""
+
+    campaigns = RecruitementPost.objects.only("department", "title", "contract_type", "min_years_experience")
+
+    return {
+        "pending_campaigns": campaigns.filter(status="pending"),
+        "ongoing_campaigns": campaigns.filter(status="ongoing"),
+    }
+
+
+# Roles whose queues are shared by all their employees -> models displayed in these queues
+CACHED_FRAGMENTS = {
+    "CSM": (Project, Customer),
+    "FIM": (Project, Customer, FinancialRequest),
+    "ADM": (Project, Customer),
+    "HRM": (RecruitementPost,),
+}
+
+
+def fragment_cache():
+    return caches[settings.SEP_DASHBOARD_CACHE]
+
+
+def fragment_key(role: str) -> str:
+    return f"dashboard:fragment:{role}"
+
+
+def stats_key(role: str, outcome: str) -> str:
+    return f"dashboard:stats:{role}:{outcome}"
+
+
+def count(role: str, outcome: str):
+    """Increments a counter of the cache statistics."""
+
+    cache = fragment_cache()
+    key = stats_key(role, outcome)
+    # add() is a no-op if the counter exists, incr() is atomic on the shared backends
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key)
+    except ValueError:  # Evicted in between
+        cache.set(key, 1, timeout=None)
+
+
+def cached_fragment(role: str, context: dict) -> str:
+    """Returns the rendered queues of a role, rendering them only on a cache miss.
+
+        The querysets of the context are lazy, they are only evaluated on a miss.
+    """
+
+    cache = fragment_cache()
+    html = cache.get(fragment_key(role))
+
+    if html is None:
+        count(role, "misses")
+        html = render_to_string(f"employee/fragments/{role}.html", context)
+        cache.set(fragment_key(role), html, timeout=settings.SEP_DASHBOARD_CACHE_TIMEOUT)
+    else:
+        count(role, "hits")
+
+    return mark_safe(html)
+
+
+async def evaluate(context: dict) -> dict:
+    """Evaluates the querysets of a dashboard context concurrently, with the async ORM."""
+
+    async def fetch(queryset: QuerySet) -> list:
+        return [row async for row in queryset]
+
+    names = [name for name, value in context.items() if isinstance(value, QuerySet)]
+    rows = await asyncio.gather(*(fetch(context[name]) for name in names))
+    return {**context, **dict(zip(names, rows))}
+
+
+async def acached_fragment(role: str, context: dict) -> str:
+    """Async version of `cached_fragment`, the querysets are only evaluated on a miss."""
+
+    cache = fragment_cache()
+    html = await cache.aget(fragment_key(role))
+
+    if html is None:
+        await sync_to_async(count)(role, "misses")
+        html = await sync_to_async(render_to_string)(f"employee/fragments/{role}.html", await evaluate(context))
+        await cache.aset(fragment_key(role), html, timeout=settings.SEP_DASHBOARD_CACHE_TIMEOUT)
+    else:
+        await sync_to_async(count)(role, "hits")
+
+    return mark_safe(html)
+
+
+def invalidate_fragments(model):
+    """Drops the cached fragments displaying rows of `model`."""
+
+    roles = [role for role, models in CACHED_FRAGMENTS.items() if model in models]
+    if not roles:
+        return
+
+    def delete():
+        fragment_cache().delete_many([fragment_key(role) for role in roles])
+        for role in roles:
+            count(role, "invalidations")
+
+    delete()
+    # Delete again once committed, a concurrent request may have cached the previous rows meanwhile
+    transaction.on_commit(delete)
+
+
+def cache_stats() -> dict:
+    """Hits, misses & invalidations of the cached fragments, by role."""
+
+    outcomes = ("hits", "misses", "invalidations")
+    values = fragment_cache().get_many([stats_key(role, outcome) for role in CACHED_FRAGMENTS for outcome in outcomes])
+
+    return {
+        role: {outcome: values.get(stats_key(role, outcome), 0) for outcome in outcomes}
+        for role in CACHED_FRAGMENTS
+    }
+
+
+@receiver(status_changed)
+def invalidate_on_transition(sender, **kwargs):
+    invalidate_fragments(sender)
+
+
+def invalidate_on_write(sender, **kwargs):
+    # Any saved column may be displayed (title, client, ...), not only the status
+    invalidate_fragments(sender)
+
+
+for model in {model for models in CACHED_FRAGMENTS.values() for model in models}:
+    post_save.connect(invalidate_on_write, sender=model)
+    post_delete.connect(invalidate_on_write, sender=model)
@@ -0,0 +1,130 @@
+"""Opt-in per-view instrumentation: SQL query count, DB time, template time and total latency.
+
+Enable it with `SEP_METRICS_ENABLED = True`. When disabled, the middleware
+removes itself from the middleware chain at startup so it costs nothing.
+"""
+
+import contextlib
+import contextvars
+import threading
+import time
+from collections import defaultdict, deque
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template.backends import django as django_backend
+
+from SEP.benchmarking import summarize
+
+METRICS = ("queries", "db_ms", "template_ms", "total_ms")
+
+# Recording of the request being processed by the current thread/task
+current_recording = contextvars.ContextVar("current_recording", default=None)
+
+
+class Recording:
+    """Measurements of a single request, also used as the database execute wrapper."""
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.queries += 1
+
+
+class ViewMetrics:
+    """Latest samples of each metric, by view name."""
+
+    def __init__(self, max_samples: int):
+        self.lock = threading.Lock()
+        self.samples = defaultdict(lambda: {metric: deque(maxlen=max_samples) for metric in METRICS})
+
+    def record(self, view_name: str, **values):
+        with self.lock:
+            samples = self.samples[view_name]
+            for metric, value in values.items():
+                samples[metric].append(value)
+
+    def report(self) -> dict:
+        """Percentiles of every metric, by view name."""
+
+        with self.lock:
+            snapshot = {view: {metric: list(values) for metric, values in samples.items()} for view, samples in self.samples.items()}
+
+        return {
+            view: {metric: summarize(values) for metric, values in samples.items()}
+            for view, samples in sorted(snapshot.items())
+        }
+
+    def reset(self):
+        with self.lock:
+            self.samples.clear()
+
+
+metrics = ViewMetrics(max_samples=getattr(settings, "SEP_METRICS_SAMPLES", 1000))
+
+
+def install_template_timer():
+    """Wraps the rendering of the Django templates to measure its duration, once per process."""
+
+    template_class = django_backend.Template
+    if getattr(template_class.render, "timed", False):
+        return
+
+    original_render = template_class.render
+
+    def render(self, context=None, request=None):
+        recording = current_recording.get()
+        if recording is None:
+            return original_render(self, context, request)
+
+        start = time.perf_counter()
+        try:
+            return original_render(self, context, request)
+        finally:
+            recording.template_time += time.perf_counter() - start
+
+    render.timed = True
+    template_class.render = render
+
+
+class MetricsMiddleware:
+    """Records the metrics of every request, keyed by the name of the resolved URL."""
+
+    def __init__(self, get_response):
+        if not settings.SEP_METRICS_ENABLED:
+            raise MiddlewareNotUsed()
+
+        install_template_timer()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recording = Recording()
+        token = current_recording.set(recording)
+        start = time.perf_counter()
+
+        try:
+            with contextlib.ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(recording))
+                response = self.get_response(request)
+        finally:
+            current_recording.reset(token)
+
+        match = request.resolver_match
+        metrics.record(
+            match.view_name if match else "<unresolved>",
+            queries=recording.queries,
+            db_ms=recording.db_time * 1000,
+            template_ms=recording.template_time * 1000,
+            total_ms=(time.perf_counter() - start) * 1000,
+        )
+        return response
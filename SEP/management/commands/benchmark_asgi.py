@@ -0,0 +1,252 @@
+import http.client
+import importlib.util
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.urls import reverse
+
+from project.models import Project, Task
+from SEP import seeding
+from SEP.benchmarking import summarize
+from SEP.models import Employee
+from SEP.test_utils import create_people
+
+# Server modes: server, whether the async views are requested
+MODES = {
+    "wsgi": ("gunicorn", False),
+    "asgi-sync": ("uvicorn", False),
+    "asgi-async": ("uvicorn", True),
+}
+
+SETTINGS_MODULE = "benchmark_asgi_settings"
+
+
+class Command(BaseCommand):
+    help = (
+        "Serves a seeded throwaway database and compares the requests/s & tail latency of the read-heavy views "
+        "on the WSGI path (gunicorn), on ASGI with the sync views and on ASGI with the async views (uvicorn)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", type=int, default=16, help="Number of concurrent clients")
+        parser.add_argument("--duration", type=float, default=10.0, help="Duration of each mode, in seconds")
+        parser.add_argument("--server-workers", type=int, default=1, help="Number of server worker processes")
+        parser.add_argument("--projects", type=int, default=20_000)
+        parser.add_argument("--tasks", type=int, default=20_000)
+        parser.add_argument("--modes", nargs="+", choices=list(MODES), default=list(MODES))
+        parser.add_argument("--seed", type=int, default=42, help="Seed of the random data generator")
+        parser.add_argument("--output", type=Path, help="File to save the results to, as JSON")
+
+    def handle(self, *args, **options):
+        for server in {MODES[mode][0] for mode in options["modes"]}:
+            if importlib.util.find_spec(server) is None:
+                raise CommandError(f"This benchmark needs {server}, install it with `pip install {server}`.")
+
+        old_name = connection.settings_dict["NAME"]
+
+        with tempfile.TemporaryDirectory() as directory:
+            if connection.vendor == "sqlite":
+                # The servers run in other processes, the database has to be a file
+                connection.settings_dict["TEST"]["NAME"] = str(Path(directory) / "benchmark.sqlite3")
+            connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+
+            try:
+                routes = self.seed(options)
+                self.write_settings(Path(directory))
+                results = {
+                    mode: self.run_mode(mode, routes, Path(directory), options)
+                    for mode in options["modes"]
+                }
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        self.report(results)
+        if options["output"]:
+            options["output"].write_text(json.dumps(results, indent=2))
+            self.stdout.write(self.style.SUCCESS(f"Results saved to {options['output']}"))
+
+    def seed(self, options: dict) -> list[tuple[str, str, str, str]]:
+        """Seeds the database, returns the routes to request: label, sync path, async path & session cookie."""
+
+        rng = random.Random(options["seed"])
+        self.stdout.write("Seeding the test database...")
+
+        create_people()
+        employee_ids = list(Employee.objects.values_list("id", flat=True))
+        client_ids = seeding.seed_customers(rng, max(options["projects"] // 20, 1), prefix="benchmark")
+        seeding.seed_projects(rng, options["projects"], client_ids, employee_ids, prefix="benchmark")
+        project_ids = list(Project.objects.values_list("id", flat=True))
+        seeding.seed_tasks(rng, options["tasks"], project_ids, employee_ids, employee_ids, prefix="benchmark")
+        seeding.seed_financial_requests(rng, options["projects"] // 5, project_ids, prefix="benchmark")
+        seeding.seed_recruitment_posts(rng, 100, prefix="benchmark")
+
+        sessions = {}
+        for username in ("fim1", "csm1", "cook1"):
+            client = Client()
+            client.force_login(Employee.objects.get(username=username))
+            sessions[username] = f"{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}"
+
+        project = Project.objects.get(id=project_ids[len(project_ids) // 2])
+        task = Task.objects.filter(project__isnull=False).first()
+
+        return [
+            ("employee_home (FIM)", reverse("employee_home"), reverse("employee_home_async"), sessions["fim1"]),
+            ("employee_home (CSM)", reverse("employee_home"), reverse("employee_home_async"), sessions["csm1"]),
+            ("employee_home (PDE)", reverse("employee_home"), reverse("employee_home_async"), sessions["cook1"]),
+            ("project_list", reverse("project:project_list"), reverse("project:project_list_async"), sessions["csm1"]),
+            (
+                "project_detail",
+                reverse("project:project_detail", args=[project.id]),
+                reverse("project:project_detail_async", args=[project.id]),
+                sessions["csm1"],
+            ),
+            (
+                "task_detail",
+                reverse("project:task_detail", args=[task.project_id, task.id]),
+                reverse("project:task_detail_async", args=[task.project_id, task.id]),
+                sessions["cook1"],
+            ),
+        ]
+
+    def write_settings(self, directory: Path):
+        """Settings of the servers, pointing to the test database."""
+
+        (directory / f"{SETTINGS_MODULE}.py").write_text(
+            "from SEP.settings import *\n\n"
+            "DEBUG = False\n"
+            "ALLOWED_HOSTS = ['127.0.0.1']\n"
+            f"DATABASES = {{'default': {{**DATABASES['default'], 'NAME': {str(connection.settings_dict['NAME'])!r}}}}}\n"
+        )
+
+    def run_mode(self, mode: str, routes: list, directory: Path, options: dict) -> dict:
+        server_name, use_async = MODES[mode]
+        port = self.free_port()
+        if server_name == "gunicorn":
+            # Threaded WSGI workers, one thread per client
+            arguments = [
+                "SEP.wsgi:application",
+                "--bind", f"127.0.0.1:{port}",
+                "--workers", str(options["server_workers"]),
+                "--worker-class", "gthread",
+                "--threads", str(options["concurrency"]),
+                "--log-level", "warning",
+            ]
+        else:
+            arguments = [
+                "SEP.asgi:application",
+                "--port", str(port),
+                "--workers", str(options["server_workers"]),
+                "--log-level", "warning",
+                "--no-access-log",
+            ]
+
+        env = {
+            **os.environ,
+            "DJANGO_SETTINGS_MODULE": SETTINGS_MODULE,
+            "PYTHONPATH": os.pathsep.join(filter(None, [str(directory), os.environ.get("PYTHONPATH")])),
+        }
+        server = subprocess.Popen(
+            [sys.executable, "-m", server_name, *arguments],
+            cwd=settings.BASE_DIR,
+            env=env,
+        )
+
+        try:
+            self.wait_for(port, server)
+            self.stdout.write(f"Benchmarking {mode} for {options['duration']:.0f}s...")
+            targets = [(label, async_path if use_async else sync_path, cookie) for label, sync_path, async_path, cookie in routes]
+            self.load(port, targets, options["concurrency"], 1.0)  # Warm up
+            samples, errors, duration = self.load(port, targets, options["concurrency"], options["duration"])
+        finally:
+            server.terminate()
+            server.wait()
+
+        return {
+            label: {
+                "requests": len(durations),
+                "errors": errors[label],
+                "throughput_rps": len(durations) / duration,
+                **summarize(durations),
+            }
+            for label, durations in samples.items()
+        }
+
+    def load(self, port: int, targets: list, concurrency: int, duration: float) -> tuple[dict, dict, float]:
+        """Requests the targets in a loop from concurrent clients, returns the durations (ms) & errors by label."""
+
+        samples = defaultdict(list)
+        errors = defaultdict(int)
+        lock = threading.Lock()
+        deadline = time.perf_counter() + duration
+
+        def client(offset: int):
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+            index = offset
+            while time.perf_counter() < deadline:
+                label, path, cookie = targets[index % len(targets)]
+                index += 1
+                start = time.perf_counter()
+                try:
+                    conn.request("GET", path, headers={"Cookie": cookie})
+                    response = conn.getresponse()
+                    response.read()
+                    failed = response.status != 200
+                except (OSError, http.client.HTTPException):
+                    conn.close()
+                    failed = True
+                with lock:
+                    samples[label].append((time.perf_counter() - start) * 1000)
+                    errors[label] += failed
+            conn.close()
+
+        threads = [threading.Thread(target=client, args=(i,)) for i in range(concurrency)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return samples, errors, time.perf_counter() - start
+
+    def free_port(self) -> int:
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            return sock.getsockname()[1]
+
+    def wait_for(self, port: int, server: subprocess.Popen, timeout: float = 30.0):
+        deadline = time.perf_counter() + timeout
+        while time.perf_counter() < deadline:
+            if server.poll() is not None:
+                raise CommandError(f"The server exited with code {server.returncode}.")
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=1).close()
+                return
+            except OSError:
+                time.sleep(0.1)
+        raise CommandError("The server did not start in time.")
+
+    def report(self, results: dict):
+        self.stdout.write(f"\n{'Route':<25}{'Mode':<12}{'req':>7}{'err':>5}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+        labels = next(iter(results.values())).keys() if results else []
+        for label in labels:
+            for mode, routes in results.items():
+                stats = routes[label]
+                self.stdout.write(
+                    f"{label:<25}{mode:<12}{stats['requests']:>7}{stats['errors']:>5}{stats['throughput_rps']:>9.1f}"
+                    f"{stats['p50']:>9.1f}{stats['p95']:>9.1f}{stats['p99']:>9.1f}"
+                )
+        for mode, routes in results.items():
+            total = sum(stats["throughput_rps"] for stats in routes.values())
+            self.stdout.write(self.style.MIGRATE_HEADING(f"{mode}: {total:.1f} req/s overall"))
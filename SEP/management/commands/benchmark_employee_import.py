@@ -0,0 +1,61 @@
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from SEP.benchmarking import Rollback
+from SEP.instrumentation import Recording
+from SEP.models import Employee, Role, default_role
+
+
+class Command(BaseCommand):
+    help = "Compares the number of queries & duration of importing employees one by one and in bulk"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--employees", type=int, default=10_000, help="Number of employees to import")
+
+    def handle(self, *args, **options):
+        # Created outside of the rolled back transactions, the default role is cached for the whole process
+        default_role()
+        Role.objects.get_or_create(id="PDE", defaults={"name": "Production Dpt Employee"})
+        count = options["employees"]
+        rows = [
+            {"username": f"import{i}", "first_name": "Import", "last_name": str(i), "email": f"import{i}@sep.se", "role_id": "PDE" if i % 2 else None}
+            for i in range(count)
+        ]
+        password_hash = make_password("1234")
+
+        def save_each(touch_role: bool):
+            for row in rows:
+                employee = Employee(**row, password=password_hash)
+                if touch_role and employee.role_id is not None:
+                    # What the previous `Employee.save` did before checking for a missing role
+                    employee.role
+                employee.save()
+
+        paths = {
+            "save() per row, fetching the role": lambda: save_each(touch_role=True),
+            "save() per row": lambda: save_each(touch_role=False),
+            "bulk_import()": lambda: Employee.objects.bulk_import(rows, password="1234"),
+        }
+
+        self.stdout.write(f"Importing {count} employees, half of them without a role...")
+        self.stdout.write(f"\n{'Path':<40}{'queries':>10}{'duration (s)':>15}")
+        for label, function in paths.items():
+            queries, duration = self.run(function)
+            self.stdout.write(f"{label:<40}{queries:>10}{duration:>15.2f}")
+
+    def run(self, function) -> tuple[int, float]:
+        """Runs an import in a rolled back transaction, returns its query count and duration."""
+
+        recording = Recording()
+        try:
+            with transaction.atomic(), connection.execute_wrapper(recording):
+                start = time.perf_counter()
+                function()
+                duration = time.perf_counter() - start
+                raise Rollback()
+        except Rollback:
+            pass
+        return recording.queries, duration
@@ -0,0 +1,118 @@
+import random
+import statistics
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from project.models import FinancialRequest, Project, RecruitementPost, Task
+from SEP import seeding
+from SEP.benchmarking import Rollback, measure
+from SEP.models import Employee, Role
+
+# Indexes matching the access paths of the dashboards
+WORKFLOW_INDEXES = [
+    (Project, "project_status_created_idx"),
+    (Project, "project_author_created_idx"),
+    (Task, "task_open_assignee_due_idx"),
+    (FinancialRequest, "finrequest_status_idx"),
+    (RecruitementPost, "recruitment_status_idx"),
+]
+
+
+class Command(BaseCommand):
+    help = "Seeds a large number of projects and compares the dashboard queries with and without the workflow indexes"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--projects", type=int, default=1_000_000, help="Number of projects to seed")
+        parser.add_argument("--repeat", type=int, default=5, help="Number of runs of each query")
+        parser.add_argument("--seed", type=int, default=42, help="Seed of the random data generator")
+        parser.add_argument("--keep", action="store_true", help="Keep the seeded rows instead of rolling them back")
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                author, assignee = self.seed(options["projects"], options["seed"])
+                queries = self.queries(author, assignee)
+
+                self.set_indexes(enabled=False)
+                before = self.run_queries(queries, options["repeat"])
+                self.set_indexes(enabled=True)
+                after = self.run_queries(queries, options["repeat"])
+
+                self.report(before, after)
+
+                if not options["keep"]:
+                    raise Rollback()
+        except Rollback:
+            self.stdout.write(self.style.SUCCESS("Seeded rows rolled back."))
+
+    def seed(self, count: int, seed: int) -> tuple[Employee, Employee]:
+        """Seeds the projects & related rows, returns a project author and a task assignee."""
+
+        rng = random.Random(seed)
+        self.stdout.write(f"Seeding {count} projects...")
+
+        role = Role.objects.get_or_create(id="CSE", defaults={"name": "Customer Service Employee"})[0]
+        seeding.bulk_insert(Employee, (
+            Employee(username=f"benchmark{i}", password="!", role=role) for i in range(100)
+        ))
+        employee_ids = list(Employee.objects.filter(username__startswith="benchmark").values_list("id", flat=True))
+
+        client_ids = seeding.seed_customers(rng, max(count // 100, 1), prefix="benchmark")
+        seeding.seed_projects(rng, count, client_ids, employee_ids, prefix="benchmark")
+        project_ids = list(Project.objects.filter(title__startswith="benchmark").values_list("id", flat=True))
+        seeding.seed_tasks(rng, count // 2, project_ids, employee_ids, employee_ids, prefix="benchmark")
+        seeding.seed_financial_requests(rng, count // 5, project_ids, prefix="benchmark")
+        seeding.seed_recruitment_posts(rng, count // 100, prefix="benchmark")
+
+        return Employee.objects.get(id=employee_ids[0]), Employee.objects.get(id=employee_ids[1])
+
+    def queries(self, author: Employee, assignee: Employee) -> dict:
+        """The queries issued by the dashboards, by label."""
+
+        return {
+            "CSM pending queue": Project.objects.filter(status="pending").order_by("-created_at")[:25],
+            "ADM history": Project.objects.filter(status__in=("admin_approved", "admin_rejected")).order_by("-created_at")[:25],
+            "CSE history": Project.objects.filter(created_by=author).exclude(status="draft").order_by("-created_at")[:25],
+            "PDE open tasks": Task.objects.filter(completed=False, assignee=assignee).order_by("due_date")[:25],
+            "FIM pending requests": FinancialRequest.objects.filter(status="pending")[:25],
+            "HRM ongoing campaigns": RecruitementPost.objects.filter(status="ongoing")[:25],
+        }
+
+    def set_indexes(self, enabled: bool):
+        """Creates or drops the workflow indexes, then refreshes the planner statistics."""
+
+        # The statements are executed directly as the schema editor cannot be entered in a transaction on SQLite
+        editor = connection.schema_editor()
+        with connection.cursor() as cursor:
+            for model, name in WORKFLOW_INDEXES:
+                if enabled:
+                    index = next(index for index in model._meta.indexes if index.name == name)
+                    statement = str(index.create_sql(model, editor))
+                else:
+                    statement = editor.sql_delete_index % {
+                        "table": editor.quote_name(model._meta.db_table),
+                        "name": editor.quote_name(name),
+                    }
+                cursor.execute(statement)
+            cursor.execute("ANALYZE")
+
+    def run_queries(self, queries: dict, repeat: int) -> dict:
+        """Times each query, returns the median duration (ms) & query plan by label."""
+
+        return {
+            label: (statistics.median(measure(lambda: list(queryset.all()), repeat)), queryset.explain())
+            for label, queryset in queries.items()
+        }
+
+    def report(self, before: dict, after: dict):
+        self.stdout.write(f"\n{'Query':<25}{'without (ms)':>15}{'with (ms)':>15}{'speedup':>10}")
+        for label, (duration_before, _) in before.items():
+            duration_after = after[label][0]
+            speedup = duration_before / duration_after if duration_after else float("inf")
+            self.stdout.write(f"{label:<25}{duration_before:>15.2f}{duration_after:>15.2f}{speedup:>9.1f}x")
+
+        for label, (_, plan_before) in before.items():
+            self.stdout.write(self.style.MIGRATE_HEADING(f"\n{label}"))
+            self.stdout.write(f"Without indexes:\n{plan_before}")
+            self.stdout.write(f"With indexes:\n{after[label][1]}")
@@ -0,0 +1,222 @@
+import json
+import random
+import subprocess
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from project.models import Project, RawRequest
+from SEP import seeding
+from SEP.benchmarking import summarize
+from SEP.models import Employee
+from SEP.test_utils import create_people
+
+# Employee driving each step of the lifecycle, by role
+ACTORS = {
+    "CSE": "cse1",
+    "CSM": "csm1",
+    "FIM": "fim1",
+    "ADM": "adm1",
+    "SDM": "sdm1",
+    "SDE": "cook1",
+    "HRM": "hrm1",
+}
+
+
+class Command(BaseCommand):
+    help = "Seeds a throwaway test database and load-tests the routes of the project lifecycle"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=4, help="Number of concurrent clients")
+        parser.add_argument("--iterations", type=int, default=20, help="Number of project lifecycles per client")
+        parser.add_argument("--customers", type=int, default=1000)
+        parser.add_argument("--raw-requests", type=int, default=5000)
+        parser.add_argument("--projects", type=int, default=10000)
+        parser.add_argument("--tasks", type=int, default=20000)
+        parser.add_argument("--teams", type=int, default=20)
+        parser.add_argument("--seed", type=int, default=42, help="Seed of the random data generator")
+        parser.add_argument("--output", type=Path, help="File to save the results to, as JSON")
+        parser.add_argument("--compare", type=Path, help="Results of a previous run to compare with")
+
+    def handle(self, *args, **options):
+        old_name = connection.settings_dict["NAME"]
+
+        with tempfile.TemporaryDirectory() as directory:
+            if connection.vendor == "sqlite":
+                # A file database so that every client thread gets its own connection
+                connection.settings_dict["TEST"]["NAME"] = str(Path(directory) / "benchmark.sqlite3")
+            connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+
+            try:
+                # Every client posts from the same address, the intake form is not throttled
+                with override_settings(DEBUG=False, ALLOWED_HOSTS=["testserver"], SEP_INTAKE_RATE_LIMITS={}):
+                    self.seed(options)
+                    samples, errors, duration = self.load_test(options["workers"], options["iterations"])
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        results = {
+            "commit": self.current_commit(),
+            "parameters": {
+                name: options[name]
+                for name in ("workers", "iterations", "customers", "raw_requests", "projects", "tasks", "teams", "seed")
+            },
+            "duration_s": duration,
+            "routes": {
+                route: {
+                    "requests": len(durations),
+                    "errors": errors[route],
+                    "throughput_rps": len(durations) / duration,
+                    **summarize(durations),
+                }
+                for route, durations in sorted(samples.items())
+            },
+        }
+
+        self.report(results)
+        if options["compare"]:
+            self.compare(results, json.loads(options["compare"].read_text()))
+        if options["output"]:
+            options["output"].write_text(json.dumps(results, indent=2))
+            self.stdout.write(self.style.SUCCESS(f"Results saved to {options['output']}"))
+
+    def seed(self, options: dict):
+        rng = random.Random(options["seed"])
+        self.stdout.write("Seeding the test database...")
+
+        create_people()
+        employee_ids = list(Employee.objects.values_list("id", flat=True))
+        manager_ids = list(Employee.objects.filter(role_id__in=("PDM", "SDM")).values_list("id", flat=True))
+
+        client_ids = seeding.seed_customers(rng, options["customers"], prefix="benchmark")
+        seeding.seed_raw_requests(rng, options["raw_requests"], prefix="benchmark")
+        seeding.seed_projects(rng, options["projects"], client_ids, employee_ids, prefix="benchmark")
+        project_ids = list(Project.objects.values_list("id", flat=True))
+        seeding.seed_tasks(rng, options["tasks"], project_ids, employee_ids, manager_ids, prefix="benchmark")
+        seeding.seed_teams(rng, options["teams"], manager_ids, employee_ids, prefix="benchmark")
+
+    def load_test(self, workers: int, iterations: int) -> tuple[dict, dict, float]:
+        """Runs the lifecycle concurrently, returns the durations (ms) & error count by route and the wall time (s)."""
+
+        samples = defaultdict(list)
+        errors = defaultdict(int)
+        lock = threading.Lock()
+
+        def record(route: str, response, expected_status: int, duration: float):
+            with lock:
+                samples[route].append(duration * 1000)
+                if response is None or response.status_code != expected_status:
+                    errors[route] += 1
+
+        threads = [
+            threading.Thread(target=self.worker, args=(index, iterations, record))
+            for index in range(workers)
+        ]
+        self.stdout.write(f"Running {workers} client(s) x {iterations} lifecycle(s)...")
+
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return samples, errors, time.perf_counter() - start
+
+    def worker(self, index: int, iterations: int, record):
+        clients = {}
+        for role, username in ACTORS.items():
+            clients[role] = Client()
+            clients[role].force_login(Employee.objects.get(username=username))
+        anonymous = Client()
+        team = Employee.objects.get(username=ACTORS["SDM"]).managed_teams.first()
+        assignee_id = team.members.values_list("id", flat=True).first()
+
+        def call(route: str, expected_status: int, method, *args, **kwargs):
+            start = time.perf_counter()
+            try:
+                response = method(*args, **kwargs)
+            except Exception:
+                response = None
+            record(route, response, expected_status, time.perf_counter() - start)
+            return response
+
+        try:
+            for iteration in range(iterations):
+                title = f"benchmark lifecycle {index}-{iteration}"
+
+                call("home [POST]", 200, anonymous.post, reverse("home"), {
+                    "name": "Benchmark client",
+                    "email": "benchmark@example.com",
+                    "phone": "0123456789",
+                    "address": "Benchmark street",
+                    "title": title,
+                    "description": "Load test request",
+                    "available": 10000,
+                })
+                raw_request = RawRequest.objects.only("id").filter(title=title).first()
+                if raw_request is None:
+                    continue
+
+                url = reverse("project:project_from_raw", args=[raw_request.id])
+                call("project:project_from_raw [GET]", 200, clients["CSE"].get, url)
+                call("project:project_from_raw [POST]", 302, clients["CSE"].post, url, {
+                    "title": title,
+                    "description": "Load test project",
+                    "estimated_budget": 10000,
+                    "publish_project": "",
+                })
+                project = Project.objects.only("id").filter(initial_request=raw_request).first()
+                if project is None:
+                    continue
+
+                call("project:csm_action", 302, clients["CSM"].get, reverse("project:csm_action", args=[project.id]), {"approve": "1"})
+                call("project:fin_action [POST]", 302, clients["FIM"].post, reverse("project:fin_action", args=[project.id]), {
+                    "feedback": "Load test feedback",
+                })
+                call("project:adm_action", 302, clients["ADM"].get, reverse("project:adm_action", args=[project.id]), {"approve": "1"})
+                call("project:psdm_team_action [POST]", 302, clients["SDM"].post, reverse("project:psdm_team_action", args=[project.id, team.id]), {
+                    "assignee": assignee_id,
+                    "subject": "Load test task",
+                    "priority": 2,
+                    "due_date": "2030-01-01",
+                    "description": "Load test task",
+                })
+
+                for role, client in clients.items():
+                    call(f"employee_home ({role})", 200, client.get, reverse("employee_home"))
+        finally:
+            connection.close()
+
+    def current_commit(self) -> str | None:
+        try:
+            return subprocess.run(
+                ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    def report(self, results: dict):
+        self.stdout.write(f"\n{'Route':<40}{'req':>6}{'err':>5}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+        for route, stats in results["routes"].items():
+            self.stdout.write(
+                f"{route:<40}{stats['requests']:>6}{stats['errors']:>5}{stats['throughput_rps']:>9.1f}"
+                f"{stats['p50']:>9.1f}{stats['p95']:>9.1f}{stats['p99']:>9.1f}"
+            )
+
+    def compare(self, results: dict, previous: dict):
+        self.stdout.write(self.style.MIGRATE_HEADING(f"\nCompared with {previous.get('commit') or 'previous run'}"))
+        for route, stats in results["routes"].items():
+            if route not in previous["routes"]:
+                continue
+            deltas = []
+            for percentile in ("p50", "p95", "p99"):
+                before = previous["routes"][route][percentile]
+                change = (stats[percentile] - before) / before * 100 if before else 0.0
+                deltas.append(f"{percentile} {change:+6.1f}%")
+            self.stdout.write(f"{route:<40}{'  '.join(deltas)}")
@@ -0,0 +1,61 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Case, Count, Min, Value, When
+
+from project.models import FinancialDailyRollup, Project
+from SEP import dashboards
+from SEP.models import Customer
+from SEP.seeding import batched
+
+
+class Command(BaseCommand):
+    help = (
+        "Merges the customers sharing the same email & phone into the oldest of them, with their projects and "
+        "their rows of the daily financial rollup, then drops the cached dashboard queues listing them"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500, help="Number of duplicated keys merged per transaction")
+        parser.add_argument("--dry-run", action="store_true", help="Only count the duplicates")
+
+    def handle(self, *args, **options):
+        duplicated = (
+            Customer.objects.values("lookup_key")
+            .annotate(count=Count("id"), keep=Min("id"))
+            .filter(count__gt=1)
+            .order_by()
+            .values_list("lookup_key", "keep")
+        )
+
+        merged = 0
+        for batch in batched(list(duplicated), options["batch_size"]):
+            keepers = dict(batch)
+            if options["dry_run"]:
+                merged += Customer.objects.filter(lookup_key__in=keepers).exclude(id__in=keepers.values()).count()
+                continue
+            merged += self.merge(keepers)
+
+        verb = "would be" if options["dry_run"] else "were"
+        self.stdout.write(self.style.SUCCESS(f"{merged} duplicate customer(s) {verb} merged."))
+
+    @transaction.atomic
+    def merge(self, keepers: dict[str, int]) -> int:
+        """Moves the projects & rollup rows of the duplicates to the customer kept for their key, then deletes them."""
+
+        duplicates = dict(
+            Customer.objects.filter(lookup_key__in=keepers)
+            .exclude(id__in=keepers.values())
+            .values_list("id", "lookup_key")
+        )
+        if not duplicates:
+            return 0
+
+        # The rollup rows would be deleted with the duplicates, the rows of a client are summed anyway
+        for model in (Project, FinancialDailyRollup):
+            model.objects.filter(client_id__in=duplicates).update(client_id=Case(
+                *(When(client_id=duplicate, then=Value(keepers[key])) for duplicate, key in duplicates.items())
+            ))
+        Customer.objects.filter(id__in=duplicates).delete()
+        # The projects were updated without signals
+        dashboards.invalidate_fragments(Project)
+        return len(duplicates)
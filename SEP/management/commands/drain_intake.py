@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from project import intake
+
+
+class Command(BaseCommand):
+    help = "Moves the requests buffered by the public home page to the database, in batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500, help="Maximum number of requests inserted per transaction")
+        parser.add_argument("--interval", type=float, default=1.0, help="Seconds to wait when the spool is empty")
+        parser.add_argument("--once", action="store_true", help="Exit once the spool is empty instead of waiting for more requests")
+
+    def handle(self, *args, **options):
+        total = 0
+        try:
+            while True:
+                drained = intake.drain(options["batch_size"])
+                total += drained
+                if drained:
+                    self.stdout.write(f"{drained} request(s) saved, {intake.pending()} waiting.")
+                elif options["once"]:
+                    break
+                else:
+                    time.sleep(options["interval"])
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(self.style.SUCCESS(f"{total} request(s) saved."))
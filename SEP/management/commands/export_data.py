@@ -0,0 +1,33 @@
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+
+from project import exports
+
+
+class Command(BaseCommand):
+    help = "Writes a full extract of the projects, tasks or financial requests as CSV or JSON lines"
+
+    def add_arguments(self, parser):
+        parser.add_argument("name", choices=list(exports.EXPORTS))
+        parser.add_argument("--format", choices=list(exports.FORMATS), default="csv")
+        parser.add_argument("--output", type=Path, help="File to write to, the standard output by default")
+        parser.add_argument("--chunk-size", type=int, default=exports.CHUNK_SIZE, help="Number of rows fetched & written at once")
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        chunks = exports.chunks(options["name"], options["format"], options["chunk_size"])
+
+        if options["output"] is None:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending="")
+            return
+
+        with options["output"].open("w", newline="", encoding="utf-8") as file:
+            for chunk in chunks:
+                file.write(chunk)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{options['name']} exported to {options['output']} in {time.perf_counter() - start:.1f}s."
+        ))
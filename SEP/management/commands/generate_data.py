@@ -0,0 +1,109 @@
+import io
+import random
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+
+from project import counters, workload
+from project.models import FinancialRequest, Project, RawRequest, RecruitementPost, Task
+from SEP import seeding
+from SEP.models import Customer, Employee, Team
+
+
+class Command(BaseCommand):
+    help = "Fills the database with large volumes of realistic synthetic data, in batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--employees", type=int, default=500)
+        parser.add_argument("--teams", type=int, default=50)
+        parser.add_argument("--customers", type=int, default=20_000)
+        parser.add_argument("--raw-requests", type=int, default=1_000_000)
+        parser.add_argument("--projects", type=int, default=1_000_000)
+        parser.add_argument("--tasks", type=int, default=2_000_000)
+        parser.add_argument("--financial-requests", type=int, default=200_000)
+        parser.add_argument("--recruitment-posts", type=int, default=2_000)
+        parser.add_argument(
+            "--unprocessed", type=int, default=500,
+            help="Number of raw requests left without a project, for the customer service queue",
+        )
+        parser.add_argument("--seed", type=int, default=42, help="Seed of the random data generator")
+        parser.add_argument("--prefix", default="gen", help="Prefix of the generated names, used to find them again")
+
+    def handle(self, *args, **options):
+        # The generated employees need the roles, the demo accounts are handy to browse the data
+        call_command("init_database", stdout=io.StringIO())
+
+        self.seed = options["seed"]
+        prefix = options["prefix"]
+
+        self.generate(Employee, options["employees"], {"username__startswith": prefix}, lambda rng, count, start: (
+            seeding.seed_employees(rng, count, make_password("1234"), prefix=prefix, start=start)
+        ))
+        employee_ids = self.ids(Employee, username__startswith=prefix)
+        manager_ids = self.ids(Employee, username__startswith=prefix, role_id__in=("PDM", "SDM"))
+        member_ids = self.ids(Employee, username__startswith=prefix, role_id__in=("PDE", "SDE"))
+
+        if manager_ids and member_ids:
+            self.generate(Team, options["teams"], {"name__startswith": f"{prefix} team "}, lambda rng, count, start: (
+                seeding.seed_teams(rng, count, manager_ids, member_ids, prefix=prefix, start=start)
+            ))
+
+        self.generate(Customer, options["customers"], {"name__startswith": f"{prefix} customer "}, lambda rng, count, start: (
+            seeding.seed_customers(rng, count, prefix=prefix, start=start)
+        ))
+        self.generate(RawRequest, options["raw_requests"], {"title__startswith": f"{prefix} request "}, lambda rng, count, start: (
+            seeding.seed_raw_requests(rng, count, prefix=prefix, start=start)
+        ))
+
+        client_ids = self.ids(Customer, name__startswith=f"{prefix} customer ")
+
+        def seed_projects(rng, count, start):
+            # Most requests have been turned into a project, the last ones are still waiting in the queue
+            pending_request_ids = self.ids(RawRequest, title__startswith=f"{prefix} request ", project__isnull=True)
+            request_ids = pending_request_ids[:max(len(pending_request_ids) - options["unprocessed"], 0)]
+            return seeding.seed_projects(rng, count, client_ids, employee_ids, request_ids, prefix=prefix, start=start)
+
+        if client_ids and employee_ids:
+            self.generate(Project, options["projects"], {"title__startswith": f"{prefix} project "}, seed_projects)
+
+        project_ids = self.ids(Project, title__startswith=f"{prefix} project ")
+        if project_ids:
+            self.generate(Task, options["tasks"], {"subject__startswith": f"{prefix} task "}, lambda rng, count, start: (
+                seeding.seed_tasks(rng, count, project_ids, member_ids or employee_ids, manager_ids or employee_ids, prefix=prefix, start=start)
+            ))
+            self.generate(FinancialRequest, options["financial_requests"], {"reason": f"{prefix} financial request"}, lambda rng, count, start: (
+                seeding.seed_financial_requests(rng, count, project_ids, prefix=prefix)
+            ))
+
+        self.generate(RecruitementPost, options["recruitment_posts"], {"title__startswith": f"{prefix} job "}, lambda rng, count, start: (
+            seeding.seed_recruitment_posts(rng, count, prefix=prefix, start=start)
+        ))
+
+        # The rows created in bulk are not indexed nor counted by the signal receivers
+        call_command("rebuild_search_index", stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS(f"Task counters of {counters.rebuild()} project(s) rebuilt."))
+        self.stdout.write(self.style.SUCCESS(f"Workloads of {workload.rebuild()} employee(s) rebuilt."))
+
+    def generate(self, model, target: int, lookup: dict, seed_function):
+        """Creates the rows missing to reach `target` generated rows of `model`.
+
+            The random generator is derived from the seed, the model and the existing rows,
+            so running the command again with the same arguments creates nothing new.
+        """
+
+        existing = model.objects.filter(**lookup).count()
+        missing = target - existing
+        label = model._meta.verbose_name_plural
+        if missing <= 0:
+            self.stdout.write(self.style.WARNING(f"{existing} {label} already generated."))
+            return
+
+        rng = random.Random(f"{self.seed}:{model._meta.label}:{existing}")
+        start = time.perf_counter()
+        seed_function(rng, missing, existing)
+        self.stdout.write(self.style.SUCCESS(f"{missing} {label} generated in {time.perf_counter() - start:.1f}s."))
+
+    def ids(self, model, **lookup) -> list[int]:
+        return list(model.objects.filter(**lookup).order_by("id").values_list("id", flat=True))
@@ -0,0 +1,58 @@
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from project import imports
+
+
+class Command(BaseCommand):
+    help = (
+        "Imports raw requests and their customers from a CSV or JSON lines file, in batches. "
+        "An interrupted import continues where it stopped when run again"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", type=Path, help="File with the fields of the home page form as columns/keys")
+        parser.add_argument("--format", choices=imports.FORMATS, help="Format of the file, guessed from its extension by default")
+        parser.add_argument("--batch-size", type=int, default=5000, help="Number of rows inserted per transaction")
+        parser.add_argument("--rejects", type=Path, help="CSV report of the rejected rows, <path>.rejects.csv by default")
+        parser.add_argument("--checkpoint", type=Path, help="Progress of the import, <path>.checkpoint by default")
+        parser.add_argument("--restart", action="store_true", help="Ignore the checkpoint and read the file from the start")
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        if not path.is_file():
+            raise CommandError(f"{path} does not exist.")
+
+        format = options["format"] or path.suffix.lstrip(".").lower()
+        if format not in imports.FORMATS:
+            raise CommandError(f"Unknown format {format!r}, use --format.")
+
+        checkpoint = options["checkpoint"] or path.with_name(f"{path.name}.checkpoint")
+        if options["restart"]:
+            checkpoint.unlink(missing_ok=True)
+        elif checkpoint.exists():
+            self.stdout.write(f"Resuming from {checkpoint}.")
+
+        importer = imports.Importer(
+            path,
+            format,
+            rejects=options["rejects"] or path.with_name(f"{path.name}.rejects.csv"),
+            checkpoint=checkpoint,
+            batch_size=options["batch_size"],
+        )
+
+        start = time.perf_counter()
+        counts = importer.counts
+        for counts in importer.run():
+            if options["verbosity"] > 1:
+                self.stdout.write(f"{counts['imported']} request(s) imported, {counts['rejected']} rejected...")
+        elapsed = time.perf_counter() - start
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{counts['imported']} request(s) & {counts['customers']} customer(s) imported, "
+            f"{counts['skipped']} already imported, {counts['rejected']} rejected in {elapsed:.1f}s."
+        ))
+        if counts["rejected"]:
+            self.stdout.write(f"The rejected rows are listed in {importer.rejects}.")
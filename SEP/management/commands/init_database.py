@@ -1,190 +1,106 @@
-from django.core.management.base import BaseCommand, CommandError
-from SEP.models import Employee, Role, Team
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from SEP.models import Employee, Role, Team, TeamToEmployee
+
+ROLES = [
+    ("CSE", "Customer Service Employee"),
+    ("CSM", "Customer Service Manager"),
+    ("FIM", "Financial Manager"),
+    ("ADM", "Administration Dpt Manager"),
+    ("PDE", "Production Dpt Employee"),
+    ("PDM", "Production Dpt Manager"),
+    ("SDE", "Service Dpt Employee"),
+    ("SDM", "Service Dpt Manager"),
+    ("HRM", "HR Manager"),
+]
+
+# username, first name, last name, role
+EMPLOYEES = [
+    ("cse1", "Carmen", "Santa-Emeritus", "CSE"),
+    ("cse2", "Cedric", "Saladin-Ernandez", "CSE"),
+    ("csm1", "Carlos", "Sitaro-Meritus", "CSM"),
+    ("fim1", "Fernando", "Iniesta-Malan", "FIM"),
+    ("adm1", "Amanda", "Dministrador", "ADM"),  # Thanks copilot
+    ("pdm1", "Patrik", "De Mager", "PDM"),
+    ("sdm1", "Sara", "Du Mer", "SDM"),
+    ("hrm1", "Henri", "Rodrigue-Marsouin", "HRM"),
+]
+
+# Teams by manager, with the role of their members
+TEAMS = {
+    "pdm1": (["photographers", "audio", "graphic", "decoration", "network"], "PDE"),
+    "sdm1": (["Cook", "Waiter"], "SDE"),
+}
+
+MEMBERS_PER_TEAM = 3
+
+DEFAULT_PASSWORD = "1234"
 
 
 class Command(BaseCommand):
     help = "Creates initial database entries for the SEP application"
 
+    @transaction.atomic
     def handle(self, *args, **options):
-
-        # Create initial roles
-        for role_id, role_name in [
-            ("CSE", "Customer Service Employee"),
-            ("CSM", "Customer Service Manager"),
-            ("FIM", "Financial Manager"),
-            ("ADM", "Administration Dpt Manager"),
-            ("PDE", "Production Dpt Employee"),
-            ("PDM", "Production Dpt Manager"),
-            ("SDE", "Service Dpt Employee"),
-            ("SDM", "Service Dpt Manager"),
-            ("HRM", "HR Manager"),
-        ]:
-            _, created = Role.objects.get_or_create(id=role_id, name=role_name)
-            if created:
-                self.stdout.write(self.style.SUCCESS(f"Role {role_name} created."))
-            else:
-                self.stdout.write(self.style.WARNING(f"Role {role_name} already exists."))
-
-        # Create initial employees
-        if Employee.objects.get_or_create(
-            username="cse1",
-            first_name="Carmen",
-            last_name="Santa-Emeritus",
-            email="cse1@sep.se",
-            role=Role.objects.get(id="CSE"),
-        )[1]:
-            self.stdout.write(self.style.SUCCESS("CSE Employee Carmen Santa-Emeritus created."))
-        else:
-            self.stdout.write(self.style.WARNING("CSE Employee Carmen Santa-Emeritus already exists."))
-
-        if Employee.objects.get_or_create(
-            username="cse2",
-            first_name="Cedric",
-            last_name="Saladin-Ernandez",
-            email="cse2@sep.se",
-            role=Role.objects.get(id="CSE"),
-        )[1]:
-            self.stdout.write(self.style.SUCCESS("CSE Employee Cedric Saladin-Ernandez created."))
-        else:
-            self.stdout.write(self.style.WARNING("CSE Employee Cedric Saladin-Ernandez already exists."))
-
-        if Employee.objects.get_or_create(
-            username="csm1",
-            first_name="Carlos",
-            last_name="Sitaro-Meritus",
-            email="csm1@sep.se",
-            role=Role.objects.get(id="CSM"),
-        )[1]:
-            self.stdout.write(self.style.SUCCESS("CSM Employee Carlos Sitaro-Meritus created."))
-        else:
-            self.stdout.write(self.style.WARNING("CSM Employee Carlos Sitaro-Meritus already exists."))
-
-        if Employee.objects.get_or_create(
-            username="fim1",
-            first_name="Fernando",
-            last_name="Iniesta-Malan",
-            email="fim1@sep.se",
-            role=Role.objects.get(id="FIM"),
-        )[1]:
-            self.stdout.write(self.style.SUCCESS("FIM Employee Fernando Iniesta-Malan created."))
-        else:
-            self.stdout.write(self.style.WARNING("FIM Employee Fernando Iniesta-Malan already exists."))
-
-        if Employee.objects.get_or_create(
-            username="adm1",
-            first_name="Amanda",
-            last_name="Dministrador",  # Thanks copilot
-            email="adm1@sep.se",
-            role=Role.objects.get(id="ADM"),
-        )[1]:
-            self.stdout.write(self.style.SUCCESS("ADM Employee Amanda Dministrador created."))
-        else:
-            self.stdout.write(self.style.WARNING("ADM Employee Amanda Dministrador already exists."))
-
-        if Employee.objects.get_or_create(
-            username="pdm1",
-            first_name="Patrik",
-            last_name="De Mager",
-            email="pdm1@sep.se",
-            role=Role.objects.get(id="PDM"),
-        )[1]:
-            self.stdout.write(self.style.SUCCESS("PDM Employee Patrik De Mager created."))
-        else:
-            self.stdout.write(self.style.WARNING("PDM Employee Patrik De Mager already exists."))
-
-        if Employee.objects.get_or_create(
-            username="sdm1",
-            first_name="Sara",
-            last_name="Du Mer",
-            email="sdm1@sep.se",
-            role=Role.objects.get(id="SDM"),
-        )[1]:
-            self.stdout.write(self.style.SUCCESS("SDM Employee Sara Du Mer created."))
-        else:
-            self.stdout.write(self.style.WARNING("SDM Employee Sara Du Mer already exists."))
-
-        if Employee.objects.get_or_create(
-            username="hrm1",
-            first_name="Henri",
-            last_name="Rodrigue-Marsouin",
-            email="hrm1@sep.se",
-            role=Role.objects.get(id="HRM"),
-        )[1]:
-            self.stdout.write(self.style.SUCCESS("HRM Employee Henri Rodrigue-Marsouin created."))
-        else:
-            self.stdout.write(self.style.WARNING("HRM Employee Henri Rodrigue-Marsouin already exists."))
-
-        # Producttion teams under the production manager
-        for team in [
-            "photographers",
-            "audio",
-            "graphic",
-            "decoration",
-            "network"
-        ]:
-            _, created = Team.objects.get_or_create(
-                name=team,
-                manager=Employee.objects.get(username="pdm1"),
-            )
-
-            if created:
-                self.stdout.write(self.style.SUCCESS(f"Team {team.capitalize()} created."))
-            else:
-                self.stdout.write(self.style.WARNING(f"Team {team.capitalize()} already exists."))
-
-        # Service teams under the service manager
-        for team in [
-            "Cook",
-            "Waiter"
-        ]:
-            _, created = Team.objects.get_or_create(
-                name=team,
-                manager=Employee.objects.get(username="sdm1"),
-            )
-
-            if created:
-                self.stdout.write(self.style.SUCCESS(f"Team {team.capitalize()} created."))
-            else:
-                self.stdout.write(self.style.WARNING(f"Team {team.capitalize()} already exists."))
-
-        # Create some employees for the production teams
-        for team in Team.objects.filter(manager=Employee.objects.get(username="pdm1")):
-            for i in range(1, 4):
-                employee, created = Employee.objects.get_or_create(
-                    username=f"{team.name}{i}",
-                    first_name=f"{team.name.capitalize()}",
-                    last_name=f"{i}",
-                    email=f"{team.name}{i}@sep.se",
-                    role=Role.objects.get(id="PDE"),
-                )
-
-                if created:
-                    self.stdout.write(self.style.SUCCESS(f"{team.name.capitalize()} {i} created."))
-                else:
-                    self.stdout.write(self.style.WARNING(f"{team.name.capitalize()} {i} already exists."))
-
-                self.stdout.write(self.style.SUCCESS(f"Connecting {employee.username} to team {team.name}"))
-                team.members.add(employee)
-
-        # Create some employees for the service teams
-        for team in Team.objects.filter(manager=Employee.objects.get(username="sdm1")):
-            for i in range(1, 4):
-                employee, created = Employee.objects.get_or_create(
-                    username=f"{team.name}{i}",
-                    first_name=f"{team.name.capitalize()}",
-                    last_name=f"{i}",
-                    email=f"{team.name}{i}@sep/.se",
-                    role=Role.objects.get(id="SDE"),
-                )
-
-                if created:
-                    self.stdout.write(self.style.SUCCESS(f"{team.name.capitalize()} {i} created."))
-                else:
-                    self.stdout.write(self.style.WARNING(f"{team.name.capitalize()} {i} already exists."))
-
-                self.stdout.write(self.style.SUCCESS(f"Connecting {employee.username} to team {team.name}"))
-                team.members.add(employee)
-
-        for employee in Employee.objects.all():
-            employee.set_password("1234")
-            employee.save()
+        Role.objects.bulk_create([Role(id=role_id, name=name) for role_id, name in ROLES], ignore_conflicts=True)
+        self.stdout.write(self.style.SUCCESS(f"{len(ROLES)} roles ensured."))
+
+        employees = [
+            Employee(username=username, first_name=first_name, last_name=last_name, email=f"{username}@sep.se", role_id=role)
+            for username, first_name, last_name, role in EMPLOYEES
+        ]
+        for team_names, role in TEAMS.values():
+            employees += [
+                Employee(username=f"{team}{i}", first_name=team.capitalize(), last_name=str(i), email=f"{team}{i}@sep.se", role_id=role)
+                for team in team_names
+                for i in range(1, MEMBERS_PER_TEAM + 1)
+            ]
+        self.create_employees(employees)
+
+        employee_ids = dict(Employee.objects.filter(username__in=[e.username for e in employees]).values_list("username", "id"))
+        self.create_teams(employee_ids)
+
+    def create_employees(self, employees: list[Employee]):
+        """Creates the missing employees, all sharing a single password hash."""
+
+        existing = set(Employee.objects.filter(username__in=[e.username for e in employees]).values_list("username", flat=True))
+        missing = [employee for employee in employees if employee.username not in existing]
+
+        # Hashing is deliberately slow, so it is done once for all the new employees
+        password = make_password(DEFAULT_PASSWORD)
+        for employee in missing:
+            employee.password = password
+        Employee.objects.bulk_create(missing)
+
+        for employee in missing:
+            self.stdout.write(self.style.SUCCESS(f"Employee {employee.username} created."))
+        if existing:
+            self.stdout.write(self.style.WARNING(f"{len(existing)} employee(s) already exist."))
+
+    def create_teams(self, employee_ids: dict[str, int]):
+        """Creates the missing teams and connects their members."""
+
+        teams = {(name, employee_ids[manager]) for manager, (names, _) in TEAMS.items() for name in names}
+        existing = set(Team.objects.filter(manager_id__in=employee_ids.values()).values_list("name", "manager_id"))
+        Team.objects.bulk_create([Team(name=name, manager_id=manager_id) for name, manager_id in sorted(teams - existing)])
+        for name, _ in sorted(teams - existing):
+            self.stdout.write(self.style.SUCCESS(f"Team {name.capitalize()} created."))
+
+        team_ids = {
+            name: team_id
+            for team_id, name, manager_id in Team.objects.filter(manager_id__in=employee_ids.values()).values_list("id", "name", "manager_id")
+            if (name, manager_id) in teams
+        }
+        memberships = {
+            (team_ids[team], employee_ids[f"{team}{i}"])
+            for names, _ in TEAMS.values()
+            for team in names
+            for i in range(1, MEMBERS_PER_TEAM + 1)
+        }
+        connected = set(TeamToEmployee.objects.filter(team_id__in=team_ids.values()).values_list("team_id", "employee_id"))
+        TeamToEmployee.objects.bulk_create([
+            TeamToEmployee(team_id=team_id, employee_id=employee_id) for team_id, employee_id in sorted(memberships - connected)
+        ])
+        self.stdout.write(self.style.SUCCESS(f"{len(memberships - connected)} team member(s) connected."))
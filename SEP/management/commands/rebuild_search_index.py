@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from project.search import get_backend
+
+
+class Command(BaseCommand):
+    help = "Indexes all the projects, raw requests and customers again, e.g. after a bulk import"
+
+    def handle(self, *args, **options):
+        backend = get_backend()
+        start = time.perf_counter()
+
+        with transaction.atomic():
+            backend.install()
+            backend.rebuild()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Search index rebuilt with {type(backend).__name__} in {time.perf_counter() - start:.1f}s."
+        ))
@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from project import counters, workload
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares the task counters of the projects and the workloads of the employees with the tasks, "
+        "then computes them all again in bulk. Run it after writing tasks with bulk_create or QuerySet.update"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--check", action="store_true", help="Only report the rows which drifted")
+        parser.add_argument("--show", type=int, default=10, help="Number of drifted rows to print")
+
+    def handle(self, *args, **options):
+        for label, module in (("project", counters), ("employee", workload)):
+            start = time.perf_counter()
+            drifted = 0
+            for row_id, stored, actual in module.drift():
+                drifted += 1
+                if drifted <= options["show"]:
+                    self.stdout.write(f"{label.capitalize()} {row_id}: counted {stored}, actually {actual}")
+            self.stdout.write(f"{drifted} {label}(s) with drifted counters, checked in {time.perf_counter() - start:.1f}s.")
+
+            if options["check"]:
+                continue
+
+            start = time.perf_counter()
+            total = module.rebuild()
+            self.stdout.write(self.style.SUCCESS(
+                f"Counters of {total} {label}(s) rebuilt in {time.perf_counter() - start:.1f}s."
+            ))
@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from project import rollups
+
+
+class Command(BaseCommand):
+    help = (
+        "Counts again the days of the projects, financial requests and tasks changed since the last refresh in "
+        "the daily rollups. Run it periodically, and with --rebuild now and then to account for deleted rows"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rebuild", action="store_true", help="Compute all the rollups again in bulk")
+
+    def handle(self, *args, **options):
+        for name, rollup in rollups.ROLLUPS.items():
+            start = time.perf_counter()
+            if options["rebuild"]:
+                rollups.rebuild(rollup)
+                days = None
+            else:
+                days = rollups.refresh(rollup)
+
+            done = "rebuilt" if days is None else f"refreshed, {days} day(s) counted again"
+            self.stdout.write(self.style.SUCCESS(
+                f"{name.capitalize()} rollup {done} in {time.perf_counter() - start:.2f}s."
+            ))
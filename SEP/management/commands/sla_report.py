@@ -0,0 +1,45 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from project import sla
+
+
+class Command(BaseCommand):
+    help = (
+        "Refreshes the rollups of the project workflow from the audit log, then prints the time spent in each "
+        "status and the weekly throughput by role. Run it periodically, the SLA dashboard only reads the rollups"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rebuild", action="store_true", help="Aggregate the whole audit log again")
+        parser.add_argument("--weeks", type=int, default=12, help="Number of weeks reported")
+        parser.add_argument("--quiet", action="store_true", help="Only refresh the rollups")
+
+    def handle(self, *args, **options):
+        if options["weeks"] < 1:
+            raise CommandError("--weeks must be at least 1.")
+
+        start = time.perf_counter()
+        events = sla.rebuild() if options["rebuild"] else sla.refresh()
+        self.stdout.write(self.style.SUCCESS(f"{events} event(s) aggregated in {time.perf_counter() - start:.1f}s."))
+
+        if options["quiet"]:
+            return
+
+        start = time.perf_counter()
+        report = sla.report(options["weeks"])
+
+        self.stdout.write(f"\nTime in status since {report['since']}: count, mean, median, p90")
+        for metric, values in report["time_in_status"].items():
+            self.stdout.write(f"  {metric:<25} {values['count']:>8} {values['mean']!s:>20} {values['p50']!s:>20} {values['p90']!s:>20}")
+
+        self.stdout.write("\nQueue depth at the end of each week")
+        for day, depth in report["queue_depth"].items():
+            self.stdout.write(f"  {day} " + ", ".join(f"{status} {count}" for status, count in depth.items() if count))
+
+        self.stdout.write("\nStatus changes by role and week")
+        for week, roles in report["throughput"].items():
+            self.stdout.write(f"  {week} " + ", ".join(f"{role or 'unknown'} {count}" for role, count in roles.items()))
+
+        self.stdout.write(f"\nReported in {time.perf_counter() - start:.3f}s.")
@@ -0,0 +1,20 @@
+# Generated by Django 5.1.15 on 2026-10-18 19:37
+
+import SEP.models
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('SEP', '0002_team_teamtoemployee_team_members'),
+    ]
+
+    operations = [
+        migrations.AlterModelManagers(
+            name='employee',
+            managers=[
+                ('objects', SEP.models.EmployeeManager()),
+            ],
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.1.15 on 2026-10-18 19:52
+
+from django.db import migrations, models
+
+
+def fill_lookup_keys(apps, schema_editor):
+    Customer = apps.get_model("SEP", "Customer")
+
+    customers = Customer.objects.only("email", "phone").order_by("id")
+    batch = []
+    for customer in customers.iterator(chunk_size=2000):
+        # Same normalization as Customer.make_lookup_key
+        customer.lookup_key = f"{customer.email.strip().lower()}|{''.join(c for c in customer.phone if c.isdigit())}"
+        batch.append(customer)
+        if len(batch) == 2000:
+            Customer.objects.bulk_update(batch, ["lookup_key"])
+            batch = []
+    Customer.objects.bulk_update(batch, ["lookup_key"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('SEP', '0003_employee_manager'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customer',
+            name='lookup_key',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=300),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_lookup_keys, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,7 @@
 from django.db import models
-from django.contrib.auth.models import AbstractUser
+from django.db.models.signals import post_delete
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import AbstractUser, UserManager
 
 class Customer(models.Model):
     name = models.CharField(max_length=100)
@@ -7,6 +9,36 @@ class Customer(models.Model):
     phone = models.CharField(max_length=20)
     address = models.TextField()
 
+    # Normalized email & phone, used to recognize a returning customer
+    lookup_key = models.CharField(max_length=300, db_index=True, editable=False)
+
+    @staticmethod
+    def make_lookup_key(email: str, phone: str) -> str:
+        """Lowercased email and the digits of the phone number."""
+
+        return f"{email.strip().lower()}|{''.join(c for c in phone if c.isdigit())}"
+
+    @classmethod
+    def find(cls, email: str, phone: str) -> "Customer | None":
+        """The oldest customer with this email & phone, without creating anything."""
+
+        return cls.objects.filter(lookup_key=cls.make_lookup_key(email, phone)).order_by("id").first()
+
+    @classmethod
+    def from_request(cls, raw_request) -> "Customer":
+        """The customer who sent a raw request, created from its contact details if unknown."""
+
+        return cls.find(raw_request.email, raw_request.phone) or cls.objects.create(
+            name=raw_request.name,
+            email=raw_request.email,
+            phone=raw_request.phone,
+            address=raw_request.address,
+        )
+
+    def save(self, *args, **kwargs):
+        self.lookup_key = self.make_lookup_key(self.email, self.phone)
+        super().save(*args, **kwargs)
+
     def __str__(self) -> str:
         return f"Customer {self.name}"
 
@@ -39,17 +71,61 @@ class Role(models.Model):
         return f"Role {self.name}"
 
 
+DEFAULT_ROLE_ID = "CSE"
+DEFAULT_ROLE_NAME = "Customer Service Employee"
+
+# Default role row, fetched once per process
+_default_role = None
+
+
+def default_role() -> Role:
+    """The role given to the employees created without one, created if needed."""
+
+    global _default_role
+    if _default_role is None:
+        _default_role = Role.objects.get_or_create(id=DEFAULT_ROLE_ID, defaults={"name": DEFAULT_ROLE_NAME})[0]
+    return _default_role
+
+
+def forget_default_role(sender, instance, **kwargs):
+    global _default_role
+    if instance.pk == DEFAULT_ROLE_ID:
+        _default_role = None
+
+
+post_delete.connect(forget_default_role, sender=Role)
+
+
+class EmployeeManager(UserManager):
+    def bulk_import(self, rows, password: str | None = None, batch_size: int = 1000) -> list["Employee"]:
+        """Creates the employees described by `rows` (dicts of field values) without saving them one by one.
+
+            All of them get the same password, hashed once. The existing usernames are skipped
+            and, like `bulk_create`, the instances are returned.
+        """
+
+        password_hash = make_password(password)
+        employees = []
+        for row in rows:
+            employee = self.model(**row)
+            employee.password = password_hash
+            if employee.role_id is None:
+                employee.role_id = default_role().id
+            employees.append(employee)
+
+        return self.bulk_create(employees, batch_size=batch_size, ignore_conflicts=True)
+
+
 class Employee(AbstractUser):
     role = models.ForeignKey("SEP.Role", on_delete=models.CASCADE)
 
+    objects = EmployeeManager()
+
     def save(self, *args, **kwargs):
         """Add a default role if needed."""
 
-        try:
-            if self.role is None:
-                self.role = Role.objects.get_or_create(id="CSE", name="Customer Service Employee")[0]
-        except Role.DoesNotExist:
-            self.role = Role.objects.get_or_create(id="CSE", name="Customer Service Employee")[0]
+        if self.role_id is None:
+            self.role_id = default_role().id
 
         super().save(*args, **kwargs)
 
@@ -0,0 +1,156 @@
+"""Throttling of the public intake form: token buckets and duplicate suppression.
+
+Every client IP and the whole form have a bucket of `capacity` tokens, refilled
+continuously over `period` seconds; a submission takes one token of each. The
+buckets live in the memory of the process, or in a cache shared by the
+processes when `SEP_INTAKE_RATE_LIMIT_CACHE` is set.
+
+Identical submissions received within `SEP_INTAKE_DEDUP_WINDOW` seconds are
+recognized by the hash of their content and only saved once.
+
+The client IP is the address of the connection. Behind a reverse proxy, list
+its addresses or networks in `SEP_RATELIMIT_TRUSTED_PROXIES`: the connections
+from these proxies are attributed to the right-most address of their
+`X-Forwarded-For` header which is not a trusted proxy. The header is ignored
+on the other connections, the clients could otherwise pick their own bucket.
+"""
+
+import hashlib
+import ipaddress
+import json
+import math
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+
+class LocalTokenBuckets:
+    """Token buckets kept in the memory of the process, the least recently used ones are forgotten."""
+
+    def __init__(self, name: str, capacity: int, period: float, max_keys: int = 10_000):
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.max_keys = max_keys
+        self.buckets = OrderedDict()
+        self.lock = threading.Lock()
+
+    def acquire(self, key: str) -> float:
+        """Takes a token from the bucket of `key`, returns 0 or the seconds to wait if it is empty."""
+
+        now = time.monotonic()
+        with self.lock:
+            tokens, updated = self.buckets.pop(key, (self.capacity, now))
+            tokens, wait = take(min(self.capacity, tokens + (now - updated) * self.rate), self.rate)
+            self.buckets[key] = (tokens, now)
+            if len(self.buckets) > self.max_keys:
+                self.buckets.popitem(last=False)
+        return wait
+
+
+class CacheTokenBuckets:
+    """Token buckets stored in a cache shared by the processes.
+
+        The read-modify-write is not atomic: two processes handling the same key at
+        the same instant may both take the last token.
+    """
+
+    def __init__(self, name: str, capacity: int, period: float, cache: str):
+        self.name = name
+        self.capacity = capacity
+        self.rate = capacity / period
+        # An untouched bucket is full again after `period`, it can be forgotten
+        self.timeout = math.ceil(period)
+        self.cache = caches[cache]
+
+    def acquire(self, key: str) -> float:
+        """Takes a token from the bucket of `key`, returns 0 or the seconds to wait if it is empty."""
+
+        now = time.time()
+        cache_key = f"ratelimit:{self.name}:{key}"
+        tokens, updated = self.cache.get(cache_key) or (self.capacity, now)
+        tokens, wait = take(min(self.capacity, tokens + max(now - updated, 0) * self.rate), self.rate)
+        self.cache.set(cache_key, (tokens, now), timeout=self.timeout)
+        return wait
+
+
+def take(tokens: float, rate: float) -> tuple[float, float]:
+    """Takes a token if there is one, returns the tokens left and the seconds to wait for one."""
+
+    if tokens >= 1:
+        return tokens - 1, 0.0
+    return tokens, (1 - tokens) / rate
+
+
+@lru_cache(maxsize=1)
+def intake_buckets() -> dict:
+    """The token buckets of the intake form configured in `SEP_INTAKE_RATE_LIMITS`, by name."""
+
+    cache = settings.SEP_INTAKE_RATE_LIMIT_CACHE
+    return {
+        name: CacheTokenBuckets(name, capacity, period, cache) if cache else LocalTokenBuckets(name, capacity, period)
+        for name, (capacity, period) in settings.SEP_INTAKE_RATE_LIMITS.items()
+    }
+
+
+@lru_cache(maxsize=None)
+def trusted_proxies() -> tuple:
+    """The networks of the proxies configured in `SEP_RATELIMIT_TRUSTED_PROXIES`."""
+
+    return tuple(ipaddress.ip_network(proxy, strict=False) for proxy in settings.SEP_RATELIMIT_TRUSTED_PROXIES)
+
+
+@receiver(setting_changed)
+def reset_buckets(setting, **kwargs):
+    if setting in ("SEP_INTAKE_RATE_LIMITS", "SEP_INTAKE_RATE_LIMIT_CACHE"):
+        intake_buckets.cache_clear()
+    elif setting == "SEP_RATELIMIT_TRUSTED_PROXIES":
+        trusted_proxies.cache_clear()
+
+
+def is_trusted_proxy(address: str) -> bool:
+    try:
+        address = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(address in network for network in trusted_proxies())
+
+
+def client_ip(request) -> str:
+    """The address of the connection, or the one it forwards when it comes from a trusted proxy."""
+
+    address = request.META.get("REMOTE_ADDR", "")
+    if not is_trusted_proxy(address):
+        return address
+    forwarded = [hop.strip() for hop in request.META.get("HTTP_X_FORWARDED_FOR", "").split(",") if hop.strip()]
+    # Each proxy appends the address it received the request from, the left-most ones are the client's word
+    for hop in reversed(forwarded):
+        if not is_trusted_proxy(hop):
+            return hop
+    return forwarded[0] if forwarded else address
+
+
+def intake_retry_after(request) -> float:
+    """Takes a token of the client's bucket and of the global one, returns 0 or the seconds to wait."""
+
+    buckets = intake_buckets()
+    for name, key in (("per_ip", client_ip(request)), ("global", "*")):
+        if name in buckets and (wait := buckets[name].acquire(key)):
+            return wait
+    return 0.0
+
+
+def is_duplicate(data: dict) -> bool:
+    """Whether the same submission was received within the dedup window, remembering it otherwise."""
+
+    normalized = {name: value.strip().lower() if isinstance(value, str) else value for name, value in data.items()}
+    digest = hashlib.blake2b(json.dumps(normalized, sort_keys=True, default=str).encode(), digest_size=16).hexdigest()
+
+    # add() only sets the key if it is missing, atomically on the shared backends
+    cache = caches[settings.SEP_INTAKE_DEDUP_CACHE]
+    return not cache.add(f"intake:dedup:{digest}", 1, timeout=settings.SEP_INTAKE_DEDUP_WINDOW)
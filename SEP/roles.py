@@ -0,0 +1,71 @@
+"""Registry of the roles: the dashboard of each role and the actions its employees may take.
+
+The registry is built once per process, when the module is imported. The role
+code of an employee is the `role_id` column of their own row, so resolving
+their role, or checking an action, is a dictionary lookup: unlike
+`user.role.id`, it never loads the `Role` row.
+"""
+
+from functools import wraps
+from typing import Callable, NamedTuple
+
+from django.core.exceptions import PermissionDenied
+
+from SEP import dashboards
+
+
+class RoleSpec(NamedTuple):
+    """Home page & allowed actions of a role."""
+
+    # Builds the context of the home page from the employee
+    dashboard: Callable[..., dict]
+    # Template of the home page, in `employee/`
+    template: str
+    actions: frozenset[str] = frozenset()
+
+
+PROJECT_MANAGER_ACTIONS = frozenset({"assign_tasks", "request_budget", "request_recruitment", "schedule_meeting"})
+
+ROLES = {
+    "CSE": RoleSpec(dashboards.cse_dashboard, "CSE", frozenset({"create_project", "schedule_meeting"})),
+    "CSM": RoleSpec(dashboards.csm_dashboard, "CSM", frozenset({"create_project", "review_project", "schedule_meeting"})),
+    "FIM": RoleSpec(dashboards.fim_dashboard, "FIM", frozenset({"financial_feedback", "review_financial_request"})),
+    "ADM": RoleSpec(dashboards.adm_dashboard, "ADM", frozenset({"approve_project"})),
+    "PDM": RoleSpec(dashboards.psdm_dashboard, "PSDM", PROJECT_MANAGER_ACTIONS),
+    "SDM": RoleSpec(dashboards.psdm_dashboard, "PSDM", PROJECT_MANAGER_ACTIONS),
+    "PDE": RoleSpec(dashboards.psde_dashboard, "PSDE"),
+    "SDE": RoleSpec(dashboards.psde_dashboard, "PSDE"),
+    "HRM": RoleSpec(dashboards.hrm_dashboard, "HRM", frozenset({"manage_recruitment"})),
+}
+
+
+def role_of(user) -> RoleSpec | None:
+    """The role of an employee, None for an unknown role."""
+
+    return ROLES.get(user.role_id)
+
+
+def allowed(user, action: str) -> bool:
+    """Whether the employee may take the action, the superusers may take them all."""
+
+    if user.is_superuser:
+        return True
+    role = role_of(user)
+    return role is not None and action in role.actions
+
+
+def role_required(action: str):
+    """Decorator of the views taking an action, denied (403) to the employees whose role may not take it.
+
+        Goes under `login_required`, the anonymous users have no role.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if not allowed(request.user, action):
+                raise PermissionDenied
+            return view(request, *args, **kwargs)
+        return wrapper
+
+    return decorator
@@ -0,0 +1,272 @@
+"""Helpers to fill the database with large volumes of synthetic data.
+
+All the rows are inserted with `bulk_create` in batches and generated from a
+seeded random generator, so the same seed always produces the same dataset.
+"""
+
+import contextlib
+import random
+from datetime import timedelta
+from itertools import islice
+
+from django.utils import timezone
+
+from project.models import FinancialRequest, Project, RawRequest, RecruitementPost, Task
+from SEP.models import Customer, Employee, Team, TeamToEmployee
+
+BATCH_SIZE = 5000
+
+# Share of the projects in each status, close to what a running business looks like
+PROJECT_STATUS_WEIGHTS = {
+    "draft": 3,
+    "pending": 4,
+    "cs_approved": 3,
+    "cs_rejected": 5,
+    "fin_review": 3,
+    "admin_approved": 20,
+    "admin_rejected": 7,
+    "completed": 55,
+}
+
+FINANCIAL_REQUEST_STATUS_WEIGHTS = {
+    "pending": 5,
+    "approved": 80,
+    "rejected": 15,
+}
+
+RECRUITMENT_STATUS_WEIGHTS = {
+    "pending": 10,
+    "ongoing": 20,
+    "completed": 70,
+}
+
+# Share of the generated employees in each role
+EMPLOYEE_ROLE_WEIGHTS = {
+    "CSE": 10,
+    "CSM": 1,
+    "FIM": 1,
+    "ADM": 1,
+    "PDE": 40,
+    "PDM": 2,
+    "SDE": 40,
+    "SDM": 2,
+    "HRM": 1,
+}
+
+DEPARTMENTS = [department for department, _ in FinancialRequest.DEPARTEMENT_CHOICES]
+
+# Time span over which the generated projects are created
+HISTORY_SPAN = timedelta(days=5 * 365)
+
+
+def weighted_choices(rng: random.Random, weights: dict, count: int) -> list:
+    """Draws `count` keys of `weights`, proportionally to their weight."""
+
+    return rng.choices(list(weights), weights=list(weights.values()), k=count)
+
+
+def batched(iterable, size: int):
+    """Splits an iterable into lists of at most `size` items."""
+
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+@contextlib.contextmanager
+def override_auto_now(model, *field_names):
+    """Disables `auto_now`/`auto_now_add` on the given fields to insert explicit dates."""
+
+    fields = [model._meta.get_field(name) for name in field_names]
+    saved = [(field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, (auto_now, auto_now_add) in zip(fields, saved):
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def bulk_insert(model, rows, batch_size: int = BATCH_SIZE) -> int:
+    """Inserts the instances yielded by `rows` in batches, returns the number of inserted rows."""
+
+    inserted = 0
+    for batch in batched(rows, batch_size):
+        model.objects.bulk_create(batch, batch_size=batch_size)
+        inserted += len(batch)
+    return inserted
+
+
+def seed_employees(rng: random.Random, count: int, password_hash: str, prefix: str = "seed", start: int = 0) -> int:
+    """Creates `count` employees sharing the same (precomputed) password hash.
+
+        The roles must exist, the usernames are numbered from `start`.
+    """
+
+    roles = weighted_choices(rng, EMPLOYEE_ROLE_WEIGHTS, count)
+
+    return bulk_insert(Employee, (
+        Employee(
+            username=f"{prefix}{i}",
+            first_name=prefix.capitalize(),
+            last_name=str(i),
+            email=f"{prefix}{i}@sep.se",
+            password=password_hash,
+            role_id=role,
+        )
+        for i, role in enumerate(roles, start=start)
+    ))
+
+
+def seed_customers(rng: random.Random, count: int, prefix: str = "seed", start: int = 0) -> list[int]:
+    """Creates `count` customers, returns their ids."""
+
+    first_id = (Customer.objects.order_by("-id").values_list("id", flat=True).first() or 0) + 1
+    def rows():
+        for i in range(start, start + count):
+            email, phone = f"{prefix}.customer{i}@example.com", f"07{rng.randrange(10 ** 8):08d}"
+            yield Customer(
+                name=f"{prefix} customer {i}",
+                email=email,
+                phone=phone,
+                address=f"{rng.randrange(1, 200)} {prefix} street",
+                lookup_key=Customer.make_lookup_key(email, phone),
+            )
+
+    bulk_insert(Customer, rows())
+    return list(Customer.objects.filter(id__gte=first_id).values_list("id", flat=True))
+
+
+def seed_raw_requests(rng: random.Random, count: int, prefix: str = "seed", start: int = 0) -> int:
+    """Creates `count` raw requests, as submitted by the customers on the home page."""
+
+    return bulk_insert(RawRequest, (
+        RawRequest(
+            name=f"{prefix} requester {i}",
+            email=f"{prefix}.requester{i}@example.com",
+            phone=f"07{rng.randrange(10 ** 8):08d}",
+            address=f"{rng.randrange(1, 200)} {prefix} avenue",
+            title=f"{prefix} request {i}",
+            description="Generated request",
+            available=rng.randrange(1000, 200000, 100),
+        )
+        for i in range(start, start + count)
+    ))
+
+
+def seed_teams(rng: random.Random, count: int, manager_ids: list[int], member_ids: list[int], size: int = 5, prefix: str = "seed", start: int = 0) -> int:
+    """Creates `count` teams of `size` members, each managed by one of `manager_ids`."""
+
+    first_id = (Team.objects.order_by("-id").values_list("id", flat=True).first() or 0) + 1
+    bulk_insert(Team, (Team(name=f"{prefix} team {i}", manager_id=rng.choice(manager_ids)) for i in range(start, start + count)))
+    team_ids = Team.objects.filter(id__gte=first_id).values_list("id", flat=True)
+
+    return bulk_insert(TeamToEmployee, (
+        TeamToEmployee(team_id=team_id, employee_id=employee_id, is_chief=position == 0)
+        for team_id in team_ids
+        for position, employee_id in enumerate(rng.sample(member_ids, min(size, len(member_ids))))
+    ))
+
+
+def seed_projects(
+    rng: random.Random,
+    count: int,
+    client_ids: list[int],
+    author_ids: list[int],
+    request_ids: list[int] = (),
+    prefix: str = "seed",
+    start: int = 0,
+) -> int:
+    """Creates `count` projects spread over the last years, with a realistic status distribution.
+
+        The first projects are created from the raw requests of `request_ids`, one each.
+    """
+
+    now = timezone.now()
+    span = int(HISTORY_SPAN.total_seconds())
+    request_ids = iter(request_ids)
+
+    def rows():
+        statuses = weighted_choices(rng, PROJECT_STATUS_WEIGHTS, count)
+        for i, status in enumerate(statuses, start=start):
+            created_at = now - timedelta(seconds=rng.randrange(span))
+            yield Project(
+                title=f"{prefix} project {i}",
+                initial_request_id=next(request_ids, None),
+                description="Generated project",
+                client_id=rng.choice(client_ids),
+                created_by_id=rng.choice(author_ids),
+                status=status,
+                estimated_budget=rng.randrange(1000, 200000, 100),
+                expected_number_of_guests=rng.randrange(10, 1000),
+                created_at=created_at,
+                updated_at=created_at,
+            )
+
+    with override_auto_now(Project, "created_at", "updated_at"):
+        return bulk_insert(Project, rows())
+
+
+def seed_tasks(rng: random.Random, count: int, project_ids: list[int], assignee_ids: list[int], sender_ids: list[int], prefix: str = "seed", start: int = 0) -> int:
+    """Creates `count` tasks, most of them already completed."""
+
+    now = timezone.now()
+
+    def rows():
+        for i in range(start, start + count):
+            completed = rng.random() < 0.8
+            yield Task(
+                project_id=rng.choice(project_ids),
+                assignee_id=rng.choice(assignee_ids),
+                sender_id=rng.choice(sender_ids),
+                completed=completed,
+                completed_at=now - timedelta(seconds=rng.randrange(365 * 24 * 3600)) if completed else None,
+                subject=f"{prefix} task {i}",
+                priority=rng.randrange(4),
+                description="Generated task",
+                due_date=now.date() + timedelta(days=rng.randrange(-365, 90)),
+            )
+
+    return bulk_insert(Task, rows())
+
+
+def seed_financial_requests(rng: random.Random, count: int, project_ids: list[int], prefix: str = "seed") -> int:
+    """Creates `count` financial requests."""
+
+    now = timezone.now()
+    span = int(HISTORY_SPAN.total_seconds())
+
+    def rows():
+        for status in weighted_choices(rng, FINANCIAL_REQUEST_STATUS_WEIGHTS, count):
+            created_at = now - timedelta(seconds=rng.randrange(span))
+            yield FinancialRequest(
+                status=status,
+                requesting_department=rng.choice(DEPARTMENTS),
+                amount=rng.randrange(100, 50000, 50),
+                project_id=rng.choice(project_ids),
+                reason=f"{prefix} financial request",
+                created_at=created_at,
+                updated_at=created_at,
+            )
+
+    with override_auto_now(FinancialRequest, "created_at", "updated_at"):
+        return bulk_insert(FinancialRequest, rows())
+
+
+def seed_recruitment_posts(rng: random.Random, count: int, prefix: str = "seed", start: int = 0) -> int:
+    """Creates `count` recruitment posts."""
+
+    statuses = weighted_choices(rng, RECRUITMENT_STATUS_WEIGHTS, count)
+
+    return bulk_insert(RecruitementPost, (
+        RecruitementPost(
+            status=status,
+            contract_type=rng.choice(("part", "full")),
+            department=rng.choice(DEPARTMENTS),
+            min_years_experience=rng.randrange(10),
+            title=f"{prefix} job {i}",
+            description="Generated job",
+        )
+        for i, status in enumerate(statuses, start=start)
+    ))
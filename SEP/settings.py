@@ -43,6 +43,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Removes itself from the chain unless SEP_METRICS_ENABLED is set
+    'SEP.instrumentation.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -52,8 +54,14 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Per-view query count & latency instrumentation, reported at /employee/metrics
+SEP_METRICS_ENABLED = False
+SEP_METRICS_SAMPLES = 1000
+
 ROOT_URLCONF = 'SEP.urls'
 AUTH_USER_MODEL = "SEP.Employee"
+# Loads the employee of each request with their role
+AUTHENTICATION_BACKENDS = ["SEP.backends.EmployeeBackend"]
 LOGIN_REDIRECT_URL = "/employee/"
 
 TEMPLATES = [
@@ -86,6 +94,48 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Rendered queues of the managers' dashboards, use a shared backend (e.g. redis) with several processes
+    'dashboards': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'dashboards',
+    },
+}
+
+SEP_DASHBOARD_CACHE = 'dashboards'
+SEP_DASHBOARD_CACHE_TIMEOUT = 60 * 60
+
+# Dotted path of the full-text search backend, by default FTS5 on SQLite and a plain scan elsewhere
+SEP_SEARCH_BACKEND = None
+
+# Buffer the requests submitted on the home page in a local spool, drained by `manage.py drain_intake`
+SEP_INTAKE_SPOOL_ENABLED = False
+SEP_INTAKE_SPOOL_PATH = BASE_DIR / 'intake_spool.sqlite3'
+
+# Token buckets throttling the home page form: name -> (burst capacity, seconds to refill it)
+SEP_INTAKE_RATE_LIMITS = {
+    'per_ip': (10, 60),
+    'global': (300, 60),
+}
+# Cache holding the buckets, shared by the processes (e.g. redis), None to keep them in each process
+SEP_INTAKE_RATE_LIMIT_CACHE = None
+# Addresses or networks of the reverse proxies whose X-Forwarded-For header gives the client IP, e.g. ('10.0.0.0/8',)
+SEP_RATELIMIT_TRUSTED_PROXIES = ()
+# Identical submissions received within this number of seconds are only saved once
+SEP_INTAKE_DEDUP_WINDOW = 10 * 60
+SEP_INTAKE_DEDUP_CACHE = 'default'
+
+# Meetings are scheduled on these days (Monday is 0), between these hours of TIME_ZONE
+SEP_MEETING_DAYS = (0, 1, 2, 3, 4)
+SEP_MEETING_HOURS = (9, 18)
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -1,9 +1,21 @@
+import io
 import logging
+import tempfile
+from pathlib import Path
+from unittest import mock
 
-from django.test import TestCase, Client
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, Client, RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.shortcuts import reverse
 
-from SEP.models import Role, Employee
+from SEP import dashboards, instrumentation, ratelimit, roles
+from SEP.backends import EmployeeBackend
+from SEP.models import Role, Employee, Customer
+from project import intake
+from project.models import FinancialRequest, Project, RawRequest, RecruitementPost, Task
 from SEP.test_utils import create_people, create_project, create_request
 
 logger = logging.getLogger(__name__)
@@ -38,3 +50,392 @@ class EmployeeTestCase(TestCase):
 
         self.assertEqual(200, response.status_code)
         self.assertIn(project, response.context["waiting_approval"])
+
+
+class DashboardQueryCountTestCase(TestCase):
+    """Tests that the dashboards issue a fixed number of queries whatever the number of rows."""
+
+    def setUp(self):
+        self.client = Client()
+        create_people()
+
+    def populate(self, count: int):
+        """Creates `count` rows for every queue displayed on the dashboards."""
+
+        customer = Customer.objects.create(name="Client", email="client@test.com", phone="0123456789", address="Street")
+        cse1 = Employee.objects.get(username="cse1")
+        assignee = Employee.objects.get(username="cook1")
+
+        for i in range(count):
+            create_request()
+            RawRequest.objects.create(
+                name=f"Draft {i}", email="draft@test.com", phone="0", address="Street", title="Draft", description="Draft", available=10
+            )
+            Project.objects.create(
+                title=f"Draft {i}", client=customer, created_by=cse1, status="draft",
+                initial_request=RawRequest.objects.filter(title="Draft").last(),
+            )
+
+            for status, _ in Project.STATUS_CHOICES:
+                project = Project.objects.create(title=f"Project {i}", client=customer, created_by=cse1, status=status)
+
+            Task.objects.create(
+                project=project, assignee=assignee, subject=f"Task {i}", description="A task", due_date="2024-12-12"
+            )
+            FinancialRequest.objects.create(requesting_department="prod", amount=100, project=project, reason="Money")
+            RecruitementPost.objects.create(
+                contract_type="full", department="adm", min_years_experience=1, title="Job", description="Job", status="pending"
+            )
+            RecruitementPost.objects.create(
+                contract_type="full", department="adm", min_years_experience=1, title="Job", description="Job", status="ongoing"
+            )
+
+    def count_queries(self, username: str, url_name: str = "employee_home") -> int:
+        self.client.force_login(Employee.objects.get(username=username))
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse(url_name))
+
+        self.assertEqual(200, response.status_code)
+        return len(queries)
+
+    def test_fixed_query_count_per_role(self):
+        """The number of queries of every dashboard does not depend on the number of rows displayed."""
+
+        usernames = ("cse1", "csm1", "fim1", "adm1", "pdm1", "sdm1", "cook1", "hrm1")
+
+        self.populate(1)
+        baseline = {username: self.count_queries(username) for username in usernames}
+
+        self.populate(10)
+        for username in usernames:
+            with self.subTest(username=username):
+                self.assertEqual(baseline[username], self.count_queries(username))
+
+    def test_async_dashboards(self):
+        """The async home page displays the same rows without more queries."""
+
+        self.populate(3)
+
+        for username in ("cse1", "csm1", "fim1", "adm1", "pdm1", "cook1", "hrm1"):
+            with self.subTest(username=username):
+                dashboards.fragment_cache().clear()
+                sync_queries = self.count_queries(username)
+                sync_response = self.client.get(reverse("employee_home"))
+                dashboards.fragment_cache().clear()
+                async_queries = self.count_queries(username, "employee_home_async")
+                async_response = self.client.get(reverse("employee_home_async"))
+
+                self.assertLessEqual(async_queries, sync_queries)
+                self.assertEqual(
+                    sync_response.content.decode().count("<tr>"), async_response.content.decode().count("<tr>")
+                )
+
+
+class DashboardCacheTestCase(TestCase):
+    """Tests the cache of the managers' queues."""
+
+    def setUp(self):
+        self.client = Client()
+        create_people()
+        dashboards.fragment_cache().clear()
+        self.client.force_login(Employee.objects.get(username="csm1"))
+
+    def test_queues_are_cached(self):
+        """The second visit renders the queues from the cache, without querying them."""
+
+        create_project()
+        self.client.get(reverse("employee_home"))
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("employee_home"))
+
+        self.assertContains(response, "Test project")
+        self.assertFalse(any("project_project" in query["sql"] for query in queries))
+        self.assertEqual(1, dashboards.cache_stats()["CSM"]["hits"])
+        self.assertEqual(1, dashboards.cache_stats()["CSM"]["misses"])
+
+    def test_transition_invalidates_queues(self):
+        """Approving a project removes it from the cached queue of the CSM."""
+
+        project = create_project()
+        self.assertContains(self.client.get(reverse("employee_home")), f"/project/{project.id}/csm-action")
+
+        project.transition("cs_approved")
+
+        self.assertNotContains(self.client.get(reverse("employee_home")), f"/project/{project.id}/csm-action")
+        self.assertEqual(2, dashboards.cache_stats()["CSM"]["misses"])
+
+    def test_stats_are_staff_only(self):
+        """Only staff members can read the cache statistics."""
+
+        self.assertEqual(302, self.client.get(reverse("dashboard_cache_stats")).status_code)
+
+        Employee.objects.filter(username="csm1").update(is_staff=True)
+        response = self.client.get(reverse("dashboard_cache_stats"))
+
+        self.assertEqual(200, response.status_code)
+        self.assertIn("CSM", response.json())
+
+
+class MetricsMiddlewareTestCase(TestCase):
+    """Tests the per-view instrumentation."""
+
+    def setUp(self):
+        create_people()
+        instrumentation.metrics.reset()
+
+    @override_settings(SEP_METRICS_ENABLED=True)
+    def test_metrics_are_recorded(self):
+        """The metrics of each request are aggregated by URL name."""
+
+        client = Client()
+        client.force_login(Employee.objects.get(username="csm1"))
+        create_project()
+
+        client.get(reverse("employee_home"))
+        client.get(reverse("employee_home"))
+
+        Employee.objects.filter(username="csm1").update(is_staff=True)
+        report = client.get(reverse("view_metrics")).json()
+
+        self.assertEqual(2, report["employee_home"]["queries"]["count"])
+        self.assertGreater(report["employee_home"]["queries"]["p50"], 0)
+        self.assertGreater(report["employee_home"]["template_ms"]["p50"], 0)
+        self.assertGreaterEqual(report["employee_home"]["total_ms"]["p99"], report["employee_home"]["db_ms"]["p99"])
+
+    def test_disabled_by_default(self):
+        """Nothing is recorded unless the instrumentation is enabled."""
+
+        client = Client()
+        client.get(reverse("home"))
+
+        self.assertEqual({}, instrumentation.metrics.report())
+
+
+class EmployeeImportTestCase(TestCase):
+    """Tests the creation of employees without hidden queries."""
+
+    def setUp(self):
+        create_people()
+
+    def test_save_does_not_fetch_the_role(self):
+        """Saving an employee with a role only inserts it."""
+
+        with self.assertNumQueries(1):
+            Employee(username="new", role_id="PDE").save()
+
+    def test_default_role(self):
+        """The employees created without a role get the default one."""
+
+        Employee(username="first").save()
+
+        with self.assertNumQueries(1):
+            Employee(username="second").save()
+
+        self.assertEqual("CSE", Employee.objects.get(username="second").role_id)
+
+    def test_bulk_import(self):
+        """The import inserts the employees in a few queries and skips the existing ones."""
+
+        rows = [{"username": f"import{i}", "role_id": "SDE" if i % 2 else None} for i in range(200)]
+        rows.append({"username": "cse1"})
+
+        with CaptureQueriesContext(connection) as queries:
+            Employee.objects.bulk_import(rows, password="secret")
+
+        self.assertLess(len(queries), 10)
+        self.assertEqual(200, Employee.objects.filter(username__startswith="import").count())
+        self.assertEqual(100, Employee.objects.filter(username__startswith="import", role_id="CSE").count())
+        self.assertTrue(Employee.objects.get(username="import3").check_password("secret"))
+        self.assertFalse(Employee.objects.get(username="cse1").check_password("secret"))
+
+
+class IntakeSpoolTestCase(TestCase):
+    """Tests the buffered intake of the requests submitted on the home page."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.addCleanup(intake.close)
+
+        settings = override_settings(SEP_INTAKE_SPOOL_ENABLED=True, SEP_INTAKE_SPOOL_PATH=Path(directory.name) / "spool.sqlite3")
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        self.data = {
+            "name": "Customer",
+            "email": "customer@example.com",
+            "phone": "0123456789",
+            "address": "Street",
+            "title": "Spooled request",
+            "description": "A request",
+            "available": 1000,
+        }
+
+    def test_submissions_are_spooled(self):
+        """The home page only writes to the spool, the drain saves the requests in the database."""
+
+        with self.assertNumQueries(0):
+            response = Client().post(reverse("home"), self.data)
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(1, intake.pending())
+        self.assertFalse(RawRequest.objects.exists())
+
+        call_command("drain_intake", "--once", stdout=io.StringIO())
+
+        self.assertEqual(0, intake.pending())
+        self.assertEqual("Spooled request", RawRequest.objects.get().title)
+
+    def test_replayed_batch_is_ignored(self):
+        """A submission drained twice is only saved once."""
+
+        intake.enqueue(self.data)
+        payload = intake.spool().execute("SELECT payload FROM intake").fetchone()[0]
+        intake.drain()
+        intake.spool().execute("INSERT INTO intake (payload, created_at) VALUES (?, 0)", (payload,))
+
+        self.assertEqual(1, intake.drain())
+        self.assertEqual(1, RawRequest.objects.count())
+
+
+@override_settings(SEP_INTAKE_RATE_LIMITS={"per_ip": (2, 60), "global": (3, 60)})
+class RateLimitTestCase(TestCase):
+    """Tests the throttling & duplicate suppression of the home page form."""
+
+    def setUp(self):
+        cache.clear()
+        # Full buckets for every test
+        ratelimit.intake_buckets.cache_clear()
+        self.data = {
+            "name": "Customer",
+            "email": "customer@example.com",
+            "phone": "0123456789",
+            "address": "Street",
+            "title": "Throttled request",
+            "description": "A request",
+            "available": 1000,
+        }
+
+    def submit(self, title: str, ip: str = "10.0.0.1", **headers):
+        return Client(REMOTE_ADDR=ip, **headers).post(reverse("home"), {**self.data, "title": title})
+
+    def test_per_ip_limit(self):
+        """A client submitting too fast is answered 429 with the seconds to wait."""
+
+        self.assertEqual(200, self.submit("First").status_code)
+        self.assertEqual(200, self.submit("Second").status_code)
+        response = self.submit("Third")
+
+        self.assertEqual(429, response.status_code)
+        self.assertEqual("30", response["Retry-After"])
+        self.assertEqual(2, RawRequest.objects.count())
+        # The other clients are not throttled
+        self.assertEqual(200, self.submit("Third", ip="10.0.0.2").status_code)
+
+    def test_global_limit(self):
+        """The form as a whole is throttled, whatever the client."""
+
+        for i in range(3):
+            self.assertEqual(200, self.submit(f"Request {i}", ip=f"10.0.0.{i}").status_code)
+
+        self.assertEqual(429, self.submit("Request 3", ip="10.0.0.3").status_code)
+
+    def test_duplicates_are_saved_once(self):
+        """Resubmitting the same request, up to case & spaces, answers as usual without saving it again."""
+
+        self.assertEqual(200, self.submit("Duplicate").status_code)
+        self.assertEqual(200, self.submit("  duplicate ").status_code)
+
+        self.assertEqual(1, RawRequest.objects.count())
+
+    def test_buckets_refill(self):
+        """The tokens come back continuously over the period of the bucket."""
+
+        buckets = ratelimit.LocalTokenBuckets("test", 2, 60)
+        with mock.patch("time.monotonic", return_value=1000.0):
+            self.assertEqual(0, buckets.acquire("key"))
+            self.assertEqual(0, buckets.acquire("key"))
+            self.assertEqual(30, buckets.acquire("key"))
+        with mock.patch("time.monotonic", return_value=1030.0):
+            self.assertEqual(0, buckets.acquire("key"))
+
+    @override_settings(SEP_RATELIMIT_TRUSTED_PROXIES=("10.0.0.0/24",))
+    def test_trusted_proxies(self):
+        """Only the trusted proxies give the client IP, the right-most untrusted address they forward."""
+
+        def ip(remote: str, forwarded: str | None = None) -> str:
+            meta = {"REMOTE_ADDR": remote}
+            if forwarded is not None:
+                meta["HTTP_X_FORWARDED_FOR"] = forwarded
+            return ratelimit.client_ip(RequestFactory().post("/", **meta))
+
+        self.assertEqual("203.0.113.7", ip("10.0.0.1", "1.2.3.4, 203.0.113.7, 10.0.0.2"))
+        self.assertEqual("10.0.0.1", ip("10.0.0.1"))
+        self.assertEqual("198.51.100.1", ip("198.51.100.1", "203.0.113.7"))
+
+        # Clients behind the proxy get their own bucket, a spoofed header does not escape it
+        self.assertEqual(200, self.submit("First", HTTP_X_FORWARDED_FOR="203.0.113.7").status_code)
+        self.assertEqual(200, self.submit("Second", HTTP_X_FORWARDED_FOR="203.0.113.7").status_code)
+        self.assertEqual(429, self.submit("Third", HTTP_X_FORWARDED_FOR="192.0.2.1, 203.0.113.7").status_code)
+        self.assertEqual(200, self.submit("Third", HTTP_X_FORWARDED_FOR="203.0.113.8").status_code)
+
+    @override_settings(SEP_INTAKE_RATE_LIMIT_CACHE="default")
+    def test_cache_buckets(self):
+        """The buckets can be shared by the processes through a cache."""
+
+        self.assertIsInstance(ratelimit.intake_buckets()["per_ip"], ratelimit.CacheTokenBuckets)
+        self.assertEqual(200, self.submit("First").status_code)
+        self.assertEqual(200, self.submit("Second").status_code)
+        self.assertEqual(429, self.submit("Third").status_code)
+
+
+class RoleTestCase(TestCase):
+    """Tests the registry of the roles and the checks of the actions."""
+
+    def setUp(self):
+        self.client = Client()
+        create_people()
+
+    def test_user_loaded_with_role(self):
+        """The employee of a session comes with their role, the checks of the actions cost no query."""
+
+        cse1 = Employee.objects.get(username="cse1")
+        with self.assertNumQueries(1):
+            user = EmployeeBackend().get_user(cse1.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual("CSE", user.role.id)
+            self.assertTrue(roles.allowed(user, "create_project"))
+            self.assertFalse(roles.allowed(user, "review_project"))
+
+    def test_unknown_role(self):
+        """The employees of a role without a dashboard get an error rather than an empty response."""
+
+        role = Role.objects.create(id="XXX", name="Unknown")
+        self.client.force_login(Employee.objects.create(username="unknown", role=role))
+
+        self.assertEqual(400, self.client.get(reverse("employee_home")).status_code)
+        self.assertEqual(400, self.client.get(reverse("employee_home_async")).status_code)
+        self.assertEqual(403, self.client.get(reverse("project:recruitement_request")).status_code)
+
+    def test_actions_restricted_to_roles(self):
+        """Only the roles allowed to take an action can open its views."""
+
+        project = create_project()
+        url = f"{reverse('project:csm_action', args=[project.id])}?approve=1"
+
+        self.client.force_login(Employee.objects.get(username="cse1"))
+        self.assertEqual(403, self.client.get(url).status_code)
+        project.refresh_from_db()
+        self.assertEqual("pending", project.status)
+
+        self.client.force_login(Employee.objects.get(username="csm1"))
+        self.assertEqual(302, self.client.get(url).status_code)
+        project.refresh_from_db()
+        self.assertEqual("cs_approved", project.status)
+
+    def test_superuser_takes_every_action(self):
+        superuser = Employee.objects.create(username="root", role_id="CSE", is_superuser=True)
+
+        self.assertTrue(all(roles.allowed(superuser, action) for role in roles.ROLES.values() for action in role.actions))
@@ -8,5 +8,8 @@ urlpatterns = [
     path("accounts/", include("django.contrib.auth.urls")),
     path('', views.home, name="home"),
     path('employee/', views.employee_home, name="employee_home"),
+    path('employee/async', views.employee_home_async, name="employee_home_async"),  # Async version of the home page, for ASGI servers
+    path('employee/cache-stats', views.dashboard_cache_stats, name="dashboard_cache_stats"),
+    path('employee/metrics', views.view_metrics, name="view_metrics"),
     path('project/', include("project.urls", namespace="project")),
 ]
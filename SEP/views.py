@@ -1,11 +1,18 @@
+import math
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.core.handlers.asgi import HttpResponseBadRequest
-from django.db.models import Q
+from django.http import JsonResponse
 from django.shortcuts import get_object_or_404, render
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 
+from project import intake
 from project.forms import RawRequestForm
-from project.models import FinancialRequest, RawRequest, Project, Task, RecruitementPost
+from project.models import FinancialRequest, RecruitementPost
+from SEP import dashboards, instrumentation, ratelimit, roles
 
 
 def home(request):
@@ -14,9 +21,22 @@ def home(request):
     if request.method == "POST":
         request_form = RawRequestForm(request.POST)
 
+        retry_after = ratelimit.intake_retry_after(request)
+        if retry_after:
+            messages.error(request, "Too many requests, please try again later.")
+            response = render(request, "index.html", context={"form": request_form}, status=429)
+            response["Retry-After"] = str(math.ceil(retry_after))
+            return response
+
         if request_form.is_valid():
             messages.success(request, "Request submitted successfully.")
-            request_form.save()
+            # A resubmission of the same request is answered as if it was saved again
+            if not ratelimit.is_duplicate(request_form.cleaned_data):
+                if settings.SEP_INTAKE_SPOOL_ENABLED:
+                    # Saved to the main database later on, in batches
+                    intake.enqueue(request_form.cleaned_data)
+                else:
+                    request_form.save()
         else:
             messages.error(request, "Please correct the errors below.")
     else:
@@ -25,81 +45,113 @@ def home(request):
     return render(request, "index.html", context={"form": request_form})
 
 
-@login_required
-def employee_home(request):
-    """Home page for the employees."""
+def review_financial_request(request):
+    """Approves or rejects the financial request posted by the finance manager."""
+
+    # The id is either posted on its own or as the value of the action button
+    fin_request_id = request.POST.get("fin_request_id") or request.POST.get("approve_fin") or request.POST.get("reject_fin")
+    fin_request = get_object_or_404(FinancialRequest.objects.only("status"), id=fin_request_id)
+
+    if "approve_fin" in request.POST:
+        target, success_message = "approved", "Financial request approved."
+    elif "reject_fin" in request.POST:
+        target, success_message = "rejected", "Financial request rejected."
+    else:
+        return HttpResponseBadRequest("Invalid action.")
+
+    if fin_request.transition(target, by=request.user):
+        messages.success(request, success_message)
+    else:
+        messages.error(request, "This financial request has already been processed.")
 
-    context = {}
 
-    if request.user.role.id == "CSE":
-        context["raw_requests"] = RawRequest.objects.filter(Q(project=None) | Q(project__status="draft"))
-        context["project_history"] = Project.objects.filter(created_by=request.user).exclude(status="draft").order_by("-created_at")[:25]
+def manage_recruitment(request):
+    """Starts or completes the recruitment campaign posted by the HR manager."""
 
-        return render(request, "employee/CSE.html", context=context)
-    elif request.user.role.id == "CSM":
-        context["waiting_approval"] = Project.objects.filter(status="pending")
-        context["project_history"] = Project.objects.exclude(status="draft").exclude(status="pending").order_by("-created_at")[:25]
+    # The id is either posted on its own or as the value of the action button
+    recruitment_request_id = (
+        request.POST.get("recruitment_request_id")
+        or request.POST.get("start_campaign")
+        or request.POST.get("complete_campaign")
+    )
+    if not recruitment_request_id:
+        return HttpResponseBadRequest("Invalid request.")
 
-        return render(request, "employee/CSM.html", context=context)
-    elif request.user.role.id == "FIM":
+    project = get_object_or_404(RecruitementPost, id=recruitment_request_id)
 
-        if request.method == "POST":
-            fin_request_id = request.POST.get("fin_request_id")
-            fin_request = get_object_or_404(FinancialRequest, id=fin_request_id)
+    if "start_campaign" in request.POST:
+        project.status = "ongoing"
+        messages.success(request, "Recruitment campaign started successfully.")
+    elif "complete_campaign" in request.POST:
+        project.status = "completed"
+        messages.success(request, "Recruitment campaign completed successfully.")
+    else:
+        return HttpResponseBadRequest("Invalid request.")
 
-            if "approve_fin" in request.POST:
-                fin_request.status = "approved"
-                messages.success(request, "Financial request approved.")
-            elif "reject_fin" in request.POST:
-                fin_request.status = "rejected"
-                messages.success(request, "Financial request rejected.")
-            else:
-                return HttpResponseBadRequest("Invalid action.")
-            fin_request.save()
+    project.save()
 
-        context["waiting_feedback"] = Project.objects.filter(status="cs_approved")
-        context["project_history"] = Project.objects.filter(Q(status="admin_approved") | Q(status="admin_rejected") | Q(status="fin_review")).order_by("-created_at")[:25]
-        context["financial_requests"] = FinancialRequest.objects.filter(status="pending")
 
-        return render(request, "employee/FIM.html", context=context)
+# Action -> handler of the forms posted to the home page, returning a response on error
+HOME_ACTIONS = {
+    "review_financial_request": review_financial_request,
+    "manage_recruitment": manage_recruitment,
+}
 
-    elif request.user.role.id == "ADM":
-        context["waiting_approval"] = Project.objects.filter(status="fin_review")
-        context["project_history"] = Project.objects.filter(Q(status="admin_approved") | Q(status="admin_rejected")).order_by("-created_at")[:25]
 
-        return render(request, "employee/ADM.html", context=context)
-    elif request.user.role.id == "PDM" or request.user.role.id == "SDM":
-        context["projects"] = Project.objects.filter(status="admin_approved").order_by("-created_at")[:25]
+@login_required
+def employee_home(request):
+    """Home page for the employees, the dashboard of their role."""
 
-        return render(request, "employee/PSDM.html", context=context)
+    role = roles.role_of(request.user)
+    if role is None:
+        return HttpResponseBadRequest("Unknown role.")
 
-    elif request.user.role.id == "PDE" or request.user.role.id == "SDE":
-        context["tasks"] = Task.objects.filter(completed=False, assignee=request.user).order_by("due_date")[:25]
-        context["projects"] = Project.objects.filter(status="admin_approved").order_by("-created_at")[:25]
+    if request.method == "POST":
+        for action in role.actions & HOME_ACTIONS.keys():
+            response = HOME_ACTIONS[action](request)
+            if response is not None:
+                return response
+
+    context = role.dashboard(request.user)
+    if request.user.role_id in dashboards.CACHED_FRAGMENTS:
+        context = {**context, "queues": dashboards.cached_fragment(request.user.role_id, context)}
+    return render(request, f"employee/{role.template}.html", context=context)
+
+
+@login_required
+async def employee_home_async(request):
+    """Async version of `employee_home`, the independent queries of a dashboard run concurrently.
+
+        The actions posted by the managers are handled by the synchronous view.
+    """
+
+    if request.method == "POST":
+        return await sync_to_async(employee_home)(request)
+
+    user = await request.auser()
+    role = roles.role_of(user)
+    if role is None:
+        return HttpResponseBadRequest("Unknown role.")
+
+    # The user is already loaded, the lazy one of the context processor would be fetched again
+    context = {**role.dashboard(user), "user": user}
+    if user.role_id in dashboards.CACHED_FRAGMENTS:
+        context = {**context, "queues": await dashboards.acached_fragment(user.role_id, context)}
+    else:
+        context = await dashboards.evaluate(context)
 
-        return render(request, "employee/PSDE.html", context=context)
-    elif request.user.role.id == "HRM":
+    return await sync_to_async(render)(request, f"employee/{role.template}.html", context=context)
 
-        if request.method == "POST":
-            recruitment_request_id = request.POST.get("recruitment_request_id")
-            if recruitment_request_id is None:
-                return HttpResponseBadRequest("Invalid request.")
 
-            project = get_object_or_404(RecruitementPost, id=recruitment_request_id)
+@staff_member_required
+def dashboard_cache_stats(request):
+    """Hit/miss counters of the cached dashboards, to tune the cache."""
 
-            if "start_campaign" in request.POST:
-                project.status = "ongoing"
-                messages.success(request, "Recruitment campaign started successfully.")
-            elif "complete_campaign" in request.POST:
-                project.status = "completed"
-                messages.success(request, "Recruitment campaign completed successfully.")
-            else:
-                return HttpResponseBadRequest("Invalid request.")
+    return JsonResponse(dashboards.cache_stats())
 
-            project.save()
 
-        context["pending_campaigns"] = RecruitementPost.objects.filter(status="pending")
-        context["ongoing_campaigns"] = RecruitementPost.objects.filter(status="ongoing")
+@staff_member_required
+def view_metrics(request):
+    """Percentiles of the query count, DB time, template time and latency of each view."""
 
-        return render(request, "employee/HRM.html", context=context)
-    # TODO add conditions for other employee types
+    return JsonResponse(instrumentation.metrics.report())
@@ -17,7 +17,7 @@ class RawRequestAdmin(admin.ModelAdmin):
 
 @admin.register(Meeting)
 class MeetingAdmin(admin.ModelAdmin):
-    list_display = ("date", "time")
+    list_display = ("date", "time", "duration")
     search_fields = ("date", "time")
 
 @admin.register(Task)
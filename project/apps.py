@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class ProjectConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'project'
+
+    def ready(self):
+        # Connect the signal receivers keeping the audit log, the search index, the task counters, the workloads & the meeting attendances in sync
+        import project.audit  # noqa: F401
+        import project.counters  # noqa: F401
+        import project.scheduling  # noqa: F401
+        import project.search  # noqa: F401
+        import project.workload  # noqa: F401
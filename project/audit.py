@@ -0,0 +1,125 @@
+"""Audit log of the projects: every status change is appended to `ProjectEvent`, with its author.
+
+The transitions of the status workflow record their events from the
+`status_changed` signal, sent inside the transaction of the UPDATE: the status
+and its history cannot disagree, and only the changes allowed by the workflow
+are recorded. Creating a project is the only other write of the status, it
+calls `record_creation`.
+
+The time spent in a status is the time between an event and the next one of
+the same project, computed with the `LEAD` window function over the events
+ordered by the `(project, timestamp)` index: one query, whatever the number of
+projects.
+"""
+
+import datetime
+import math
+from collections import defaultdict
+
+from django.db.models import F, FloatField, Func, QuerySet, Value, Window
+from django.db.models.functions import Coalesce, Lead
+from django.utils import timezone
+
+from project.models import Project, ProjectEvent
+from project.signals import status_changed
+from SEP.seeding import batched
+
+
+def record_creation(project: Project, by=None):
+    """Appends the first event of a project just created, in its initial status."""
+
+    ProjectEvent.objects.create(project=project, target=ProjectEvent.code(project.status), actor=by)
+
+
+def project_transitioned(sender, ids: list[int], target: str, sources: dict | None = None, by=None, **kwargs):
+    if sender is not Project:
+        return
+
+    sources = sources or {}
+    now = timezone.now()
+    ProjectEvent.objects.bulk_create([
+        ProjectEvent(project_id=pk, timestamp=now, source=ProjectEvent.code(sources.get(pk)), target=ProjectEvent.code(target), actor=by)
+        for pk in ids
+    ])
+
+
+status_changed.connect(project_transitioned)
+
+
+class EpochSeconds(Func):
+    """Seconds since the epoch of a datetime, subtracted in SQL where SQLite would call a Python function per row."""
+
+    template = "EXTRACT(EPOCH FROM %(expressions)s)"
+    output_field = FloatField()
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return self.as_sql(compiler, connection, template="((julianday(%(expressions)s) - 2440587.5) * 86400.0)", **extra_context)
+
+    def as_mysql(self, compiler, connection, **extra_context):
+        return self.as_sql(compiler, connection, template="UNIX_TIMESTAMP(%(expressions)s)", **extra_context)
+
+
+def stays(ongoing: bool = False) -> QuerySet:
+    """Every event annotated with the end of the stay it started (`left_at`) and its length in seconds (`seconds`).
+
+        The stays in the current status of the projects end now with `ongoing`, otherwise they have
+        no end nor length.
+    """
+
+    left_at = Window(Lead("timestamp"), partition_by=F("project_id"), order_by=(F("timestamp").asc(), F("id").asc()))
+    if ongoing:
+        left_at = Coalesce(left_at, Value(timezone.now()))
+    return ProjectEvent.objects.annotate(left_at=left_at, seconds=EpochSeconds(left_at) - EpochSeconds("timestamp"))
+
+
+def timeline(project_id: int) -> QuerySet:
+    """The events of a project in order, with the end of each stay, the current one ending now."""
+
+    return stays(ongoing=True).filter(project_id=project_id).select_related("actor").order_by("timestamp", "id")
+
+
+def percentile(values: list, percent: float):
+    """Nearest-rank percentile of sorted values."""
+
+    return values[max(math.ceil(percent / 100 * len(values)) - 1, 0)]
+
+
+def time_in_status(percents=(50, 90, 95), ongoing: bool = False) -> dict[str, dict]:
+    """Number of stays & percentiles of their durations for each status, over all the projects.
+
+        A single window query computes the stays, only their status & duration are read.
+    """
+
+    durations = defaultdict(list)
+    for target, seconds in stays(ongoing).values_list("target", "seconds").iterator(chunk_size=10000):
+        if seconds is not None:
+            durations[target].append(seconds)
+
+    statistics = {}
+    for target, values in sorted(durations.items()):
+        values.sort()
+        statistics[ProjectEvent.STATUSES[target]] = {
+            "count": len(values),
+            **{f"p{percent}": datetime.timedelta(seconds=round(percentile(values, percent))) for percent in percents},
+        }
+    return statistics
+
+
+def backfill(event_model=ProjectEvent, project_model=Project, batch_size: int = 5000) -> int:
+    """Records the current status of every project, since its last update, returns the number of projects.
+
+        Run once when the audit log is created, the history before it being unknown. The models can
+        be given for the migrations.
+    """
+
+    projects = project_model.objects.order_by("pk").values_list("pk", "status", "updated_at")
+
+    total = 0
+    for batch in batched(projects.iterator(chunk_size=batch_size), batch_size):
+        event_model.objects.bulk_create([
+            event_model(project_id=pk, timestamp=updated_at, target=ProjectEvent.code(status))
+            for pk, status, updated_at in batch
+            if status is not None
+        ])
+        total += len(batch)
+    return total
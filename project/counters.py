@@ -0,0 +1,174 @@
+"""Counters of the tasks of each project: open & completed, plus the overdue ones counted when read.
+
+Saving or deleting a task updates the counters of its project with `F()`
+expressions, so listing projects with their task counts does not count the
+tasks of each of them. A task moving to another project, being completed or
+reopened updates the counters of both states.
+
+An open task becomes overdue when its due date passes, without being saved:
+the overdue tasks are not counted incrementally, `overdue_count` counts them
+as of today in a subquery over the open tasks of each project listed.
+
+Tasks written with `bulk_create` or `QuerySet.update` are not counted: run the
+`reconcile_task_counters` command, it recounts everything in bulk.
+"""
+
+from collections import Counter, defaultdict
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.db.models.signals import post_delete, post_save
+from django.utils import timezone
+
+from project.models import ProjectTaskCounts, Task
+from SEP.seeding import batched
+
+FIELDS = ("open", "completed")
+
+
+def state(values: dict) -> tuple:
+    """Project & completion of a task from its tracked fields, as counted."""
+
+    return values["project_id"], values["completed"]
+
+
+def counted(project_id, completed: bool) -> dict:
+    """Counters of a task in this state."""
+
+    return {"open": int(not completed), "completed": int(completed)}
+
+
+def count_aggregates() -> dict:
+    """Aggregates counting the tasks, named `<counter>_count` not to clash with the fields of the tasks."""
+
+    return {
+        "open_count": Count("id", filter=Q(completed=False)),
+        "completed_count": Count("id", filter=Q(completed=True)),
+    }
+
+
+def overdue_count(today=None) -> Coalesce:
+    """Number of open tasks of each project past their due date as of `today`, to annotate projects."""
+
+    overdue = (
+        Task.objects.filter(project=OuterRef("pk"), completed=False, due_date__lt=today or timezone.localdate())
+        .order_by().values("project").annotate(count=Count("id")).values("count")
+    )
+    return Coalesce(Subquery(overdue, output_field=IntegerField()), 0)
+
+
+def recount(project_id: int):
+    """Counts the tasks of a project from scratch, creating its counters if missing."""
+
+    counts = Task.objects.filter(project_id=project_id).aggregate(**count_aggregates())
+    values = {field: counts[f"{field}_count"] for field in FIELDS}
+    if ProjectTaskCounts.objects.filter(project_id=project_id).update(**values):
+        return
+    try:
+        with transaction.atomic():
+            ProjectTaskCounts.objects.create(project_id=project_id, **values)
+    except IntegrityError:  # Created concurrently
+        ProjectTaskCounts.objects.filter(project_id=project_id).update(**values)
+
+
+def apply(changes: dict[int, Counter], create: bool = True):
+    """Adds the changes to the counters of each project.
+
+        Without counters yet, the tasks of the project are counted from scratch, unless `create`
+        is False: a project being deleted with its tasks must not get counters again.
+    """
+
+    for project_id, change in changes.items():
+        expressions = {field: F(field) + change[field] for field in FIELDS if change[field]}
+        if not expressions or project_id is None:
+            continue
+        if not ProjectTaskCounts.objects.filter(project_id=project_id).update(**expressions) and create:
+            recount(project_id)
+
+
+def task_saved(sender, instance: Task, created: bool, **kwargs):
+    new = state(instance.tracked_state())
+    old = state(instance._loaded) if hasattr(instance, "_loaded") else None
+
+    if not created and (old is None or None in old):
+        # Updated without having been loaded (or with deferred fields), the previous state is unknown
+        recount(instance.project_id)
+        return
+
+    changes = defaultdict(Counter)
+    changes[new[0]].update(counted(*new))
+    if old is not None:
+        changes[old[0]].subtract(counted(*old))
+    apply(changes)
+
+
+def task_deleted(sender, instance: Task, **kwargs):
+    project_id, completed = state(getattr(instance, "_loaded", None) or instance.tracked_state())
+
+    changes = defaultdict(Counter)
+    changes[project_id].subtract(counted(project_id, completed))
+    apply(changes, create=False)
+
+
+post_save.connect(task_saved, sender=Task)
+post_delete.connect(task_deleted, sender=Task)
+
+
+def actual_counts(task_model=Task):
+    """The counters as they should be, by project, ordered by project."""
+
+    return (
+        task_model.objects.values("project_id")
+        .annotate(**count_aggregates())
+        .order_by("project_id")
+        .values_list("project_id", *(f"{field}_count" for field in FIELDS))
+    )
+
+
+def rebuild(counts_model=ProjectTaskCounts, task_model=Task, batch_size: int = 5000) -> int:
+    """Replaces all the counters by counting the tasks of every project in bulk, returns the number of projects.
+
+        The models can be given for the migrations.
+    """
+
+    total = 0
+    with transaction.atomic():
+        counts_model.objects.all().delete()
+        for batch in batched(actual_counts(task_model).iterator(chunk_size=batch_size), batch_size):
+            counts_model.objects.bulk_create(
+                [counts_model(project_id=project_id, **dict(zip(FIELDS, values))) for project_id, *values in batch]
+            )
+            total += len(batch)
+    return total
+
+
+def drift():
+    """Yields the projects whose counters differ from their tasks: id, stored counters & actual ones."""
+
+    stored = ProjectTaskCounts.objects.order_by("project_id").values_list("project_id", *FIELDS)
+    return compare(stored.iterator(chunk_size=5000), actual_counts().iterator(chunk_size=5000), FIELDS)
+
+
+def compare(stored, actual, fields):
+    """Yields the differences between two iterables of (id, *values) rows, both ordered by id.
+
+        They are merged as they are read, the memory used is constant. A missing row counts as zeros.
+    """
+
+    zero = (0,) * len(fields)
+    left, right = next(stored, None), next(actual, None)
+
+    while left is not None or right is not None:
+        if right is None or (left is not None and left[0] < right[0]):
+            row_id, left_values, right_values = left[0], left[1:], zero
+            left = next(stored, None)
+        elif left is None or right[0] < left[0]:
+            row_id, left_values, right_values = right[0], zero, right[1:]
+            right = next(actual, None)
+        else:
+            row_id, left_values, right_values = left[0], left[1:], right[1:]
+            left, right = next(stored, None), next(actual, None)
+
+        if left_values != right_values:
+            yield row_id, dict(zip(fields, left_values)), dict(zip(fields, right_values))
@@ -0,0 +1,120 @@
+"""Full extracts of the projects, tasks and financial requests, as CSV or JSON lines.
+
+The rows are read with `values_list(...).iterator()`, a server-side cursor where
+the database has one, and written out chunk by chunk: the memory used does not
+depend on the number of rows exported. The related client, assignee, ... are
+joined in the same query.
+"""
+
+import csv
+import io
+from typing import NamedTuple
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from project.models import FinancialRequest, Project, Task
+
+CHUNK_SIZE = 2000
+
+
+class Export(NamedTuple):
+    """An exportable model: the column names & the lookups of their values."""
+
+    model: type
+    columns: tuple[tuple[str, str], ...]
+
+    def headers(self) -> list[str]:
+        return [header for header, _ in self.columns]
+
+    def rows(self, chunk_size: int = CHUNK_SIZE):
+        lookups = [lookup for _, lookup in self.columns]
+        return self.model.objects.order_by("pk").values_list(*lookups).iterator(chunk_size=chunk_size)
+
+
+EXPORTS = {
+    "projects": Export(Project, (
+        ("id", "id"),
+        ("title", "title"),
+        ("status", "status"),
+        ("client", "client__name"),
+        ("client_email", "client__email"),
+        ("client_phone", "client__phone"),
+        ("estimated_budget", "estimated_budget"),
+        ("from_date", "from_date"),
+        ("to_date", "to_date"),
+        ("expected_number_of_guests", "expected_number_of_guests"),
+        ("created_by", "created_by__username"),
+        ("created_at", "created_at"),
+        ("updated_at", "updated_at"),
+    )),
+    "tasks": Export(Task, (
+        ("id", "id"),
+        ("project_id", "project_id"),
+        ("project", "project__title"),
+        ("subject", "subject"),
+        ("priority", "priority"),
+        ("completed", "completed"),
+        ("due_date", "due_date"),
+        ("assignee", "assignee__username"),
+        ("assignee_role", "assignee__role_id"),
+        ("sender", "sender__username"),
+    )),
+    "financial-requests": Export(FinancialRequest, (
+        ("id", "id"),
+        ("project_id", "project_id"),
+        ("project", "project__title"),
+        ("client", "project__client__name"),
+        ("requesting_department", "requesting_department"),
+        ("amount", "amount"),
+        ("status", "status"),
+        ("reason", "reason"),
+    )),
+}
+
+
+def csv_chunks(export: Export, chunk_size: int = CHUNK_SIZE):
+    """The header then the rows of `export` as CSV text, `chunk_size` rows at a time."""
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(export.headers())
+
+    for count, row in enumerate(export.rows(chunk_size), start=1):
+        writer.writerow(row)
+        if count % chunk_size == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    yield buffer.getvalue()
+
+
+def jsonl_chunks(export: Export, chunk_size: int = CHUNK_SIZE):
+    """The rows of `export` as JSON objects, one per line, `chunk_size` rows at a time."""
+
+    headers = export.headers()
+    encoder = DjangoJSONEncoder()
+    lines = []
+
+    for row in export.rows(chunk_size):
+        lines.append(encoder.encode(dict(zip(headers, row))))
+        if len(lines) == chunk_size:
+            yield "\n".join(lines) + "\n"
+            lines = []
+
+    if lines:
+        yield "\n".join(lines) + "\n"
+
+
+# Format: content type, chunks generator
+FORMATS = {
+    "csv": ("text/csv", csv_chunks),
+    "jsonl": ("application/x-ndjson", jsonl_chunks),
+}
+
+
+def chunks(name: str, format: str, chunk_size: int = CHUNK_SIZE):
+    """The chunks of text of the export `name` in `format`."""
+
+    _, generator = FORMATS[format]
+    return generator(EXPORTS[name], chunk_size)
@@ -0,0 +1,107 @@
+"""Totals of the financial requests: granted, pending & rejected amounts by project and by department.
+
+Every total is computed by a single grouped query with conditional sums, so
+listing the totals of many projects costs one query instead of one per
+project.
+"""
+
+from typing import NamedTuple
+
+from django.db.models import Case, F, IntegerField, OuterRef, Q, QuerySet, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+
+from project.models import FinancialRequest, Project
+
+STATUSES = ("approved", "pending", "rejected")
+
+
+class Totals(NamedTuple):
+    """Amounts of the financial requests of a project, by status, against its estimated budget."""
+
+    approved: int = 0
+    pending: int = 0
+    rejected: int = 0
+    budget: int | None = None
+
+    @property
+    def remaining(self) -> int | None:
+        """Budget left once the approved requests are paid, negative when overrun."""
+
+        return None if self.budget is None else self.budget - self.approved
+
+    @property
+    def over_budget(self) -> bool:
+        return self.budget is not None and self.approved > self.budget
+
+    @property
+    def overrun(self) -> int:
+        """Approved amount above the budget."""
+
+        return max(self.approved - self.budget, 0) if self.budget is not None else 0
+
+
+def status_sums(prefix: str = "") -> dict:
+    """Conditional sums of the amounts by status, `prefix` being the path to the financial requests."""
+
+    return {
+        status: Sum(f"{prefix}amount", filter=Q(**{f"{prefix}status": status}), default=0)
+        for status in STATUSES
+    }
+
+
+def project_totals(project: Project) -> Totals:
+    """Totals of a single project."""
+
+    sums = FinancialRequest.objects.filter(project=project).aggregate(**status_sums())
+    return Totals(**sums, budget=project.estimated_budget)
+
+
+def projects_with_totals(projects: QuerySet | None = None) -> QuerySet:
+    """Annotates projects with their totals by status, in the same query as the projects."""
+
+    projects = Project.objects.all() if projects is None else projects
+    return projects.annotate(**status_sums("financialrequest__"))
+
+
+def over_budget_projects(limit: int = 100) -> QuerySet:
+    """Projects whose approved requests exceed their estimated budget, the largest overruns first, as dicts.
+
+        Grouped from the financial requests: the projects without any request are not scanned.
+    """
+
+    return (
+        FinancialRequest.objects.values("project", "project__title", "project__estimated_budget")
+        .annotate(**status_sums())
+        .annotate(overrun=F("approved") - F("project__estimated_budget"))
+        .filter(overrun__gt=0)
+        .order_by("-overrun")[:limit]
+    )
+
+
+def department_totals() -> QuerySet:
+    """Totals by requesting department, as dicts with the name of the department."""
+
+    return (
+        FinancialRequest.objects.values("requesting_department")
+        .annotate(**status_sums())
+        .annotate(department=Case(
+            *(When(requesting_department=code, then=Value(name)) for code, name in FinancialRequest.DEPARTEMENT_CHOICES),
+            default=F("requesting_department"),
+        ))
+        .order_by("requesting_department")
+    )
+
+
+def granted_to_project() -> Coalesce:
+    """Approved amount of the project of a financial request, to annotate a financial request queryset."""
+
+    return Coalesce(
+        Subquery(
+            FinancialRequest.objects.filter(project=OuterRef("project"), status="approved")
+            .values("project")
+            .annotate(total=Sum("amount"))
+            .values("total"),
+            output_field=IntegerField(),
+        ),
+        Value(0),
+    )
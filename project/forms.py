@@ -1,6 +1,7 @@
 from django import forms
 
-from project.models import RawRequest, Project, Task, RecruitementPost, FinancialRequest
+from project import scheduling, workload
+from project.models import RawRequest, Project, Meeting, Task, RecruitementPost, FinancialRequest
 from SEP.models import Employee
 
 
@@ -53,11 +54,51 @@ class TaskAssignmentForm(forms.ModelForm):
 
     def __init__(self, *args, **kwargs):
        	# Extract the user from the view
-        team = kwargs.pop('team')
+        self.team = kwargs.pop('team')
         super().__init__(*args, **kwargs)
-        # Filter authors related to the logged-in user
 
-        self.fields['assignee'].queryset = team.members.all()
+        # Members of the team, the least loaded first. Without a choice, the least loaded one is assigned
+        assignee = self.fields['assignee']
+        assignee.queryset = workload.ranked_members(self.team)
+        assignee.label_from_instance = lambda member: f"{member} - workload {member.load} ({member.open_tasks} open task(s))"
+        assignee.required = False
+        assignee.empty_label = "Automatic: least loaded member"
+
+    def clean_assignee(self):
+        assignee = self.cleaned_data.get("assignee") or workload.least_loaded(self.team)
+        if assignee is None:
+            raise forms.ValidationError("This team has no member to assign the task to.")
+        return assignee
+
+
+class MeetingForm(forms.ModelForm):
+    """Form to schedule the meeting of a project, refused when a member already has a meeting then."""
+
+    class Meta:
+        model = Meeting
+        fields = ("members", "date", "time", "duration", )
+        widgets = {
+            "date": forms.DateInput(attrs={"type": "date"}),
+            "time": forms.TimeInput(attrs={"type": "time", "step": int(scheduling.SLOT_STEP.total_seconds())}),
+            "duration": forms.NumberInput(attrs={"step": 5}),
+        }
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields["members"].queryset = Employee.objects.select_related("role").order_by("last_name", "first_name")
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if self.errors:
+            return cleaned_data
+
+        members = cleaned_data["members"]
+        meeting = Meeting(date=cleaned_data["date"], time=cleaned_data["time"], duration=cleaned_data["duration"])
+        busy = scheduling.conflicts([member.pk for member in members], meeting.starts_at, meeting.ends_at, exclude=self.instance.pk)
+        if busy:
+            names = ", ".join(str(member) for member in members if member.pk in busy)
+            raise forms.ValidationError(f"Already in a meeting at this time: {names}.")
+        return cleaned_data
 
 
 class RecruitmentRequestForm(forms.ModelForm):
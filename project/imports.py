@@ -0,0 +1,179 @@
+"""Bulk import of raw requests, and of the customers who sent them, from CSV or JSON lines files.
+
+The file is streamed and its rows are validated with the rules of
+`RawRequestForm`, then inserted with `bulk_create`, one transaction per batch.
+The customers are matched on their lookup key and only the unknown ones are
+created. The rejected rows are appended to a CSV report with their errors.
+
+After each batch, the number of the last line read is saved to a checkpoint
+file: an interrupted import started again skips the lines already done. The
+requests are keyed by the hash of their content, so a batch imported again
+after a crash, or a file imported twice, does not create duplicates.
+"""
+
+import csv
+import hashlib
+import json
+from collections.abc import Iterator
+from pathlib import Path
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from project import search
+from project.forms import RawRequestForm
+from project.models import RawRequest
+from SEP.models import Customer
+from SEP.seeding import batched
+
+FORMATS = ("csv", "jsonl")
+
+
+class RowValidator:
+    """The validation of a model form applied to plain rows, without building a form for each of them.
+
+        Every field is cleaned by the form field, then checked by the validators of the model
+        field the form field does not already run, which gives the same errors as the form.
+    """
+
+    def __init__(self, form_class):
+        model_fields = form_class._meta.model._meta
+        self.rules = [
+            (name, field, [validator for validator in model_fields.get_field(name).validators if validator not in field.validators])
+            for name, field in form_class().fields.items()
+        ]
+
+    def clean(self, row: dict) -> tuple[dict, dict]:
+        """The cleaned values & the error messages of `row`, by field."""
+
+        cleaned, errors = {}, {}
+        for name, field, validators in self.rules:
+            try:
+                value = field.clean(row.get(name))
+                for validator in validators:
+                    validator(value)
+                cleaned[name] = value
+            except ValidationError as error:
+                errors[name] = error.messages
+        return cleaned, errors
+
+
+def read_rows(path: Path, format: str, skip: int = 0) -> Iterator[tuple[int, dict | None]]:
+    """The rows of the file with the number of their last line, `None` for a line which is not an object.
+
+        The first `skip` lines are read without being parsed.
+    """
+
+    with path.open(newline="", encoding="utf-8") as file:
+        if format == "csv":
+            reader = csv.DictReader(file)
+            for row in reader:
+                if reader.line_num > skip:
+                    yield reader.line_num, row
+            return
+
+        for number, line in enumerate(file, start=1):
+            if number <= skip or not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError:
+                row = None
+            yield number, row if isinstance(row, dict) else None
+
+
+def content_key(cleaned: dict) -> str:
+    """Hash of the cleaned values of a row, stored as the intake key of its request."""
+
+    return hashlib.blake2b(json.dumps(cleaned, sort_keys=True).encode(), digest_size=16).hexdigest()
+
+
+class Importer:
+    """Imports a file in batches, keeping the counters of the rows imported, skipped & rejected."""
+
+    def __init__(self, path: Path, format: str, rejects: Path, checkpoint: Path, batch_size: int = 5000):
+        self.path = path
+        self.format = format
+        self.rejects = rejects
+        self.checkpoint = checkpoint
+        self.batch_size = batch_size
+        self.validator = RowValidator(RawRequestForm)
+        self.counts = {"imported": 0, "skipped": 0, "rejected": 0, "customers": 0}
+
+    def resume_line(self) -> int:
+        if not self.checkpoint.exists():
+            return 0
+        state = json.loads(self.checkpoint.read_text())
+        self.counts = state["counts"]
+        return state["line"]
+
+    def run(self) -> Iterator[dict]:
+        """Imports the rows after the checkpoint, yields the counters after each batch."""
+
+        for batch in batched(read_rows(self.path, self.format, skip=self.resume_line()), self.batch_size):
+            valid, rejected = [], []
+            for number, row in batch:
+                if row is None:
+                    rejected.append((number, {}, {"__all__": ["Not a JSON object."]}))
+                    continue
+                cleaned, errors = self.validator.clean(row)
+                if errors:
+                    rejected.append((number, row, errors))
+                else:
+                    valid.append(cleaned)
+
+            self.save(valid)
+            self.reject(rejected)
+            self.checkpoint.write_text(json.dumps({"line": batch[-1][0], "counts": self.counts}))
+            yield self.counts
+
+        self.checkpoint.unlink(missing_ok=True)
+
+    @transaction.atomic
+    def save(self, rows: list[dict]):
+        """Creates the requests not imported yet and the customers not known yet."""
+
+        requests = {content_key(row): RawRequest(**row) for row in rows}
+        for key, request in requests.items():
+            request.intake_key = key
+        known = set(RawRequest.objects.filter(intake_key__in=requests).values_list("intake_key", flat=True))
+        new = [request for key, request in requests.items() if key not in known]
+
+        RawRequest.objects.bulk_create(new, ignore_conflicts=True)
+
+        customers = {}
+        for request in new:
+            key = Customer.make_lookup_key(request.email, request.phone)
+            if key not in customers:
+                customers[key] = Customer(
+                    name=request.name, email=request.email, phone=request.phone, address=request.address, lookup_key=key,
+                )
+        for key in Customer.objects.filter(lookup_key__in=customers).values_list("lookup_key", flat=True):
+            customers.pop(key, None)
+        Customer.objects.bulk_create(customers.values())
+
+        # The rows created in bulk are not indexed by the signal receivers
+        keys = [request.intake_key for request in new]
+        search.index_ids(RawRequest, RawRequest.objects.filter(intake_key__in=keys).values_list("id", flat=True))
+        search.index_ids(Customer, [customer.id for customer in customers.values()])
+
+        self.counts["imported"] += len(new)
+        self.counts["skipped"] += len(rows) - len(new)
+        self.counts["customers"] += len(customers)
+
+    def reject(self, rows: list[tuple[int, dict, dict]]):
+        """Appends the rejected rows to the report: their line, errors & values."""
+
+        if not rows:
+            return
+
+        columns = ["line", "errors", *(name for name, _, _ in self.validator.rules)]
+        new_report = not self.rejects.exists() or self.rejects.stat().st_size == 0
+        with self.rejects.open("a", newline="", encoding="utf-8") as file:
+            writer = csv.DictWriter(file, columns, extrasaction="ignore")
+            if new_report:
+                writer.writeheader()
+            for number, row, errors in rows:
+                writer.writerow({**row, "line": number, "errors": json.dumps(errors)})
+
+        self.counts["rejected"] += len(rows)
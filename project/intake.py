@@ -0,0 +1,86 @@
+"""Buffered intake of the raw requests submitted on the public home page.
+
+When `SEP_INTAKE_SPOOL_ENABLED` is set, the validated submissions are appended
+to a local SQLite spool file instead of the main database, so the public form
+answers in constant time even while the main database is busy. The
+`drain_intake` command moves them to the main database in batches.
+
+Every submission gets a unique intake key, stored on the created `RawRequest`:
+a batch replayed after a crash between the insert and the removal from the
+spool is ignored instead of creating duplicates.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.db import transaction
+
+from project import search
+from project.models import RawRequest
+
+# Spool connections of the current thread, by path
+local = threading.local()
+
+
+def spool() -> sqlite3.Connection:
+    path = str(settings.SEP_INTAKE_SPOOL_PATH)
+    connections = local.__dict__.setdefault("connections", {})
+
+    if path not in connections:
+        connection = sqlite3.connect(path, timeout=10, isolation_level=None)
+        connection.execute("PRAGMA journal_mode=WAL")
+        # Every submission is on disk once the customer sees the confirmation
+        connection.execute("PRAGMA synchronous=FULL")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS intake (id INTEGER PRIMARY KEY AUTOINCREMENT, payload TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+        connections[path] = connection
+
+    return connections[path]
+
+
+def close():
+    """Closes the spool connections of the current thread."""
+
+    for connection in local.__dict__.pop("connections", {}).values():
+        connection.close()
+
+
+def enqueue(data: dict) -> str:
+    """Appends the cleaned data of a `RawRequestForm` to the spool, returns its intake key."""
+
+    key = uuid.uuid4().hex
+    spool().execute(
+        "INSERT INTO intake (payload, created_at) VALUES (?, ?)",
+        (json.dumps({**data, "intake_key": key}), time.time()),
+    )
+    return key
+
+
+def pending() -> int:
+    """Number of submissions waiting in the spool."""
+
+    return spool().execute("SELECT count(*) FROM intake").fetchone()[0]
+
+
+def drain(batch_size: int = 500) -> int:
+    """Moves the oldest submissions of the spool to the main database, returns their number."""
+
+    rows = spool().execute("SELECT id, payload FROM intake ORDER BY id LIMIT ?", (batch_size,)).fetchall()
+    if not rows:
+        return 0
+
+    requests = [RawRequest(**json.loads(payload)) for _, payload in rows]
+    with transaction.atomic():
+        RawRequest.objects.bulk_create(requests, ignore_conflicts=True)
+        # The rows created in bulk are not indexed by the signal receivers
+        search.index_instances(RawRequest.objects.filter(intake_key__in=[request.intake_key for request in requests]))
+
+    # Removed only once committed: a crash in between replays the batch, ignored thanks to the intake keys
+    spool().execute("DELETE FROM intake WHERE id <= ?", (rows[-1][0],))
+
+    return len(rows)
@@ -0,0 +1,20 @@
+# Generated by Django 5.1.15 on 2026-10-18 19:24
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('SEP', '0002_team_teamtoemployee_team_members'),
+        ('project', '0008_financialrequest_status'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['created_at', 'id'], name='project_created_id_idx'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.1.15 on 2026-10-18 19:27
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('SEP', '0002_team_teamtoemployee_team_members'),
+        ('project', '0009_project_created_id_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='financialrequest',
+            index=models.Index(fields=['status'], name='finrequest_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['status', '-created_at'], name='project_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['created_by', '-created_at'], name='project_author_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recruitementpost',
+            index=models.Index(fields=['status'], name='recruitment_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(condition=models.Q(('completed', False)), fields=['assignee', 'due_date'], name='task_open_assignee_due_idx'),
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.1.15 on 2026-10-18 20:05
+
+from django.db import migrations
+
+# The FTS5 index of `project.search` as of this migration, frozen here rather than imported. The other
+# databases search without an index, a backend set with SEP_SEARCH_BACKEND is installed by rebuild_search_index
+TABLE = "project_search_index"
+# Kind, code, model, title field & body fields of the documents of each source
+SOURCES = (
+    ("project", 1, ("project", "Project"), "title", ("description",)),
+    ("request", 2, ("project", "RawRequest"), "title", ("description",)),
+    ("customer", 3, ("SEP", "Customer"), "name", ("email",)),
+)
+
+
+def install_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != "sqlite":
+        return
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING fts5("
+            "kind UNINDEXED, object_id UNINDEXED, title, body, "
+            "tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+        )
+        cursor.execute(f"INSERT INTO {TABLE}({TABLE}, rank) VALUES ('rank', 'bm25(0, 0, 10.0, 1.0)')")
+
+        for kind, code, model_name, title_field, body_fields in SOURCES:
+            model = apps.get_model(*model_name)
+            title, *body = [
+                f"coalesce({connection.ops.quote_name(model._meta.get_field(name).column)}, '')"
+                for name in (title_field, *body_fields)
+            ]
+            body = " || ' ' || ".join(body)
+            cursor.execute(
+                f"INSERT INTO {TABLE}(rowid, kind, object_id, title, body) "
+                f"SELECT id * 4 + %s, %s, id, {title}, {body} "
+                f"FROM {connection.ops.quote_name(model._meta.db_table)}",
+                [code, kind],
+            )
+        cursor.execute(f"INSERT INTO {TABLE}({TABLE}) VALUES ('optimize')")
+
+
+def uninstall_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "sqlite":
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('SEP', '0004_customer_lookup_key'),
+        ('project', '0010_workflow_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(install_search_index, uninstall_search_index),
+    ]
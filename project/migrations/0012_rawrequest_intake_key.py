@@ -0,0 +1,18 @@
+# Generated by Django 5.1.15 on 2026-10-18 19:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('project', '0011_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rawrequest',
+            name='intake_key',
+            field=models.CharField(blank=True, editable=False, max_length=32, null=True, unique=True),
+        ),
+    ]
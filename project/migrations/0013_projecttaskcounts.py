@@ -0,0 +1,31 @@
+# Generated by Django 5.1.15 on 2026-10-18 20:20
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def count_tasks(apps, schema_editor):
+    # The same counting as the reconcile_task_counters command, at the time of the migration
+    from project.counters import rebuild
+
+    rebuild(apps.get_model("project", "ProjectTaskCounts"), apps.get_model("project", "Task"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('project', '0012_rawrequest_intake_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProjectTaskCounts',
+            fields=[
+                ('project', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='task_counts', serialize=False, to='project.project')),
+                ('open', models.IntegerField(default=0)),
+                ('completed', models.IntegerField(default=0)),
+                ('overdue', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(count_tasks, migrations.RunPython.noop),
+    ]
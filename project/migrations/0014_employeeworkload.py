@@ -0,0 +1,32 @@
+# Generated by Django 5.1.15 on 2026-10-18 20:40
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def compute_workloads(apps, schema_editor):
+    # The same computation as the reconcile_task_counters command, at the time of the migration
+    from project.workload import rebuild
+
+    rebuild(apps.get_model("project", "EmployeeWorkload"), apps.get_model("project", "Task"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('project', '0013_projecttaskcounts'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmployeeWorkload',
+            fields=[
+                ('employee', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='workload', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('open_tasks', models.IntegerField(default=0)),
+                ('load', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(compute_workloads, migrations.RunPython.noop),
+    ]
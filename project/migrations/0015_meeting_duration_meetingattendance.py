@@ -0,0 +1,44 @@
+# Generated by Django 5.1.15 on 2026-10-18 21:30
+
+import django.core.validators
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def fill_attendances(apps, schema_editor):
+    # The attendances of the meetings existing before the migration
+    from project.scheduling import rebuild
+
+    rebuild(apps.get_model("project", "MeetingAttendance"), apps.get_model("project", "Meeting"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('project', '0014_employeeworkload'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='meeting',
+            name='duration',
+            field=models.PositiveIntegerField(default=60, validators=[django.core.validators.MinValueValidator(5), django.core.validators.MaxValueValidator(480)], verbose_name='Duration (minutes)'),
+        ),
+        migrations.CreateModel(
+            name='MeetingAttendance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('starts_at', models.DateTimeField()),
+                ('ends_at', models.DateTimeField()),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='meeting_attendances', to=settings.AUTH_USER_MODEL)),
+                ('meeting', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendances', to='project.meeting')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['employee', 'starts_at'], name='attendance_employee_start_idx')],
+                'constraints': [models.UniqueConstraint(fields=('meeting', 'employee'), name='attendance_meeting_employee_unique')],
+            },
+        ),
+        migrations.RunPython(fill_attendances, migrations.RunPython.noop),
+    ]
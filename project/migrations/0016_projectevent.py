@@ -0,0 +1,39 @@
+# Generated by Django 5.1.15 on 2026-10-18 22:10
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def record_current_statuses(apps, schema_editor):
+    # The history before the audit log is unknown, only the current statuses are recorded
+    from project.audit import backfill
+
+    backfill(apps.get_model("project", "ProjectEvent"), apps.get_model("project", "Project"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('project', '0015_meeting_duration_meetingattendance'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProjectEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('timestamp', models.DateTimeField(default=django.utils.timezone.now)),
+                ('source', models.PositiveSmallIntegerField(blank=True, choices=[(0, 'DRAFT'), (1, 'PENDING'), (2, 'APPROVED BY CUSTOMER SERVICE'), (3, 'REJECTED BY CUSTOMER SERVICE'), (4, 'REVIEWED BY THE FINANCIAL MANAGER'), (5, 'APPROVED BY THE ADMINISTRATION MANAGER'), (6, 'REJECTED BY THE ADMINISTRATION MANAGER'), (7, 'COMPLETED')], null=True)),
+                ('target', models.PositiveSmallIntegerField(choices=[(0, 'DRAFT'), (1, 'PENDING'), (2, 'APPROVED BY CUSTOMER SERVICE'), (3, 'REJECTED BY CUSTOMER SERVICE'), (4, 'REVIEWED BY THE FINANCIAL MANAGER'), (5, 'APPROVED BY THE ADMINISTRATION MANAGER'), (6, 'REJECTED BY THE ADMINISTRATION MANAGER'), (7, 'COMPLETED')])),
+                ('actor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='events', to='project.project')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['project', 'timestamp'], name='event_project_time_idx')],
+            },
+        ),
+        migrations.RunPython(record_current_statuses, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 5.1.15 on 2026-10-18 22:50
+
+from django.db import migrations, models
+
+STATUS_CODES = [(0, 'DRAFT'), (1, 'PENDING'), (2, 'APPROVED BY CUSTOMER SERVICE'), (3, 'REJECTED BY CUSTOMER SERVICE'), (4, 'REVIEWED BY THE FINANCIAL MANAGER'), (5, 'APPROVED BY THE ADMINISTRATION MANAGER'), (6, 'REJECTED BY THE ADMINISTRATION MANAGER'), (7, 'COMPLETED')]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('project', '0016_projectevent'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupWatermark',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('position', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='StatusFlowRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('status', models.PositiveSmallIntegerField(choices=STATUS_CODES)),
+                ('entered', models.IntegerField(default=0)),
+                ('left', models.IntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('day', 'status'), name='status_flow_day_status_unique')],
+            },
+        ),
+        migrations.CreateModel(
+            name='StayRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('week', models.DateField()),
+                ('metric', models.CharField(max_length=40)),
+                ('bucket', models.PositiveSmallIntegerField()),
+                ('stays', models.IntegerField(default=0)),
+                ('seconds', models.FloatField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('week', 'metric', 'bucket'), name='stay_week_metric_bucket_unique')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ThroughputRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('week', models.DateField()),
+                ('role', models.CharField(blank=True, max_length=3)),
+                ('target', models.PositiveSmallIntegerField(choices=STATUS_CODES)),
+                ('transitions', models.IntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('week', 'role', 'target'), name='throughput_week_role_target_unique')],
+            },
+        ),
+    ]
@@ -0,0 +1,101 @@
+# Generated by Django 5.1.15 on 2026-10-18 23:40
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('SEP', '0001_initial'),
+        ('project', '0017_sla_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='financialrequest',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='financialrequest',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='completed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='rollupwatermark',
+            name='timestamp',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['updated_at'], name='project_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['completed_at'], name='task_completed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['updated_at'], name='task_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='financialrequest',
+            index=models.Index(fields=['created_at'], name='finrequest_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='financialrequest',
+            index=models.Index(fields=['updated_at'], name='finrequest_updated_idx'),
+        ),
+        migrations.CreateModel(
+            name='ProjectDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('status', models.CharField(blank=True, max_length=20, null=True)),
+                ('projects', models.IntegerField(default=0)),
+                ('budget', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['day'], name='project_rollup_day_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='FinancialDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('status', models.CharField(max_length=20)),
+                ('requests', models.IntegerField(default=0)),
+                ('amount', models.BigIntegerField(default=0)),
+                ('client', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='SEP.customer')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['day'], name='financial_rollup_day_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='TaskDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('completed', models.IntegerField(default=0)),
+                ('team', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='SEP.team')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['day'], name='task_rollup_day_idx')],
+            },
+        ),
+    ]
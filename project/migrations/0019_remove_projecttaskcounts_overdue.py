@@ -0,0 +1,18 @@
+# Generated by Django 5.1.15 on 2026-10-18 23:55
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('project', '0018_daily_rollups'),
+    ]
+
+    operations = [
+        # Counted when read, the overdue tasks change with the current day
+        migrations.RemoveField(
+            model_name='projecttaskcounts',
+            name='overdue',
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.1.15 on 2026-10-18 23:58
+
+from django.db import migrations
+
+
+def compute_workloads(apps, schema_editor):
+    # The stored workloads no longer include the weight of the tasks due soon
+    from project.workload import rebuild
+
+    rebuild(apps.get_model("project", "EmployeeWorkload"), apps.get_model("project", "Task"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('project', '0019_remove_projecttaskcounts_overdue'),
+    ]
+
+    operations = [
+        migrations.RunPython(compute_workloads, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,12 @@
+import datetime
+from collections import defaultdict
+
 from django.core import validators
-from django.db import models
+from django.db import models, transaction
 from django.utils import timezone
 
+from project.signals import status_changed
+
 
 class RawRequest(models.Model):
     """A raw request from a client. This needs to be processed by the customer service team."""
@@ -14,21 +19,165 @@ class RawRequest(models.Model):
     description = models.TextField()
     available = models.IntegerField(verbose_name="Available budget", validators=[validators.MinValueValidator(0)])
 
+    # Key of the submission in the intake spool, to ignore the batches drained twice
+    intake_key = models.CharField(max_length=32, unique=True, blank=True, null=True, editable=False)
+
     def __str__(self) -> str:
             return f"Raw Request ({self.name} - {self.title}"
 
 
 class Meeting(models.Model):
+    # Longest meeting allowed, bounds the search of the meetings overlapping a time slot
+    MAX_DURATION = datetime.timedelta(hours=8)
+
     date = models.DateField(verbose_name="Meeting date")
     time = models.TimeField(verbose_name="Meeting time")
+    duration = models.PositiveIntegerField(
+        verbose_name="Duration (minutes)", default=60,
+        validators=[validators.MinValueValidator(5), validators.MaxValueValidator(MAX_DURATION // datetime.timedelta(minutes=1))],
+    )
 
     members = models.ManyToManyField("SEP.Employee", verbose_name="Meeting members (excl. client)")
 
+    @property
+    def starts_at(self) -> datetime.datetime:
+        return timezone.make_aware(datetime.datetime.combine(self.date, self.time))
+
+    @property
+    def ends_at(self) -> datetime.datetime:
+        return self.starts_at + datetime.timedelta(minutes=self.duration)
+
     def __str__(self) -> str:
         return f"Meeting {self.date} - {self.time} ({self.project})"
 
 
-class Project(models.Model):
+class MeetingAttendance(models.Model):
+    """Time slot of a meeting for one of its members, kept in sync with the meetings by `project.scheduling`.
+
+        Indexed by employee & start: the meetings of some employees overlapping a time slot are
+        found by one bounded range scan of the index per employee.
+    """
+
+    meeting = models.ForeignKey("project.Meeting", on_delete=models.CASCADE, related_name="attendances")
+    employee = models.ForeignKey("SEP.Employee", on_delete=models.CASCADE, related_name="meeting_attendances")
+    starts_at = models.DateTimeField()
+    ends_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["employee", "starts_at"], name="attendance_employee_start_idx"),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=["meeting", "employee"], name="attendance_meeting_employee_unique"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.employee} - {self.starts_at} to {self.ends_at}"
+
+
+class StatusWorkflow(models.Model):
+    """Status state machine applying every transition as a single conditional UPDATE.
+
+        The UPDATE only matches the row if it is still in the status it was loaded with, so two
+        concurrent transitions from the same status cannot both succeed, without locking the row.
+    """
+
+    # Allowed status changes, source status -> target statuses
+    TRANSITIONS: dict[str, tuple[str, ...]] = {}
+
+    class Meta:
+        abstract = True
+
+    def can_transition(self, target: str) -> bool:
+        """Whether the workflow allows to go from the current status to `target`."""
+
+        return target in self.TRANSITIONS.get(self.status, ())
+
+    def update_in_status(self, **fields) -> bool:
+        """Updates the given fields, only if the row is still in its current status.
+
+            Returns whether the row was updated, the instance is updated accordingly.
+        """
+
+        if any(field.name == "updated_at" for field in self._meta.concrete_fields):
+            fields.setdefault("updated_at", timezone.now())
+
+        updated = type(self)._default_manager.filter(pk=self.pk, status=self.status).update(**fields)
+
+        if updated:
+            for name, value in fields.items():
+                setattr(self, name, value)
+        return updated == 1
+
+    @classmethod
+    def bulk_transition(cls, ids: list[int], target: str, by=None, **fields) -> dict[int, str]:
+        """Moves every row of `ids` allowed to reach `target` with a set-based UPDATE per source status.
+
+            Returns the outcome for each id: "done", "invalid_status" if the row is not in a
+            status leading to `target` (or left it concurrently), or "not_found". Only the rows
+            actually updated are reported done and signalled. `by` is the employee making the change.
+        """
+
+        sources = [source for source, targets in cls.TRANSITIONS.items() if target in targets]
+        fields = {"status": target, **fields}
+        stamped = any(field.name == "updated_at" for field in cls._meta.concrete_fields)
+        if stamped:
+            # Tells the rows updated by this call from the ones moved to `target` concurrently
+            fields.setdefault("updated_at", timezone.now())
+
+        with transaction.atomic():
+            # The rows are only locked on some databases, the UPDATEs check their status again
+            statuses = dict(cls._default_manager.select_for_update().filter(pk__in=ids).values_list("pk", "status"))
+            by_source = defaultdict(list)
+            for pk, status in statuses.items():
+                if status in sources:
+                    by_source[status].append(pk)
+
+            previous = {}
+            for source, pks in by_source.items():
+                if stamped:
+                    if cls._default_manager.filter(pk__in=pks, status=source).update(**fields) < len(pks):
+                        # Some rows changed status since they were read, the ones updated here carry the stamp
+                        pks = list(cls._default_manager.filter(
+                            pk__in=pks, status=target, updated_at=fields["updated_at"],
+                        ).values_list("pk", flat=True))
+                else:
+                    # Without a stamp to tell them apart, the rows are updated one by one
+                    pks = [pk for pk in pks if cls._default_manager.filter(pk=pk, status=source).update(**fields)]
+                previous.update(dict.fromkeys(pks, source))
+
+            if previous:
+                status_changed.send(sender=cls, ids=list(previous), target=target, sources=previous, by=by)
+
+        results = {}
+        for pk in ids:
+            if pk not in statuses:
+                results[pk] = "not_found"
+            elif pk in previous:
+                results[pk] = "done"
+            else:
+                results[pk] = "invalid_status"
+        return results
+
+    def transition(self, target: str, by=None, **fields) -> bool:
+        """Moves the row to the `target` status, updating the given fields along.
+
+            Returns False if the workflow does not allow the transition or if the status
+            was changed concurrently since the row was loaded. `by` is the employee making the change.
+        """
+
+        if not self.can_transition(target):
+            return False
+
+        source = self.status
+        with transaction.atomic():
+            updated = self.update_in_status(status=target, **fields)
+            if updated:
+                status_changed.send(sender=type(self), ids=[self.pk], target=target, sources={self.pk: source}, by=by)
+        return updated
+
+
+class Project(StatusWorkflow):
     STATUS_CHOICES = [
         ("draft", "DRAFT"),  # Initial state, the CS team Started filling the form
         ("pending", "PENDING"),  # The CS team filled the form from the client request
@@ -40,6 +189,14 @@ class Project(models.Model):
         ("completed", "COMPLETED"),  # The project is done, no more work on it
     ]
 
+    TRANSITIONS = {
+        "draft": ("pending",),
+        "pending": ("cs_approved", "cs_rejected"),
+        "cs_approved": ("fin_review",),
+        "fin_review": ("admin_approved", "admin_rejected"),
+        "admin_approved": ("completed",),
+    }
+
     # Information on the client
     client = models.ForeignKey("SEP.Customer", verbose_name="Project client", blank=True, null=True, on_delete=models.CASCADE)
     initial_request = models.OneToOneField("project.RawRequest", verbose_name="Initial request", blank=True, null=True, on_delete=models.CASCADE)
@@ -66,10 +223,174 @@ class Project(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Keyset pagination of the project list
+            models.Index(fields=["created_at", "id"], name="project_created_id_idx"),
+            # Status queues & histories of the dashboards
+            models.Index(fields=["status", "-created_at"], name="project_status_created_idx"),
+            # History of the projects filled by a CS employee
+            models.Index(fields=["created_by", "-created_at"], name="project_author_created_idx"),
+            # Rows changed since the last refresh of the rollups
+            models.Index(fields=["updated_at"], name="project_updated_idx"),
+        ]
+
     def __str__(self) -> str:
         return f"{self.status} - {self.title}"
 
 
+class ProjectEvent(models.Model):
+    """A status change of a project, appended by `project.audit` in the transaction of the change.
+
+        The events are never updated. The statuses are stored as small integer codes: their index
+        in `STATUSES`, where new statuses must be appended.
+    """
+
+    STATUSES = ("draft", "pending", "cs_approved", "cs_rejected", "fin_review", "admin_approved", "admin_rejected", "completed")
+    STATUS_CODES = [(code, dict(Project.STATUS_CHOICES)[status]) for code, status in enumerate(STATUSES)]
+
+    project = models.ForeignKey("project.Project", on_delete=models.CASCADE, related_name="events")
+    timestamp = models.DateTimeField(default=timezone.now)
+    # None for the first status of a project
+    source = models.PositiveSmallIntegerField(choices=STATUS_CODES, blank=True, null=True)
+    target = models.PositiveSmallIntegerField(choices=STATUS_CODES)
+    actor = models.ForeignKey("SEP.Employee", on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+
+    class Meta:
+        indexes = [
+            # Timeline of a project, and the stays in each status computed over all the projects
+            models.Index(fields=["project", "timestamp"], name="event_project_time_idx"),
+        ]
+
+    @classmethod
+    def code(cls, status: str | None) -> int | None:
+        return None if status is None else cls.STATUSES.index(status)
+
+    @property
+    def source_status(self) -> str | None:
+        return None if self.source is None else self.STATUSES[self.source]
+
+    @property
+    def target_status(self) -> str:
+        return self.STATUSES[self.target]
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("Project events cannot be changed once recorded.")
+        super().save(*args, **kwargs)
+
+    def __str__(self) -> str:
+        return f"{self.timestamp} - {self.source_status} -> {self.target_status}"
+
+
+class RollupWatermark(models.Model):
+    """Position up to which the source rows of a rollup have been aggregated."""
+
+    name = models.CharField(max_length=50, primary_key=True)
+    # Last id, or last `updated_at`, aggregated
+    position = models.BigIntegerField(default=0)
+    timestamp = models.DateTimeField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self) -> str:
+        return f"{self.name} up to {self.position}"
+
+
+class StatusFlowRollup(models.Model):
+    """Number of projects entering & leaving each status each day, aggregated from the audit log by `project.sla`."""
+
+    day = models.DateField()
+    status = models.PositiveSmallIntegerField(choices=ProjectEvent.STATUS_CODES)
+    entered = models.IntegerField(default=0)
+    left = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["day", "status"], name="status_flow_day_status_unique"),
+        ]
+
+
+class StayRollup(models.Model):
+    """Histogram of the time spent in each status, or between two statuses, by week the stays ended.
+
+        The stays of `bucket` b lasted between 2^(b/4) and 2^((b+1)/4) seconds.
+    """
+
+    # Monday of the week
+    week = models.DateField()
+    # A status, or "<status>><status>" for the time between entering the first and the second
+    metric = models.CharField(max_length=40)
+    bucket = models.PositiveSmallIntegerField()
+    stays = models.IntegerField(default=0)
+    seconds = models.FloatField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["week", "metric", "bucket"], name="stay_week_metric_bucket_unique"),
+        ]
+
+
+class ThroughputRollup(models.Model):
+    """Number of status changes made each week by the employees of each role."""
+
+    # Monday of the week
+    week = models.DateField()
+    # Empty for the changes without a known author
+    role = models.CharField(max_length=3, blank=True)
+    target = models.PositiveSmallIntegerField(choices=ProjectEvent.STATUS_CODES)
+    transitions = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["week", "role", "target"], name="throughput_week_role_target_unique"),
+        ]
+
+
+class ProjectDailyRollup(models.Model):
+    """Projects created each day by current status, with their estimated budget, maintained by `project.rollups`."""
+
+    day = models.DateField()
+    status = models.CharField(max_length=20, blank=True, null=True)
+    projects = models.IntegerField(default=0)
+    budget = models.BigIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["day"], name="project_rollup_day_idx"),
+        ]
+
+
+class FinancialDailyRollup(models.Model):
+    """Financial requests made each day by client of their project & current status, maintained by `project.rollups`."""
+
+    day = models.DateField()
+    client = models.ForeignKey("SEP.Customer", on_delete=models.CASCADE, blank=True, null=True, related_name="+")
+    status = models.CharField(max_length=20)
+    requests = models.IntegerField(default=0)
+    amount = models.BigIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["day"], name="financial_rollup_day_idx"),
+        ]
+
+
+class TaskDailyRollup(models.Model):
+    """Tasks completed each day by team of their assignee, maintained by `project.rollups`.
+
+        A task whose assignee is in several teams counts for each of them.
+    """
+
+    day = models.DateField()
+    team = models.ForeignKey("SEP.Team", on_delete=models.CASCADE, blank=True, null=True, related_name="+")
+    completed = models.IntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["day"], name="task_rollup_day_idx"),
+        ]
+
+
 class Task(models.Model):
     project = models.ForeignKey("project.Project", on_delete=models.CASCADE)
     assignee = models.ForeignKey("SEP.Employee", on_delete=models.CASCADE, related_name="tasks")
@@ -83,10 +404,76 @@ class Task(models.Model):
 
     sender = models.ForeignKey("SEP.Employee", on_delete=models.SET_NULL, null=True, blank=True, related_name="task_sent")
 
+    # First completion, kept when the task is reopened
+    completed_at = models.DateTimeField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Open tasks of an employee, by due date. Partial index as `completed=False` is compiled to `NOT completed`
+            models.Index(fields=["assignee", "due_date"], condition=models.Q(completed=False), name="task_open_assignee_due_idx"),
+            # Days of the daily rollups & rows changed since their last refresh
+            models.Index(fields=["completed_at"], name="task_completed_idx"),
+            models.Index(fields=["updated_at"], name="task_updated_idx"),
+        ]
+
+    # Fields counted by the task counters of the projects & the workloads of the employees
+    TRACKED_FIELDS = ("project_id", "assignee_id", "completed", "due_date", "priority")
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # State as loaded, to know which counters a save changes
+        instance._loaded = instance.tracked_state()
+        return instance
+
+    def tracked_state(self) -> dict:
+        """Values of the tracked fields, None for the deferred ones."""
+
+        return {name: self.__dict__.get(name) for name in self.TRACKED_FIELDS}
+
+    def save(self, *args, **kwargs):
+        if self.completed and self.completed_at is None:
+            self.completed_at = timezone.now()
+        super().save(*args, **kwargs)
+        # The post_save receivers have compared the saved state with the loaded one
+        self._loaded = self.tracked_state()
+
     def __str__(self) -> str:
         return f"Task {self.subject} - {self.project}"
 
 
+class ProjectTaskCounts(models.Model):
+    """Number of tasks of a project by state, kept up to date by `project.counters`.
+
+        The overdue tasks depend on the current day, they are counted when read with
+        `counters.overdue_count`.
+    """
+
+    project = models.OneToOneField("project.Project", on_delete=models.CASCADE, primary_key=True, related_name="task_counts")
+    open = models.IntegerField(default=0)
+    completed = models.IntegerField(default=0)
+
+    @property
+    def total(self) -> int:
+        return self.open + self.completed
+
+    def __str__(self) -> str:
+        return f"{self.open}/{self.total} open task(s)"
+
+
+class EmployeeWorkload(models.Model):
+    """Open tasks of an employee and their weighted sum, kept up to date by `project.workload`."""
+
+    employee = models.OneToOneField("SEP.Employee", on_delete=models.CASCADE, primary_key=True, related_name="workload")
+    open_tasks = models.IntegerField(default=0)
+    # Open tasks weighted by priority, how soon they are due is weighed when ranking, see `workload.ranked_members`
+    load = models.IntegerField(default=0)
+
+    def __str__(self) -> str:
+        return f"Workload {self.load} ({self.open_tasks} open task(s))"
+
+
 class RecruitementPost(models.Model):
     STATUS_CHOICES = [
         ("pending", "Pending approval of HR"),
@@ -115,17 +502,26 @@ class RecruitementPost(models.Model):
     title = models.CharField(verbose_name="Job title", max_length=100)
     description = models.TextField(verbose_name="Job description")
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["status"], name="recruitment_status_idx"),
+        ]
+
     def __str__(self) -> str:
         return f"Recruitment Post {self.title} - {self.department}"
 
 
-class FinancialRequest(models.Model):
+class FinancialRequest(StatusWorkflow):
     STATUS_CHOICES = [
         ("pending", "Pending approval of the financial manager"),
         ("approved", "Approved by the financial manager"),
         ("rejected", "Rejected by the financial manager"),
     ]
 
+    TRANSITIONS = {
+        "pending": ("approved", "rejected"),
+    }
+
     DEPARTEMENT_CHOICES = [
         ("adm", "Administration"),
         ("serv", "Services"),
@@ -139,5 +535,16 @@ class FinancialRequest(models.Model):
     project = models.ForeignKey("project.Project", on_delete=models.CASCADE)
     reason = models.TextField(verbose_name="Reason for the request")
 
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status"], name="finrequest_status_idx"),
+            # Days of the daily rollups & rows changed since their last refresh
+            models.Index(fields=["created_at"], name="finrequest_created_idx"),
+            models.Index(fields=["updated_at"], name="finrequest_updated_idx"),
+        ]
+
     def __str__(self) -> str:
         return f"Financial Request {self.amount} - {self.requesting_department}"
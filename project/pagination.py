@@ -0,0 +1,60 @@
+"""Keyset (cursor) pagination on `(created_at, id)`.
+
+Instead of an OFFSET, every page starts right after the last row of the
+previous one, so fetching a page costs the same whatever its depth.
+"""
+
+import base64
+from datetime import datetime
+
+from django.db.models import Q, QuerySet
+
+PAGE_SIZE = 50
+
+
+def encode_cursor(row) -> str:
+    """Encodes the position of a row as an opaque cursor."""
+
+    raw = f"{row.created_at.isoformat()}|{row.pk}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """Decodes a cursor created by `encode_cursor`, raises a ValueError if it is invalid."""
+
+    try:
+        created_at, pk = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), int(pk)
+    except (ValueError, UnicodeError) as e:
+        raise ValueError(f"Invalid cursor {cursor!r}") from e
+
+
+def page_queryset(queryset: QuerySet, cursor: str | None = None, size: int = PAGE_SIZE) -> QuerySet:
+    """The rows following the cursor, plus an extra one to know whether there is a next page."""
+
+    queryset = queryset.order_by("created_at", "id")
+
+    if cursor:
+        created_at, pk = decode_cursor(cursor)
+        queryset = queryset.filter(Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=pk))
+
+    return queryset[:size + 1]
+
+
+def split_page(rows: list, size: int = PAGE_SIZE) -> tuple[list, str | None]:
+    if len(rows) > size:
+        rows = rows[:size]
+        return rows, encode_cursor(rows[-1])
+    return rows, None
+
+
+def keyset_page(queryset: QuerySet, cursor: str | None = None, size: int = PAGE_SIZE) -> tuple[list, str | None]:
+    """Returns the rows following the cursor along with the cursor of the next page (None on the last page)."""
+
+    return split_page(list(page_queryset(queryset, cursor, size)), size)
+
+
+async def akeyset_page(queryset: QuerySet, cursor: str | None = None, size: int = PAGE_SIZE) -> tuple[list, str | None]:
+    """Async version of `keyset_page`, using the async ORM."""
+
+    return split_page([row async for row in page_queryset(queryset, cursor, size)], size)
@@ -0,0 +1,196 @@
+"""Daily rollups of the projects, financial requests and tasks, for the overviews over long periods.
+
+Each rollup counts the rows of a source on the day of one of their dates, by
+dimensions: projects created per day by status, financial requests per day by
+client & status, tasks completed per day by team. Weekly and monthly series
+are summed from the daily rows.
+
+The sources have an `updated_at` column. A refresh finds the rows changed since
+the last one (the watermark), then counts again the days they fall on, with a
+grouped query restricted to these days: changing an old project only costs its
+day. The full rebuild is one `INSERT ... SELECT ... GROUP BY` per rollup.
+
+Deleted rows, and the rows written with `QuerySet.update` without setting
+`updated_at`, are only seen by a rebuild: run `refresh_rollups --rebuild` now
+and then.
+"""
+
+import datetime
+from typing import NamedTuple
+
+from django.db import connection, transaction
+from django.db.models import Count, F, Q, QuerySet, Sum
+from django.db.models.functions import TruncDate, TruncMonth, TruncWeek
+from django.utils import timezone
+
+from project.models import (
+    FinancialDailyRollup, FinancialRequest, Project, ProjectDailyRollup, RollupWatermark, Task, TaskDailyRollup,
+)
+from SEP.seeding import batched
+
+# Rows changed less than this ago are left for the next refresh, their transaction may not be committed yet
+SETTLE = datetime.timedelta(seconds=30)
+PERIODS = {"day": None, "week": TruncWeek, "month": TruncMonth}
+
+
+class Rollup(NamedTuple):
+    """Rows of `source` counted on the day of their `day` field, by dimensions."""
+
+    model: type
+    source: type
+    day: str
+    # Rollup field, lookup in the source
+    dimensions: tuple[tuple[str, str], ...]
+    # Rollup field, aggregate of the source rows
+    measures: tuple[tuple[str, object], ...]
+    condition: Q = Q()
+
+    @property
+    def name(self) -> str:
+        return f"rollup:{self.model._meta.model_name}"
+
+    def fields(self) -> list[str]:
+        return ["day", *(name for name, _ in self.dimensions), *(name for name, _ in self.measures)]
+
+    def aggregated(self, days=None) -> QuerySet:
+        """The rollup rows computed from the source, as tuples in the order of `fields`, only of `days` if given.
+
+            The values are annotated as `<field>_key` & `<field>_total`, not to clash with the fields of the source.
+        """
+
+        rows = self.source.objects.filter(self.condition, **{f"{self.day}__isnull": False})
+        if days is not None:
+            rows = rows.filter(day_ranges(self.day, days))
+        keys = {"day_key": TruncDate(self.day), **{f"{name}_key": F(lookup) for name, lookup in self.dimensions}}
+        totals = {f"{name}_total": aggregate for name, aggregate in self.measures}
+        return rows.annotate(**keys).values_list(*keys).annotate(**totals).order_by()
+
+
+ROLLUPS = {
+    "projects": Rollup(
+        ProjectDailyRollup, Project, "created_at",
+        (("status", "status"),),
+        (("projects", Count("id")), ("budget", Sum("estimated_budget", default=0))),
+    ),
+    "financial-requests": Rollup(
+        FinancialDailyRollup, FinancialRequest, "created_at",
+        (("client_id", "project__client_id"), ("status", "status")),
+        (("requests", Count("id")), ("amount", Sum("amount", default=0))),
+    ),
+    "tasks": Rollup(
+        TaskDailyRollup, Task, "completed_at",
+        (("team_id", "assignee__teamtoemployee__team_id"),),
+        (("completed", Count("id")),),
+        Q(completed=True),
+    ),
+}
+
+
+def day_ranges(field: str, days) -> Q:
+    """Matches the datetimes of `field` falling on one of the days, with a range per run of consecutive days."""
+
+    condition = Q(pk__in=[])
+    for run in runs(sorted(days)):
+        start = timezone.make_aware(datetime.datetime.combine(run[0], datetime.time()))
+        end = timezone.make_aware(datetime.datetime.combine(run[-1] + datetime.timedelta(days=1), datetime.time()))
+        condition |= Q(**{f"{field}__gte": start, f"{field}__lt": end})
+    return condition
+
+
+def runs(days: list[datetime.date]) -> list[list[datetime.date]]:
+    """Sorted days grouped by runs of consecutive days."""
+
+    grouped = []
+    for day in days:
+        if grouped and day - grouped[-1][-1] == datetime.timedelta(days=1):
+            grouped[-1].append(day)
+        else:
+            grouped.append([day])
+    return grouped
+
+
+def rebuild(rollup: Rollup, until: datetime.datetime | None = None):
+    """Replaces all the rows of the rollup with a single INSERT ... SELECT ... GROUP BY."""
+
+    sql, params = rollup.aggregated().query.sql_with_params()
+    columns = ", ".join(connection.ops.quote_name(rollup.model._meta.get_field(name).column) for name in rollup.fields())
+    keys = ", ".join(connection.ops.quote_name(f"{name}_key") for name in ["day", *(name for name, _ in rollup.dimensions)])
+    totals = ", ".join(connection.ops.quote_name(f"{name}_total") for name, _ in rollup.measures)
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        rollup.model.objects.all().delete()
+        cursor.execute(
+            f"INSERT INTO {connection.ops.quote_name(rollup.model._meta.db_table)} ({columns}) "
+            f"SELECT {keys}, {totals} FROM ({sql}) AS aggregated",
+            params,
+        )
+        RollupWatermark.objects.update_or_create(name=rollup.name, defaults={"timestamp": until or timezone.now() - SETTLE})
+
+
+def refresh(rollup: Rollup, until: datetime.datetime | None = None) -> int | None:
+    """Counts again the days of the rows changed since the last refresh, up to `until` (`SETTLE` ago).
+
+        Returns the number of days counted again, None when the rollup had never been built and was rebuilt.
+    """
+
+    until = until or timezone.now() - SETTLE
+    with transaction.atomic():
+        watermark = RollupWatermark.objects.select_for_update().filter(name=rollup.name).first()
+        if watermark is None or watermark.timestamp is None:
+            rebuild(rollup, until)
+            return None
+
+        # Without the condition of the rollup: the rows no longer matching it (e.g. reopened tasks) leave their day
+        changed = rollup.source.objects.filter(updated_at__gt=watermark.timestamp, updated_at__lte=until, **{f"{rollup.day}__isnull": False})
+        days = set(changed.annotate(day_key=TruncDate(rollup.day)).values_list("day_key", flat=True).distinct())
+
+        for batch in batched(sorted(days), 100):
+            rollup.model.objects.filter(day__in=batch).delete()
+            rollup.model.objects.bulk_create(
+                [rollup.model(**dict(zip(rollup.fields(), row))) for row in rollup.aggregated(batch)], batch_size=1000,
+            )
+
+        watermark.timestamp = until
+        watermark.save()
+    return len(days)
+
+
+def series(name: str, period: str = "day", since: datetime.date | None = None, until: datetime.date | None = None, dimensions=None) -> QuerySet:
+    """Totals of a rollup by `period` (day, week or month) & by dimensions (all of them by default), as dicts.
+
+        The periods are named `period`, a week by its Monday and a month by its first day.
+    """
+
+    rollup = ROLLUPS[name]
+    rows = rollup.model.objects.all()
+    if since is not None:
+        rows = rows.filter(day__gte=since)
+    if until is not None:
+        rows = rows.filter(day__lte=until)
+
+    truncate = PERIODS[period]
+    dimensions = [name for name, _ in rollup.dimensions] if dimensions is None else list(dimensions)
+    return (
+        rows.annotate(period=F("day") if truncate is None else truncate("day"))
+        .values("period", *dimensions)
+        .annotate(**{field: Sum(field) for field, _ in rollup.measures})
+        .order_by("period", *dimensions)
+    )
+
+
+def projects_per_day(since: datetime.date | None = None) -> QuerySet:
+    """Projects created per day by status."""
+
+    return series("projects", "day", since)
+
+
+def budget_per_client_per_month(since: datetime.date | None = None) -> QuerySet:
+    """Amounts requested per client per month, whatever the status of the requests."""
+
+    return series("financial-requests", "month", since, dimensions=("client_id",))
+
+
+def tasks_completed_per_team_per_week(since: datetime.date | None = None) -> QuerySet:
+    """Tasks completed per team per week."""
+
+    return series("tasks", "week", since)
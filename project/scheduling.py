@@ -0,0 +1,207 @@
+"""Scheduling of the meetings: conflicts between meetings & the next time slot free for a group of employees.
+
+Every member of a meeting has a `MeetingAttendance` row holding the start and
+the end of the meeting, indexed by employee & start. No meeting lasts longer
+than `Meeting.MAX_DURATION`, so the meetings of an employee overlapping a time
+slot start between the start of the slot minus that duration and its end: one
+range scan of the index per member, whose cost grows with the logarithm of the
+number of meetings rather than with it.
+
+The attendances follow the meetings and their members through signals. The
+ones of meetings written with `QuerySet.update` or `bulk_create` are rebuilt
+by `rebuild`.
+"""
+
+import datetime
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import QuerySet
+from django.db.models.signals import m2m_changed, post_save
+from django.utils import timezone
+
+from project.models import Meeting, MeetingAttendance
+from SEP.models import Employee
+from SEP.seeding import batched
+
+# Meetings start on a quarter of an hour
+SLOT_STEP = datetime.timedelta(minutes=15)
+EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+class SchedulingConflict(Exception):
+    """Some members already have a meeting during the time slot."""
+
+    def __init__(self, conflicts: dict[int, list[int]]):
+        # Ids of the conflicting meetings, by member id
+        self.conflicts = conflicts
+        super().__init__(f"{len(conflicts)} member(s) already have a meeting at this time.")
+
+
+def overlapping(member_ids, starts_at: datetime.datetime, ends_at: datetime.datetime) -> QuerySet:
+    """Attendances of the members overlapping the time slot."""
+
+    return MeetingAttendance.objects.filter(
+        employee__in=member_ids,
+        starts_at__gt=starts_at - Meeting.MAX_DURATION,
+        starts_at__lt=ends_at,
+        ends_at__gt=starts_at,
+    )
+
+
+def conflicts(member_ids, starts_at: datetime.datetime, ends_at: datetime.datetime, exclude: int | None = None) -> dict[int, list[int]]:
+    """Ids of the meetings of each member overlapping the time slot, but `exclude`, by member id."""
+
+    attendances = overlapping(member_ids, starts_at, ends_at)
+    if exclude is not None:
+        attendances = attendances.exclude(meeting_id=exclude)
+
+    found = defaultdict(list)
+    for employee_id, meeting_id in attendances.order_by("employee_id", "starts_at").values_list("employee_id", "meeting_id"):
+        found[employee_id].append(meeting_id)
+    return dict(found)
+
+
+def busy_periods(member_ids, since: datetime.datetime, until: datetime.datetime) -> list[tuple]:
+    """Periods between `since` & `until` where any of the members is in a meeting, disjoint and in order."""
+
+    periods = []
+    for starts_at, ends_at in overlapping(member_ids, since, until).order_by("starts_at").values_list("starts_at", "ends_at"):
+        if periods and starts_at <= periods[-1][1]:
+            periods[-1] = (periods[-1][0], max(periods[-1][1], ends_at))
+        else:
+            periods.append((starts_at, ends_at))
+    return periods
+
+
+def working_hours(day: datetime.date) -> tuple | None:
+    """Opening & closing time of a day for the meetings, None on the days without meetings."""
+
+    if day.weekday() not in settings.SEP_MEETING_DAYS:
+        return None
+    opening, closing = settings.SEP_MEETING_HOURS
+    return (
+        timezone.make_aware(datetime.datetime.combine(day, datetime.time(opening))),
+        timezone.make_aware(datetime.datetime.combine(day, datetime.time(closing))),
+    )
+
+
+def round_up(moment: datetime.datetime) -> datetime.datetime:
+    """The first start of a slot at or after `moment`."""
+
+    remainder = (moment - EPOCH) % SLOT_STEP
+    return moment + (SLOT_STEP - remainder) if remainder else moment
+
+
+def next_free_slot(
+    member_ids, duration: datetime.timedelta, after: datetime.datetime | None = None, horizon: datetime.timedelta = datetime.timedelta(days=30),
+) -> datetime.datetime | None:
+    """Start of the first slot of `duration` after `after` (now) where none of the members has a meeting.
+
+        The slot is within the working hours of a single day. The busy periods of the members
+        until the horizon are read in one query then swept once, None if no slot is free.
+    """
+
+    after = round_up(after or timezone.now())
+    until = after + horizon
+    periods = busy_periods(member_ids, after, until)
+    index = 0
+
+    day = timezone.localdate(after)
+    while day <= timezone.localdate(until):
+        hours = working_hours(day)
+        day += datetime.timedelta(days=1)
+        if hours is None:
+            continue
+
+        candidate = max(after, hours[0])
+        while candidate + duration <= min(hours[1], until):
+            while index < len(periods) and periods[index][1] <= candidate:
+                index += 1
+            if index == len(periods) or periods[index][0] >= candidate + duration:
+                return candidate
+            candidate = round_up(periods[index][1])
+
+    return None
+
+
+@transaction.atomic
+def schedule(member_ids, date: datetime.date, time: datetime.time, duration: int, meeting: Meeting | None = None) -> Meeting:
+    """Creates a meeting of the members, or moves `meeting`, unless one of them has another meeting then.
+
+        The members are locked first, on the databases supporting it, so two overlapping meetings
+        cannot be scheduled for the same member at once. Raises `SchedulingConflict`.
+    """
+
+    member_ids = sorted(set(member_ids))
+    list(Employee.objects.select_for_update().filter(id__in=member_ids).values_list("id", flat=True))
+
+    meeting = meeting or Meeting()
+    meeting.date, meeting.time, meeting.duration = date, time, duration
+    found = conflicts(member_ids, meeting.starts_at, meeting.ends_at, exclude=meeting.pk)
+    if found:
+        raise SchedulingConflict(found)
+
+    meeting.save()
+    meeting.members.set(member_ids)
+    return meeting
+
+
+def attend(meetings, employee_ids) -> list[MeetingAttendance]:
+    """Attendances of the employees to each of the meetings."""
+
+    return [
+        MeetingAttendance(meeting=meeting, employee_id=employee_id, starts_at=meeting.starts_at, ends_at=meeting.ends_at)
+        for meeting in meetings
+        for employee_id in employee_ids
+    ]
+
+
+def meeting_saved(sender, instance: Meeting, created: bool, **kwargs):
+    # A new meeting has no members yet, a moved one moves their attendances
+    if not created:
+        MeetingAttendance.objects.filter(meeting=instance).update(starts_at=instance.starts_at, ends_at=instance.ends_at)
+
+
+def members_changed(sender, instance, action: str, reverse: bool, pk_set: set | None, **kwargs):
+    # `instance` is the meeting, or the employee when changed from `employee.meeting_set`
+    side, other = ("employee", "meeting") if reverse else ("meeting", "employee")
+
+    if action == "post_add":
+        if reverse:
+            MeetingAttendance.objects.bulk_create(attend(Meeting.objects.filter(pk__in=pk_set), [instance.pk]), ignore_conflicts=True)
+        else:
+            MeetingAttendance.objects.bulk_create(attend([instance], pk_set), ignore_conflicts=True)
+    elif action == "post_remove":
+        MeetingAttendance.objects.filter(**{side: instance, f"{other}__in": pk_set}).delete()
+    elif action == "post_clear":
+        MeetingAttendance.objects.filter(**{side: instance}).delete()
+
+
+post_save.connect(meeting_saved, sender=Meeting)
+m2m_changed.connect(members_changed, sender=Meeting.members.through)
+
+
+def rebuild(attendance_model=MeetingAttendance, meeting_model=Meeting, batch_size: int = 5000) -> int:
+    """Replaces all the attendances by those of the members of every meeting, returns their number.
+
+        The models can be given for the migrations.
+    """
+
+    members = meeting_model.members.through.objects.values_list("meeting_id", "employee_id", "meeting__date", "meeting__time", "meeting__duration")
+
+    total = 0
+    with transaction.atomic():
+        attendance_model.objects.all().delete()
+        for batch in batched(members.order_by("pk").iterator(chunk_size=batch_size), batch_size):
+            attendances = []
+            for meeting_id, employee_id, date, time, duration in batch:
+                starts_at = timezone.make_aware(datetime.datetime.combine(date, time))
+                attendances.append(attendance_model(
+                    meeting_id=meeting_id, employee_id=employee_id,
+                    starts_at=starts_at, ends_at=starts_at + datetime.timedelta(minutes=duration),
+                ))
+            attendance_model.objects.bulk_create(attendances)
+            total += len(batch)
+    return total
@@ -0,0 +1,263 @@
+"""Full-text search over the projects, raw requests and customers.
+
+Every searchable row is a document (title + body) of a single search index,
+kept in sync by the signal receivers below. On SQLite the index is an FTS5
+table ranked with BM25; other databases fall back to unranked `icontains`
+lookups until a dedicated backend is configured with `SEP_SEARCH_BACKEND`.
+Rows inserted with `bulk_create` are not indexed, run `rebuild_search_index`.
+"""
+
+import re
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from typing import NamedTuple
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_save
+from django.utils.module_loading import import_string
+
+from project.models import Project, RawRequest
+from SEP.models import Customer
+
+PAGE_SIZE = 20
+# Above this number of matches, the FTS5 backend returns the most recent ones instead of ranking them
+RANKED_MATCHES = 10_000
+
+
+class Source(NamedTuple):
+    """A searchable model: the fields indexed as the title and the body of its documents."""
+
+    model: type
+    code: int
+    title_field: str
+    body_fields: tuple[str, ...]
+
+    def document(self, instance) -> tuple[str, str]:
+        return (
+            getattr(instance, self.title_field) or "",
+            " ".join(getattr(instance, field) or "" for field in self.body_fields),
+        )
+
+
+SOURCES = {
+    "project": Source(Project, 1, "title", ("description",)),
+    "request": Source(RawRequest, 2, "title", ("description",)),
+    "customer": Source(Customer, 3, "name", ("email",)),
+}
+
+
+class Hit(NamedTuple):
+    kind: str
+    object_id: int
+    title: str
+    snippet: str
+
+
+class SearchBackend(ABC):
+    """Keeps the documents of the sources searchable."""
+
+    def install(self):
+        """Creates the storage of the index, if any."""
+
+    def uninstall(self):
+        """Drops the storage of the index, if any."""
+
+    def index(self, kind: str, object_id: int, title: str, body: str):
+        pass
+
+    def remove(self, kind: str, object_id: int):
+        pass
+
+    def rebuild(self):
+        """Indexes all the rows of the sources again."""
+
+    def index_ids(self, kind: str, ids):
+        """Indexes the rows of a source with these ids, e.g. created with `bulk_create`."""
+
+        source = SOURCES[kind]
+        for instance in source.model.objects.filter(id__in=ids):
+            self.index(kind, instance.id, *source.document(instance))
+
+    @abstractmethod
+    def search(self, query: str, kinds=None, offset: int = 0, limit: int = PAGE_SIZE) -> list[Hit]:
+        """A page of the documents matching all the terms of the query, the best first."""
+
+
+class ORMSearchBackend(SearchBackend):
+    """Fallback without an index, the rows are scanned with `icontains` and not ranked."""
+
+    def search(self, query: str, kinds=None, offset: int = 0, limit: int = PAGE_SIZE) -> list[Hit]:
+        terms = tokenize(query)
+        if not terms:
+            return []
+
+        hits = []
+        for kind, source in SOURCES.items():
+            if kinds and kind not in kinds:
+                continue
+
+            condition = Q()
+            for term in terms:
+                condition &= Q(**{f"{source.title_field}__icontains": term}) | Q(
+                    *(Q(**{f"{field}__icontains": term}) for field in source.body_fields), _connector=Q.OR
+                )
+            for instance in source.model.objects.filter(condition).order_by("-id")[:offset + limit]:
+                title, body = source.document(instance)
+                hits.append(Hit(kind, instance.id, title, body[:100]))
+
+        return hits[offset:offset + limit]
+
+
+class SQLiteFTS5Backend(SearchBackend):
+    """FTS5 virtual table, the rowid of a document is derived from its source & id to update it in place."""
+
+    table = "project_search_index"
+
+    def rowid(self, kind: str, object_id: int) -> int:
+        return object_id * 4 + SOURCES[kind].code
+
+    def install(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.table} USING fts5("
+                "kind UNINDEXED, object_id UNINDEXED, title, body, "
+                "tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+            )
+            # Matches in the title weigh more than in the body
+            cursor.execute(f"INSERT INTO {self.table}({self.table}, rank) VALUES ('rank', 'bm25(0, 0, 10.0, 1.0)')")
+
+    def uninstall(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {self.table}")
+
+    def index(self, kind: str, object_id: int, title: str, body: str):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table} WHERE rowid = %s", [self.rowid(kind, object_id)])
+            cursor.execute(
+                f"INSERT INTO {self.table}(rowid, kind, object_id, title, body) VALUES (%s, %s, %s, %s, %s)",
+                [self.rowid(kind, object_id), kind, object_id, title, body],
+            )
+
+    def remove(self, kind: str, object_id: int):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table} WHERE rowid = %s", [self.rowid(kind, object_id)])
+
+    def insert_select(self, cursor, kind: str, where: str = "", params=()):
+        """Indexes the rows of a source matching `where` with a single INSERT ... SELECT."""
+
+        source = SOURCES[kind]
+        fields = [source.model._meta.get_field(name).column for name in (source.title_field, *source.body_fields)]
+        title, *body = [f"coalesce({connection.ops.quote_name(column)}, '')" for column in fields]
+        body = " || ' ' || ".join(body)
+        cursor.execute(
+            f"INSERT INTO {self.table}(rowid, kind, object_id, title, body) "
+            f"SELECT id * 4 + %s, %s, id, {title}, {body} "
+            f"FROM {connection.ops.quote_name(source.model._meta.db_table)} {where}",
+            [source.code, kind, *params],
+        )
+
+    def rebuild(self):
+        """Refills the whole index with one INSERT ... SELECT per source."""
+
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table}")
+            for kind in SOURCES:
+                self.insert_select(cursor, kind)
+            cursor.execute(f"INSERT INTO {self.table}({self.table}) VALUES ('optimize')")
+
+    def index_ids(self, kind: str, ids):
+        ids = list(ids)
+        with connection.cursor() as cursor:
+            # Stays below the limit of variables of the older SQLite versions
+            for start in range(0, len(ids), 900):
+                batch = ids[start:start + 900]
+                placeholders = ", ".join(["%s"] * len(batch))
+                cursor.execute(
+                    f"DELETE FROM {self.table} WHERE rowid IN ({placeholders})",
+                    [self.rowid(kind, object_id) for object_id in batch],
+                )
+                self.insert_select(cursor, kind, f"WHERE id IN ({placeholders})", batch)
+
+    def search(self, query: str, kinds=None, offset: int = 0, limit: int = PAGE_SIZE) -> list[Hit]:
+        # The terms are quoted (no FTS5 syntax from the users), the last one is matched as a prefix
+        terms = tokenize(query)
+        if not terms:
+            return []
+        match = " ".join([*(f'"{term}"' for term in terms[:-1]), f'"{terms[-1]}"*'])
+
+        condition = f"{self.table} MATCH %s"
+        params = [match]
+        if kinds:
+            condition += f" AND kind IN ({', '.join(['%s'] * len(kinds))})"
+            params += list(kinds)
+
+        with connection.cursor() as cursor:
+            # Ranking scores every match, the broad queries list the most recent matches first instead
+            cursor.execute(
+                f"SELECT 1 FROM {self.table} WHERE {condition} LIMIT 1 OFFSET %s",
+                params + [RANKED_MATCHES],
+            )
+            order = "rank" if cursor.fetchone() is None else "rowid DESC"
+
+            cursor.execute(
+                f"SELECT kind, object_id, title, snippet({self.table}, 3, '', '', '…', 12) "
+                f"FROM {self.table} WHERE {condition} ORDER BY {order} LIMIT %s OFFSET %s",
+                params + [limit, offset],
+            )
+            return [Hit(*row) for row in cursor.fetchall()]
+
+
+def tokenize(query: str) -> list[str]:
+    return re.findall(r"\w+", query.lower())
+
+
+@lru_cache(maxsize=1)
+def get_backend() -> SearchBackend:
+    """The backend configured with `SEP_SEARCH_BACKEND`, else the best one for the database."""
+
+    path = getattr(settings, "SEP_SEARCH_BACKEND", None)
+    if path:
+        return import_string(path)()
+    if connection.vendor == "sqlite":
+        return SQLiteFTS5Backend()
+    return ORMSearchBackend()
+
+
+def search(query: str, kinds=None, page: int = 1) -> list[Hit]:
+    """A page of the documents matching all the terms of `query`, best matches first."""
+
+    return get_backend().search(query, kinds, offset=(page - 1) * PAGE_SIZE, limit=PAGE_SIZE)
+
+
+def source_kind(model) -> str:
+    return next(kind for kind, source in SOURCES.items() if source.model is model)
+
+
+def index_instances(instances):
+    """Indexes rows saved without sending the signals, e.g. created with `bulk_create`."""
+
+    backend = get_backend()
+    for instance in instances:
+        kind = source_kind(type(instance))
+        backend.index(kind, instance.id, *SOURCES[kind].document(instance))
+
+
+def index_ids(model, ids):
+    """Indexes the rows of `model` with these ids, in bulk."""
+
+    get_backend().index_ids(source_kind(model), ids)
+
+
+def index_instance(sender, instance, **kwargs):
+    index_instances([instance])
+
+
+def remove_instance(sender, instance, **kwargs):
+    get_backend().remove(source_kind(sender), instance.id)
+
+
+for source in SOURCES.values():
+    post_save.connect(index_instance, sender=source.model)
+    post_delete.connect(remove_instance, sender=source.model)
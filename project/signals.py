@@ -0,0 +1,8 @@
+from django.dispatch import Signal
+
+# Sent once a status workflow transition has been written, with the arguments:
+#   ids: primary keys of the rows that changed status
+#   target: their new status
+#   sources: their previous status, by primary key
+#   by: the employee who made the change, None if unknown
+status_changed = Signal()
@@ -0,0 +1,262 @@
+"""Service level reports of the project workflow: queue depth, time in each status & throughput.
+
+The reports read rollup tables aggregated from the audit log rather than the
+events themselves, so a report over years of history sums a few thousand rows:
+
+- `StatusFlowRollup`: projects entering & leaving each status each day, from
+  which the depth of each queue at any day is a running sum.
+- `StayRollup`: weekly histograms of the time spent in each status and
+  between the `SPANS`, in logarithmic buckets: the percentiles are estimated
+  within 10%, the means are exact.
+- `ThroughputRollup`: status changes made each week by each role.
+
+The events are appended in id order, the rollups are refreshed from the last
+event aggregated (the watermark) with grouped queries over the new events
+only. A refresh stops before the first event of the last `SETTLE`, with the
+ones after it: a transaction still writing some may not be committed yet.
+"""
+
+import datetime
+import math
+from collections import Counter, defaultdict
+from itertools import groupby
+
+from django.db import transaction
+from django.db.models import Count, F, Max, Min, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from project.models import ProjectEvent, RollupWatermark, StatusFlowRollup, StayRollup, ThroughputRollup
+
+WATERMARK = "sla"
+SETTLE = datetime.timedelta(seconds=30)
+# Time between entering the first status and the second one, measured for each project
+SPANS = (("pending", "admin_approved"),)
+# Buckets per doubling of the duration in the stays histograms
+BUCKETS_PER_OCTAVE = 4
+
+
+def week_of(day: datetime.date) -> datetime.date:
+    """Monday of the week of a day."""
+
+    return day - datetime.timedelta(days=day.weekday())
+
+
+def bucket(seconds: float) -> int:
+    return max(math.floor(BUCKETS_PER_OCTAVE * math.log2(seconds)), 0) if seconds >= 1 else 0
+
+
+def bucket_seconds(index: int) -> float:
+    """Representative duration of a bucket, its geometric middle."""
+
+    return 2 ** ((index + 0.5) / BUCKETS_PER_OCTAVE)
+
+
+def accumulate(model, keys: tuple[str, ...], values: dict[tuple, Counter]):
+    """Adds the values to the rollup rows of their keys, creating the missing ones.
+
+        The new totals are written with a single upsert on the unique keys, `bulk_update` building
+        a CASE per row is much slower.
+    """
+
+    if not values:
+        return
+
+    fields = sorted({field for change in values.values() for field in change})
+    existing = model.objects.filter(**{f"{keys[0]}__in": {key[0] for key in values}}).values_list(*keys, *fields)
+    current = {row[:len(keys)]: row[len(keys):] for row in existing}
+
+    rows = []
+    for key, change in values.items():
+        totals = dict(zip(fields, current.get(key, (0,) * len(fields))))
+        for field, value in change.items():
+            totals[field] += value
+        rows.append(model(**dict(zip(keys, key)), **totals))
+
+    model.objects.bulk_create(rows, batch_size=1000, update_conflicts=True, unique_fields=keys, update_fields=fields)
+
+
+def aggregate_flows(events):
+    flows = defaultdict(Counter)
+    for day, status, entered in events.annotate(day=TruncDate("timestamp")).values_list("day", "target").annotate(Count("id")):
+        flows[day, status]["entered"] += entered
+    for day, status, left in events.filter(source__isnull=False).annotate(day=TruncDate("timestamp")).values_list("day", "source").annotate(Count("id")):
+        flows[day, status]["left"] += left
+    accumulate(StatusFlowRollup, ("day", "status"), flows)
+
+
+def aggregate_throughput(events):
+    changes = defaultdict(Counter)
+    rows = events.annotate(day=TruncDate("timestamp")).values_list("day", "actor__role_id", "target").annotate(Count("id"))
+    for day, role, target, transitions in rows:
+        changes[week_of(day), role or "", target]["transitions"] += transitions
+    accumulate(ThroughputRollup, ("week", "role", "target"), changes)
+
+
+def aggregate_stays(first: int, last: int):
+    """Aggregates the stays ended by the events `first` to `last`, reading the events of their projects in order."""
+
+    projects = ProjectEvent.objects.filter(id__gte=first, id__lte=last).values("project_id")
+    events = (
+        ProjectEvent.objects.filter(project_id__in=projects)
+        .order_by("project_id", "timestamp", "id")
+        .values_list("project_id", "id", "target", "timestamp")
+    )
+
+    stays = defaultdict(Counter)
+    zone = timezone.get_current_timezone()
+
+    def add(timestamp, metric: str, seconds: float):
+        key = (week_of(timestamp.astimezone(zone).date()), metric, bucket(seconds))
+        stays[key]["stays"] += 1
+        stays[key]["seconds"] += seconds
+
+    for _, history in groupby(events.iterator(chunk_size=10000), key=lambda row: row[0]):
+        previous, entered = None, {}
+        for _, event_id, target, timestamp in history:
+            status = ProjectEvent.STATUSES[target]
+            if first <= event_id <= last:
+                if previous is not None:
+                    add(timestamp, ProjectEvent.STATUSES[previous[0]], (timestamp - previous[1]).total_seconds())
+                for start, end in SPANS:
+                    if status == end and start in entered and end not in entered:
+                        add(timestamp, f"{start}>{end}", (timestamp - entered[start]).total_seconds())
+            entered.setdefault(status, timestamp)
+            previous = (target, timestamp)
+
+    accumulate(StayRollup, ("week", "metric", "bucket"), stays)
+
+
+def refresh(until: datetime.datetime | None = None, batch_size: int = 100_000) -> int:
+    """Aggregates the events recorded since the last refresh, up to `until` (`SETTLE` ago), returns their number.
+
+        The events are aggregated `batch_size` at a time, one transaction each.
+    """
+
+    until = until or timezone.now() - SETTLE
+    total = 0
+    while True:
+        with transaction.atomic():
+            watermark = RollupWatermark.objects.select_for_update().get_or_create(name=WATERMARK)[0]
+            pending = ProjectEvent.objects.filter(id__gt=watermark.position)
+            # The watermark is an id: stop before the first event not settled yet, or it would be skipped for good
+            unsettled = pending.filter(timestamp__gt=until).aggregate(first=Min("id"))["first"]
+            if unsettled is not None:
+                pending = pending.filter(id__lt=unsettled)
+            boundary = list(pending.order_by("id").values_list("id", flat=True)[batch_size - 1:batch_size])
+            last = boundary[0] if boundary else pending.aggregate(last=Max("id"))["last"]
+            if last is None:
+                return total
+
+            events = ProjectEvent.objects.filter(id__gt=watermark.position, id__lte=last)
+            aggregate_flows(events)
+            aggregate_throughput(events)
+            aggregate_stays(watermark.position + 1, last)
+            total += events.count()
+
+            watermark.position = last
+            watermark.save()
+
+
+def rebuild(batch_size: int = 100_000) -> int:
+    """Aggregates the whole audit log again, returns the number of events."""
+
+    with transaction.atomic():
+        for model in (StatusFlowRollup, StayRollup, ThroughputRollup):
+            model.objects.all().delete()
+        RollupWatermark.objects.filter(name=WATERMARK).delete()
+        return refresh(batch_size=batch_size)
+
+
+def percentile(histogram: list[tuple[int, int]], percent: float) -> datetime.timedelta:
+    """Nearest-rank percentile estimated from the (bucket, stays) of a histogram, in order."""
+
+    rank = math.ceil(percent / 100 * sum(stays for _, stays in histogram))
+    cumulated = 0
+    for index, stays in histogram:
+        cumulated += stays
+        if cumulated >= max(rank, 1):
+            return datetime.timedelta(seconds=round(bucket_seconds(index)))
+    return datetime.timedelta(0)
+
+
+def time_in_status(since: datetime.date | None = None, percents=(50, 90)) -> dict[str, dict]:
+    """Number, mean & percentiles of the stays in each status (and of the spans) ended since a day."""
+
+    rollups = StayRollup.objects.all()
+    if since is not None:
+        rollups = rollups.filter(week__gte=week_of(since))
+    rows = rollups.values_list("metric", "bucket").annotate(Sum("stays"), Sum("seconds")).order_by("metric", "bucket")
+
+    report = {}
+    for metric, buckets in groupby(rows, key=lambda row: row[0]):
+        buckets = list(buckets)
+        histogram = [(index, stays) for _, index, stays, _ in buckets]
+        count = sum(stays for _, stays in histogram)
+        report[metric] = {
+            "count": count,
+            "mean": datetime.timedelta(seconds=round(sum(seconds for *_, seconds in buckets) / count)),
+            **{f"p{percent}": percentile(histogram, percent) for percent in percents},
+        }
+    return report
+
+
+def queue_depth(days: list[datetime.date]) -> dict[datetime.date, dict[str, int]]:
+    """Number of projects in each status at the end of each of the days, in order."""
+
+    days = sorted(days)
+    depth = Counter(dict(
+        StatusFlowRollup.objects.filter(day__lt=days[0]).values_list("status").annotate(change=Sum(F("entered") - F("left")))
+    ))
+    changes = (
+        StatusFlowRollup.objects.filter(day__gte=days[0], day__lte=days[-1])
+        .values_list("day", "status").annotate(change=Sum(F("entered") - F("left"))).order_by("day")
+    )
+
+    report, changes = {}, iter(changes)
+    change = next(changes, None)
+    for day in days:
+        while change is not None and change[0] <= day:
+            depth[change[1]] += change[2]
+            change = next(changes, None)
+        report[day] = {status: depth[code] for code, status in enumerate(ProjectEvent.STATUSES)}
+    return report
+
+
+def throughput(since: datetime.date) -> dict[datetime.date, dict[str, int]]:
+    """Status changes made by each role, by week since a day, in order."""
+
+    rows = (
+        ThroughputRollup.objects.filter(week__gte=week_of(since))
+        .values_list("week", "role").annotate(Sum("transitions")).order_by("week", "role")
+    )
+    report = defaultdict(dict)
+    for week, role, transitions in rows:
+        report[week][role] = transitions
+    return dict(report)
+
+
+def refreshed_at() -> datetime.datetime | None:
+    """When the rollups were last refreshed, None if they never were."""
+
+    return RollupWatermark.objects.filter(name=WATERMARK).values_list("updated_at", flat=True).first()
+
+
+def report(weeks: int = 12) -> dict:
+    """The reports of the last weeks, the depth of the queues being taken at the end of each week."""
+
+    if weeks < 1:
+        raise ValueError("The report covers at least one week.")
+
+    today = timezone.localdate()
+    since = week_of(today) - datetime.timedelta(weeks=weeks - 1)
+    ends = [min(since + datetime.timedelta(weeks=week, days=6), today) for week in range(weeks)]
+
+    return {
+        "since": since,
+        "statuses": ProjectEvent.STATUSES,
+        "time_in_status": time_in_status(since),
+        "all_time": time_in_status(),
+        "queue_depth": queue_depth(ends),
+        "throughput": throughput(since),
+    }
@@ -1,11 +1,29 @@
+import csv
+import datetime
+import io
+import json
 import logging
+import tempfile
+from pathlib import Path
+from unittest import mock
 
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.models import QuerySet
 from django.shortcuts import reverse
 from django.test import TestCase, Client
+from django.utils import timezone
 
-from SEP.test_utils import create_project, create_people
+from SEP import dashboards
+from SEP.test_utils import create_project, create_people, create_request
 from SEP.models import Role, Employee, Customer
-from project.models import RawRequest, Project, Task, RecruitementPost, FinancialRequest
+
+from project import audit, counters, exports, finance, imports, rollups, scheduling, search, sla, workload
+from project.forms import RawRequestForm, TaskAssignmentForm
+from project.models import (
+    EmployeeWorkload, Meeting, MeetingAttendance, RawRequest, Project, ProjectEvent, ProjectTaskCounts, RollupWatermark, StatusFlowRollup, StayRollup, Task,
+    ThroughputRollup, RecruitementPost, FinancialRequest,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -77,6 +95,25 @@ class ProjectTestCase(TestCase):
         self.assertEqual("pending", project.status)
 
 
+    def test_stale_post_on_reviewed_project(self):
+        """A project sent to review can no longer be saved nor published from its request."""
+
+        self.client.force_login(Employee.objects.get(username="cse1"))
+        request = create_request()
+        url = reverse("project:project_from_raw", args=[request.id])
+        data = {"title": "Event", "description": "An event", "estimated_budget": 1000}
+        self.client.post(url, {**data, "publish_project": ""})
+        Project.objects.get(initial_request=request).transition("cs_approved")
+
+        for button in ("save_draft", "publish_project"):
+            with self.subTest(button=button):
+                response = self.client.post(url, {**data, "title": "Replayed", button: ""})
+
+                self.assertEqual(302, response.status_code)
+                project = Project.objects.get(initial_request=request)
+                self.assertEqual(("cs_approved", "Event"), (project.status, project.title))
+        self.assertEqual(3, ProjectEvent.objects.filter(project=project).count())
+
     def test_csm_approves_project(self):
         """Tests that the CSM can approve a project."""
 
@@ -149,6 +186,351 @@ class ProjectTestCase(TestCase):
         self.assertEqual("admin_rejected", Project.objects.get(id=project.id).status)
 
 
+class ProjectWorkflowTestCase(TestCase):
+    """Tests the project status state machine."""
+
+    def setUp(self):
+        create_people()
+        self.project = create_project()
+
+    def test_transition_is_applied(self):
+        """An allowed transition updates the row and the instance."""
+
+        self.assertTrue(self.project.transition("cs_approved"))
+        self.assertEqual("cs_approved", self.project.status)
+        self.assertEqual("cs_approved", Project.objects.get(id=self.project.id).status)
+
+    def test_transition_not_in_graph(self):
+        """A transition missing from the graph is refused without touching the row."""
+
+        self.assertFalse(self.project.transition("admin_approved"))
+        self.assertEqual("pending", Project.objects.get(id=self.project.id).status)
+
+    def test_concurrent_transitions(self):
+        """Two managers acting on the same pending project: only the first transition wins."""
+
+        first = Project.objects.get(id=self.project.id)
+        second = Project.objects.get(id=self.project.id)
+
+        self.assertTrue(first.transition("cs_approved"))
+        self.assertFalse(second.transition("cs_rejected"))
+        self.assertEqual("cs_approved", Project.objects.get(id=self.project.id).status)
+
+    def test_transition_only_updates_changed_fields(self):
+        """Fields modified on the instance but not passed to the transition are not written."""
+
+        self.project.title = "Modified title"
+        self.assertTrue(self.project.transition("cs_approved"))
+        self.assertEqual("Test project", Project.objects.get(id=self.project.id).title)
+
+    def test_bulk_transition_concurrent_change(self):
+        """A row moved by another request between the read & the UPDATE of a bulk transition is not reported done."""
+
+        other = Project.objects.create(title="Other", status="pending")
+        update = QuerySet.update
+
+        def concurrent_update(queryset, **fields):
+            # Another manager approves the project first, without going through the ORM
+            with connection.cursor() as cursor:
+                cursor.execute("UPDATE project_project SET status = 'cs_approved' WHERE id = %s", [self.project.id])
+            return update(queryset, **fields)
+
+        with mock.patch.object(QuerySet, "update", autospec=True, side_effect=concurrent_update):
+            results = Project.bulk_transition([self.project.id, other.id], "cs_approved")
+
+        self.assertEqual({self.project.id: "invalid_status", other.id: "done"}, results)
+        self.assertEqual(["cs_approved", "cs_approved"], [project.status for project in Project.objects.filter(id__in=results)])
+        self.assertEqual([other.id], list(ProjectEvent.objects.filter(target=ProjectEvent.code("cs_approved")).values_list("project_id", flat=True)))
+
+
+class BulkActionTestCase(TestCase):
+    """Tests the bulk approval endpoints of the managers' queues."""
+
+    def setUp(self):
+        self.client = Client()
+        create_people()
+
+    def test_csm_bulk_approve(self):
+        """Pending projects are approved, the others are reported per id."""
+
+        pending = [Project.objects.create(title=f"Project {i}", status="pending") for i in range(3)]
+        draft = Project.objects.create(title="Draft", status="draft")
+        ids = [project.id for project in pending] + [draft.id, 999999]
+
+        self.client.force_login(Employee.objects.get(username="csm1"))
+        response = self.client.post(
+            reverse("project:csm_bulk_action"), {"ids": ids, "approve": "1"}, HTTP_ACCEPT="application/json"
+        )
+
+        self.assertEqual(200, response.status_code)
+        results = response.json()["results"]
+        self.assertEqual(["done"] * 3, [results[str(project.id)] for project in pending])
+        self.assertEqual("invalid_status", results[str(draft.id)])
+        self.assertEqual("not_found", results["999999"])
+        self.assertEqual(3, Project.objects.filter(status="cs_approved").count())
+        self.assertEqual("draft", Project.objects.get(id=draft.id).status)
+
+    def test_adm_bulk_reject_redirects(self):
+        """Browsers are redirected to their dashboard."""
+
+        projects = [Project.objects.create(title=f"Project {i}", status="fin_review") for i in range(2)]
+
+        self.client.force_login(Employee.objects.get(username="adm1"))
+        response = self.client.post(reverse("project:adm_bulk_action"), {"ids": [p.id for p in projects], "approve": "0"})
+
+        self.assertEqual(302, response.status_code)
+        self.assertEqual(2, Project.objects.filter(status="admin_rejected").count())
+
+    def test_fim_bulk_approve(self):
+        """Pending financial requests are approved in one go."""
+
+        project = create_project()
+        requests = [
+            FinancialRequest.objects.create(requesting_department="prod", amount=100, project=project, reason="Money")
+            for _ in range(3)
+        ]
+
+        self.client.force_login(Employee.objects.get(username="fim1"))
+        response = self.client.post(reverse("project:fin_request_bulk_action"), {"ids": [r.id for r in requests], "approve": "1"})
+
+        self.assertEqual(302, response.status_code)
+        self.assertEqual(3, FinancialRequest.objects.filter(status="approved").count())
+
+    def test_invalid_bulk_action(self):
+        """Requests without a valid action or ids are rejected."""
+
+        self.client.force_login(Employee.objects.get(username="csm1"))
+
+        self.assertEqual(400, self.client.post(reverse("project:csm_bulk_action"), {"ids": [1]}).status_code)
+        self.assertEqual(400, self.client.post(reverse("project:csm_bulk_action"), {"ids": ["x"], "approve": "1"}).status_code)
+        self.assertEqual(405, self.client.get(reverse("project:csm_bulk_action")).status_code)
+
+
+class ProjectListTestCase(TestCase):
+    """Tests the keyset pagination & streaming of the project list."""
+
+    def setUp(self):
+        self.client = Client()
+        create_people()
+        self.client.force_login(Employee.objects.get(username="cse1"))
+
+        for i in range(120):
+            Project.objects.create(title=f"Project {i}", status="pending" if i % 2 else "draft")
+
+    def test_pages_cover_all_projects(self):
+        """Following the cursors lists every project exactly once, in creation order."""
+
+        seen = []
+        url = reverse("project:project_list")
+        cursor = None
+        while True:
+            response = self.client.get(url, {"cursor": cursor} if cursor else {})
+            self.assertEqual(200, response.status_code)
+            seen += [project.id for project in response.context["projects"]]
+            cursor = response.context["next_cursor"]
+            if cursor is None:
+                break
+
+        self.assertEqual(list(Project.objects.order_by("created_at", "id").values_list("id", flat=True)), seen)
+
+    def test_status_filter(self):
+        """Only projects with the requested status are listed."""
+
+        response = self.client.get(reverse("project:project_list"), {"status": "pending"})
+
+        self.assertEqual(200, response.status_code)
+        self.assertTrue(all(project.status == "pending" for project in response.context["projects"]))
+        self.assertEqual(400, self.client.get(reverse("project:project_list"), {"status": "unknown"}).status_code)
+
+    def test_invalid_cursor(self):
+        """A malformed cursor is rejected."""
+
+        response = self.client.get(reverse("project:project_list"), {"cursor": "not-a-cursor"})
+
+        self.assertEqual(400, response.status_code)
+
+    def test_streaming(self):
+        """The streaming mode renders every project."""
+
+        response = self.client.get(reverse("project:project_list"), {"stream": "1", "status": "draft"})
+
+        self.assertTrue(response.streaming)
+        content = b"".join(response.streaming_content).decode()
+        self.assertEqual(60, content.count("status-draft"))
+        self.assertNotIn("status-pending", content)
+
+
+class AsyncViewsTestCase(TestCase):
+    """Tests the async versions of the read-heavy views."""
+
+    def setUp(self):
+        self.client = Client()
+        create_people()
+        self.client.force_login(Employee.objects.get(username="sdm1"))
+        self.project = create_project()
+        self.task = Task.objects.create(
+            project=self.project, assignee=Employee.objects.get(username="cook1"), sender=Employee.objects.get(username="sdm1"),
+            subject="Async task", description="A task", due_date="2024-12-12",
+        )
+
+    async def test_project_list(self):
+        await self.async_client.aforce_login(await Employee.objects.aget(username="sdm1"))
+
+        for params in ({}, {"status": "pending"}, {"stream": "1"}):
+            with self.subTest(params=params):
+                response = await self.async_client.get(reverse("project:project_list_async"), params)
+                if response.streaming:
+                    content = b"".join([chunk async for chunk in response.streaming_content])
+                else:
+                    content = response.content
+
+                self.assertEqual(200, response.status_code)
+                self.assertIn(b"Test project", content)
+
+        response = await self.async_client.get(reverse("project:project_list_async"), {"status": "nope"})
+        self.assertEqual(400, response.status_code)
+
+    def test_details(self):
+        response = self.client.get(reverse("project:project_detail_async", args=[self.project.id]))
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(self.project, response.context["project"])
+
+        response = self.client.get(reverse("project:task_detail_async", args=[self.project.id, self.task.id]))
+        self.assertEqual(200, response.status_code)
+        self.assertContains(response, "Async task")
+
+        other = Project.objects.create(title="Other", estimated_budget=10)
+        self.assertEqual(400, self.client.get(reverse("project:task_detail_async", args=[other.id, self.task.id])).status_code)
+        self.assertEqual(404, self.client.get(reverse("project:task_detail_async", args=[self.project.id, 0])).status_code)
+
+
+class CustomerMatchingTestCase(TestCase):
+    """Tests the matching of the raw requests with the existing customers."""
+
+    def setUp(self):
+        self.client = Client()
+        create_people()
+        self.client.force_login(Employee.objects.get(username="cse1"))
+        self.request = RawRequest.objects.create(
+            name="Some Dude",
+            email="Some_Dude@Gmail.com ",
+            phone="012-345 67 89",
+            address="Some street, 123",
+            title="I want some event planned",
+            description="Like a really big event",
+            available=10000,
+        )
+        self.url = reverse("project:project_from_raw", args=[self.request.id])
+
+    def test_get_has_no_side_effect(self):
+        """Displaying the form neither creates a customer nor writes anything."""
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(200, response.status_code)
+        self.assertIsNone(response.context["project_form"].initial["client"])
+        self.assertFalse(Customer.objects.exists())
+
+    def test_get_finds_returning_customer(self):
+        """The customer is matched on the normalized email & phone."""
+
+        customer = Customer.objects.create(name="Dude", email="some_dude@gmail.com", phone="0123456789", address="Elsewhere")
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(customer, response.context["project_form"].initial["client"])
+
+    def test_customer_created_on_submit(self):
+        """Submitting the form without a client creates the customer from the request."""
+
+        for _ in range(2):
+            self.client.post(self.url, {
+                "title": "I want some event planned",
+                "description": "Like a really big event",
+                "estimated_budget": 10000,
+                "save_draft": "",
+            })
+
+        customer = Customer.objects.get()
+        self.assertEqual("Some Dude", customer.name)
+        self.assertEqual(customer, Project.objects.get(initial_request=self.request).client)
+
+    def test_dedup_customers(self):
+        """The duplicates are merged into the oldest customer, with their projects."""
+
+        kept = Customer.objects.create(name="Dude", email="dude@gmail.com", phone="0123456789", address="Street")
+        duplicate = Customer.objects.create(name="Dude", email="DUDE@gmail.com", phone="01 23 45 67 89", address="Street")
+        other = Customer.objects.create(name="Other", email="other@gmail.com", phone="0123456789", address="Street")
+        project = Project.objects.create(title="Project", description="Project", client=duplicate, estimated_budget=100)
+        FinancialRequest.objects.create(requesting_department="prod", amount=40, project=project, reason="Money")
+        rollups.rebuild(rollups.ROLLUPS["financial-requests"])
+        dashboards.fragment_cache().set(dashboards.fragment_key("CSM"), "Stale queues")
+
+        call_command("dedup_customers", stdout=io.StringIO())
+
+        self.assertQuerySetEqual(Customer.objects.order_by("id"), [kept, other])
+        self.assertEqual(kept, Project.objects.get(id=project.id).client)
+        self.assertEqual([(kept.id, 40)], [(row["client_id"], row["amount"]) for row in rollups.budget_per_client_per_month()])
+        self.assertIsNone(dashboards.fragment_cache().get(dashboards.fragment_key("CSM")))
+
+
+class SearchTestCase(TestCase):
+    """Tests the full-text search."""
+
+    def setUp(self):
+        self.client = Client()
+        create_people()
+        self.client.force_login(Employee.objects.get(username="cse1"))
+
+        self.wedding = Project.objects.create(title="Summer wedding", description="Party by the lake", estimated_budget=100)
+        self.party = Project.objects.create(title="Company party", description="Celebrating the weddings season", estimated_budget=100)
+        self.request = create_request()
+
+    def test_ranked_results(self):
+        """Prefixes match and the matches in the title come first."""
+
+        hits = search.search("wedd")
+
+        self.assertEqual([self.wedding.id, self.party.id], [hit.object_id for hit in hits])
+
+    def test_index_follows_changes(self):
+        """Saved & deleted rows are updated in the index."""
+
+        self.party.title = "Company gala"
+        self.party.save()
+        self.wedding.delete()
+
+        self.assertEqual([], search.search("wedding summer"))
+        self.assertEqual([self.party.id], [hit.object_id for hit in search.search("gala")])
+
+    def test_search_view(self):
+        """The view filters by kind and rejects invalid parameters."""
+
+        response = self.client.get(reverse("project:search"), {"q": "event", "kind": "request"})
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual([("request", self.request.id)], [(hit.kind, hit.object_id) for hit in response.context["hits"]])
+        self.assertEqual(400, self.client.get(reverse("project:search"), {"q": "event", "kind": "task"}).status_code)
+        self.assertEqual(400, self.client.get(reverse("project:search"), {"q": "event", "page": "0"}).status_code)
+
+    def test_fallback_backend(self):
+        """The backend for the other databases finds the same documents."""
+
+        hits = search.ORMSearchBackend().search("Party", kinds=["project"])
+
+        self.assertEqual({self.wedding.id, self.party.id}, {hit.object_id for hit in hits})
+
+    def test_rebuild(self):
+        """The rows created in bulk are indexed by a rebuild."""
+
+        Customer.objects.bulk_create([Customer(name="Bulk customer", email="bulk@example.com", phone="1", address="Street")])
+        self.assertEqual([], search.search("bulk"))
+
+        call_command("rebuild_search_index", stdout=io.StringIO())
+
+        self.assertEqual(["customer"], [hit.kind for hit in search.search("bulk")])
+
+
 class TaskDispatchingTestCase(TestCase):
     """Tests the task dispatching functionality."""
 
@@ -415,3 +797,771 @@ class FinancialRequestTestCase(TestCase):
         self.assertEqual(200, response.status_code)
         self.assertEqual(0, response.context["financial_requests"].count())
         self.assertEqual("rejected", FinancialRequest.objects.first().status)
+
+
+class ExportTestCase(TestCase):
+    """Tests the streamed CSV & JSONL extracts."""
+
+    def setUp(self):
+        self.client = Client()
+        create_people()
+        self.project = create_project()
+        Task.objects.create(
+            project=self.project, assignee=Employee.objects.get(username="cook1"), subject="Cook",
+            description="Cook, with a comma", due_date="2024-01-01",
+        )
+        FinancialRequest.objects.create(requesting_department="prod", amount=500, project=self.project, reason="Ovens")
+
+    def test_csv_chunks(self):
+        """The rows are written with their joined columns, a chunk every `chunk_size` rows."""
+
+        Project.objects.create(title="Second project")
+
+        chunks = list(exports.chunks("projects", "csv", chunk_size=1))
+        rows = list(csv.DictReader(io.StringIO("".join(chunks))))
+
+        self.assertEqual(3, len(chunks))
+        self.assertEqual(["Test project", "Second project"], [row["title"] for row in rows])
+        self.assertEqual("Test client", rows[0]["client"])
+        self.assertEqual("", rows[1]["client"])
+
+    def test_jsonl_chunks(self):
+        rows = [json.loads(line) for line in "".join(exports.chunks("tasks", "jsonl")).splitlines()]
+
+        self.assertEqual(1, len(rows))
+        self.assertEqual("cook1", rows[0]["assignee"])
+        self.assertEqual("Test project", rows[0]["project"])
+        self.assertEqual("2024-01-01", rows[0]["due_date"])
+
+    def test_export_view(self):
+        """Only the staff can download the extracts."""
+
+        url = reverse("project:export", args=["financial-requests", "csv"])
+        employee = Employee.objects.get(username="fim1")
+        self.client.force_login(employee)
+        self.assertEqual(302, self.client.get(url).status_code)
+
+        employee.is_staff = True
+        employee.save()
+        response = self.client.get(url)
+
+        self.assertEqual(200, response.status_code)
+        self.assertTrue(response.streaming)
+        self.assertEqual('attachment; filename="financial-requests.csv"', response["Content-Disposition"])
+        rows = list(csv.DictReader(io.StringIO(b"".join(response.streaming_content).decode())))
+        self.assertEqual([("Ovens", "Test client")], [(row["reason"], row["client"]) for row in rows])
+        self.assertEqual(400, self.client.get(reverse("project:export", args=["customers", "csv"])).status_code)
+
+    def test_export_command(self):
+        out = io.StringIO()
+        call_command("export_data", "tasks", "--format", "jsonl", stdout=out)
+
+        self.assertEqual("Cook", json.loads(out.getvalue())["subject"])
+
+
+class ImportTestCase(TestCase):
+    """Tests the bulk import of raw requests & customers from files."""
+
+    def setUp(self):
+        create_people()
+        create_project()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+
+        self.row = {
+            "name": "Lead",
+            "email": "lead@partner.com",
+            "phone": "0611223344",
+            "address": "Street",
+            "title": "Imported wedding",
+            "description": "From a partner",
+            "available": 1000,
+        }
+
+    def write(self, rows: list[dict], name: str = "leads.jsonl") -> Path:
+        path = self.directory / name
+        path.write_text("".join(f"{json.dumps(row)}\n" for row in rows))
+        return path
+
+    def test_import(self):
+        """Valid rows are imported, known customers reused and invalid rows reported."""
+
+        path = self.write([
+            self.row,
+            {**self.row, "title": "Second request", "email": "LEAD@partner.com"},
+            {**self.row, "title": "Returning client", "email": "test@client.com", "phone": "01 23 45 67 89"},
+            {**self.row, "email": "invalid", "available": -1},
+        ])
+
+        out = io.StringIO()
+        call_command("import_requests", str(path), stdout=out)
+
+        self.assertIn("3 request(s) & 1 customer(s) imported", out.getvalue())
+        self.assertEqual(3, RawRequest.objects.filter(name="Lead").count())
+        self.assertEqual(1, Customer.objects.filter(email="lead@partner.com").count())
+        self.assertEqual(1, Customer.objects.filter(email="test@client.com").count())
+        self.assertEqual(
+            [(hit.kind, hit.title) for hit in search.search("returning")], [("request", "Returning client")],
+        )
+
+        with (self.directory / "leads.jsonl.rejects.csv").open() as report:
+            [rejected] = list(csv.DictReader(report))
+        self.assertEqual("4", rejected["line"])
+        self.assertEqual(["available", "email"], sorted(json.loads(rejected["errors"])))
+        self.assertFalse((self.directory / "leads.jsonl.checkpoint").exists())
+
+    def test_resume(self):
+        """An interrupted import continues after the checkpoint, a file imported again creates nothing."""
+
+        path = self.write([{**self.row, "title": f"Request {i}"} for i in range(5)])
+        checkpoint = self.directory / "leads.jsonl.checkpoint"
+        importer = imports.Importer(path, "jsonl", self.directory / "rejects.csv", checkpoint, batch_size=2)
+        next(importer.run())
+
+        self.assertEqual(2, json.loads(checkpoint.read_text())["line"])
+        # Pretend the batch after the checkpoint was saved before the interruption
+        saved = {**self.row, "title": "Request 2"}
+        RawRequest.objects.create(**saved, intake_key=imports.content_key(saved))
+
+        call_command("import_requests", str(path), stdout=io.StringIO())
+        self.assertEqual(5, RawRequest.objects.filter(name="Lead").count())
+
+        out = io.StringIO()
+        call_command("import_requests", str(path), "--restart", stdout=out)
+        self.assertIn("0 request(s) & 0 customer(s) imported, 5 already imported", out.getvalue())
+
+    def test_csv(self):
+        path = self.directory / "leads.csv"
+        with path.open("w", newline="") as file:
+            writer = csv.DictWriter(file, list(self.row))
+            writer.writeheader()
+            writer.writerow(self.row)
+
+        call_command("import_requests", str(path), stdout=io.StringIO())
+
+        self.assertEqual(1000, RawRequest.objects.get(name="Lead").available)
+
+    def test_same_rules_as_the_form(self):
+        validator = imports.RowValidator(RawRequestForm)
+
+        for row in (self.row, {**self.row, "email": "invalid", "available": "-1", "title": "x" * 101}, {}):
+            form = RawRequestForm(row)
+            form.is_valid()
+            messages = {name: [error["message"] for error in errors] for name, errors in form.errors.get_json_data().items()}
+            self.assertEqual(messages, validator.clean(row)[1])
+
+
+class FinanceTestCase(TestCase):
+    """Tests the totals of the financial requests."""
+
+    def setUp(self):
+        self.client = Client()
+        create_people()
+        self.client.force_login(Employee.objects.get(username="fim1"))
+
+        self.project = create_project()  # Budget of 10000
+        self.other = Project.objects.create(title="Other project", estimated_budget=100)
+        for project, department, amount, status in (
+            (self.project, "prod", 6000, "approved"),
+            (self.project, "serv", 5000, "approved"),
+            (self.project, "prod", 300, "pending"),
+            (self.project, "prod", 50, "rejected"),
+            (self.other, "serv", 20, "approved"),
+        ):
+            FinancialRequest.objects.create(
+                requesting_department=department, amount=amount, project=project, reason="Money", status=status,
+            )
+
+    def test_project_totals(self):
+        with self.assertNumQueries(1):
+            totals = finance.project_totals(self.project)
+
+        self.assertEqual(finance.Totals(11000, 300, 50, 10000), totals)
+        self.assertEqual(-1000, totals.remaining)
+        self.assertEqual(1000, totals.overrun)
+        self.assertTrue(totals.over_budget)
+        self.assertEqual(80, finance.project_totals(self.other).remaining)
+
+    def test_grouped_totals(self):
+        """The totals of all the projects & departments take a single query each."""
+
+        with self.assertNumQueries(1):
+            projects = {project.id: project for project in finance.projects_with_totals()}
+        project = projects[self.project.id]
+        self.assertEqual((11000, 300, 50), (project.approved, project.pending, project.rejected))
+        self.assertEqual(20, projects[self.other.id].approved)
+
+        with self.assertNumQueries(1):
+            departments = {row["department"]: row for row in finance.department_totals()}
+        self.assertEqual((6000, 300, 50), tuple(departments["Production"][status] for status in finance.STATUSES))
+        self.assertEqual(5020, departments["Services"]["approved"])
+
+    def test_json_endpoint(self):
+        response = self.client.get(reverse("project:financial_totals"))
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual([(self.project.id, 1000)], [(row["project"], row["overrun"]) for row in response.json()["over_budget"]])
+
+        response = self.client.get(reverse("project:financial_totals"), {"project": self.other.id})
+        self.assertEqual({"approved": 20, "remaining": 80, "over_budget": False}, {
+            key: response.json()[key] for key in ("approved", "remaining", "over_budget")
+        })
+        self.assertEqual(400, self.client.get(reverse("project:financial_totals"), {"project": "x"}).status_code)
+
+    def test_pages(self):
+        """The project page shows the overrun, the dashboard the granted amounts of the requests & projects."""
+
+        response = self.client.get(reverse("project:project_detail", args=[self.project.id]))
+        self.assertContains(response, "budget overrun by 1000€")
+
+        response = self.client.get(reverse("employee_home"))
+        self.assertContains(response, "11000€ / 10000€")
+
+        # The project history lists the totals of each project reviewed
+        Project.objects.filter(pk=self.project.pk).update(status="admin_approved")
+        dashboards.invalidate_fragments(Project)
+        response = self.client.get(reverse("employee_home"))
+        self.assertContains(response, "11000€ / 10000€ (300€ pending)")
+
+
+class TaskCountersTestCase(TestCase):
+    """Tests the task counters of the projects."""
+
+    def setUp(self):
+        create_people()
+        self.project = create_project()
+        self.other = Project.objects.create(title="Other project")
+        self.assignee = Employee.objects.get(username="cook1")
+        self.past = datetime.date.today() - datetime.timedelta(days=3)
+        self.future = datetime.date.today() + datetime.timedelta(days=3)
+
+    def create_task(self, due_date, **kwargs) -> Task:
+        return Task.objects.create(
+            project=kwargs.pop("project", self.project), assignee=self.assignee, subject="Task", description="A task",
+            due_date=due_date, **kwargs,
+        )
+
+    def counts(self, project: Project) -> tuple:
+        counts = ProjectTaskCounts.objects.get(project=project)
+        return counts.open, counts.completed
+
+    def overdue(self, project: Project, today=None) -> int:
+        return Project.objects.annotate(overdue_count=counters.overdue_count(today)).get(id=project.id).overdue_count
+
+    def test_counters_follow_tasks(self):
+        overdue = self.create_task(self.past)
+        self.create_task(self.future)
+        self.create_task(self.future, completed=True)
+        self.assertEqual((2, 1), self.counts(self.project))
+        self.assertEqual(1, self.overdue(self.project))
+
+        overdue = Task.objects.get(id=overdue.id)
+        overdue.completed = True
+        overdue.save()
+        self.assertEqual((1, 2), self.counts(self.project))
+        self.assertEqual(0, self.overdue(self.project))
+
+        overdue.project = self.other
+        overdue.completed = False
+        overdue.save()
+        self.assertEqual((1, 1), self.counts(self.project))
+        self.assertEqual((1, 0), self.counts(self.other))
+        self.assertEqual(1, self.overdue(self.other))
+
+        overdue.delete()
+        self.assertEqual((0, 0), self.counts(self.other))
+
+        # Deleting a project with its tasks leaves no counters behind
+        self.project.delete()
+        self.assertFalse(ProjectTaskCounts.objects.filter(project_id=self.project.id).exists())
+
+    def test_reconcile(self):
+        """The tasks written in bulk drift from the counters until they are rebuilt."""
+
+        self.create_task(self.future)
+        Task.objects.filter(project=self.project).update(completed=True)
+        Task.objects.bulk_create([Task(
+            project=self.other, assignee=self.assignee, subject="Bulk", description="A task", due_date=self.past,
+        )])
+
+        self.assertEqual([
+            (self.project.id, {"open": 1, "completed": 0}, {"open": 0, "completed": 1}),
+            (self.other.id, {"open": 0, "completed": 0}, {"open": 1, "completed": 0}),
+        ], list(counters.drift()))
+
+        out = io.StringIO()
+        call_command("reconcile_task_counters", stdout=out)
+
+        self.assertIn("2 project(s) with drifted counters", out.getvalue())
+        self.assertEqual([], list(counters.drift()))
+        self.assertEqual((1, 0), self.counts(self.other))
+
+    def test_task_becoming_overdue(self):
+        """A task counted before its due date passed is completed after, the counters do not drift."""
+
+        task = self.create_task(self.future)
+        self.assertEqual(0, self.overdue(self.project))
+
+        later = self.future + datetime.timedelta(days=1)
+        self.assertEqual(1, self.overdue(self.project, later))
+        with mock.patch("django.utils.timezone.localdate", return_value=later):
+            task = Task.objects.get(id=task.id)
+            task.completed = True
+            task.save()
+
+            self.assertEqual((0, 1), self.counts(self.project))
+            self.assertEqual(0, self.overdue(self.project))
+            self.assertEqual([], list(counters.drift()))
+
+    def test_psdm_dashboard(self):
+        self.project.status = "admin_approved"
+        self.project.save()
+        self.create_task(self.past)
+        self.create_task(self.future, completed=True)
+
+        client = Client()
+        client.force_login(Employee.objects.get(username="pdm1"))
+        response = client.get(reverse("employee_home"))
+
+        self.assertContains(response, "<td>1 / 2</td>", html=True)
+        self.assertContains(response, '<td class="error">1</td>', html=True)
+
+
+class WorkloadTestCase(TestCase):
+    """Tests the workload index of the employees and the assignment of tasks by workload."""
+
+    def setUp(self):
+        self.client = Client()
+        create_people()
+        self.project = create_project()
+        self.manager = Employee.objects.get(username="sdm1")
+        self.team = self.manager.managed_teams.first()
+        self.first, self.second = self.team.members.order_by("id")[:2]
+        self.later = datetime.date.today() + datetime.timedelta(days=30)
+
+    def create_task(self, assignee, priority: int = 0, due_date=None) -> Task:
+        return Task.objects.create(
+            project=self.project, assignee=assignee, subject="Task", description="A task",
+            priority=priority, due_date=due_date or self.later,
+        )
+
+    def load(self, employee) -> tuple:
+        current = EmployeeWorkload.objects.get(employee=employee)
+        return current.open_tasks, current.load
+
+    def ranked_load(self, employee, today=None) -> int:
+        return workload.ranked_members(self.team, today).get(id=employee.id).load
+
+    def test_workload_follows_tasks(self):
+        """Tasks weigh by priority and more when they are due soon."""
+
+        critical = self.create_task(self.first, priority=3)
+        self.create_task(self.first, priority=1, due_date=datetime.date.today())
+        self.assertEqual((2, 8 + 2), self.load(self.first))
+        self.assertEqual(8 + 2 * 3, self.ranked_load(self.first))
+
+        critical = Task.objects.get(id=critical.id)
+        critical.assignee = self.second
+        critical.save()
+        self.assertEqual((1, 2), self.load(self.first))
+        self.assertEqual(6, self.ranked_load(self.first))
+        self.assertEqual((1, 8), self.load(self.second))
+
+        critical.completed = True
+        critical.save()
+        self.assertEqual((0, 0), self.load(self.second))
+        self.assertEqual([], list(workload.drift()))
+
+    def test_ranked_assignees(self):
+        """The form lists the least loaded members first and assigns the least loaded one by default."""
+
+        self.create_task(self.first, priority=2)
+        members = self.team.members.count()
+
+        form = TaskAssignmentForm(team=self.team)
+        choices = [choice for value, choice in form.fields["assignee"].choices if value]
+        self.assertEqual(members, len(choices))
+        self.assertIn("workload 4 (1 open task(s))", choices[-1])
+
+        with self.assertNumQueries(1):
+            self.assertNotEqual(self.first, workload.least_loaded(self.team))
+
+        self.client.force_login(self.manager)
+        response = self.client.post(reverse("project:psdm_team_action", args=[self.project.id, self.team.id]), {
+            "subject": "Automatic",
+            "priority": 0,
+            "due_date": self.later,
+            "description": "Assigned to the least loaded member",
+        })
+
+        self.assertEqual(302, response.status_code)
+        self.assertNotEqual(self.first, Task.objects.get(subject="Automatic").assignee)
+
+    def test_task_due_soon_over_days(self):
+        """A task counted before it was due soon is completed after, the workloads do not drift."""
+
+        task = self.create_task(self.first, priority=1, due_date=datetime.date.today() + datetime.timedelta(days=5))
+        self.assertEqual(2 * 2, self.ranked_load(self.first))
+
+        later = datetime.date.today() + datetime.timedelta(days=4)
+        self.assertEqual(2 * 3, self.ranked_load(self.first, later))
+        with mock.patch("django.utils.timezone.localdate", return_value=later):
+            task = Task.objects.get(id=task.id)
+            task.completed = True
+            task.save()
+
+            self.assertEqual((0, 0), self.load(self.first))
+            self.assertEqual(0, self.ranked_load(self.first))
+            self.assertEqual([], list(workload.drift()))
+
+    def test_reconcile(self):
+        self.create_task(self.first, priority=3)
+        Task.objects.update(priority=1, due_date=datetime.date.today())
+
+        out = io.StringIO()
+        call_command("reconcile_task_counters", stdout=out)
+
+        self.assertIn("1 employee(s) with drifted counters", out.getvalue())
+        self.assertEqual((1, 2), self.load(self.first))
+        self.assertEqual(2 * 3, self.ranked_load(self.first))
+
+
+class MeetingSchedulingTestCase(TestCase):
+    """Tests the conflicts between meetings and the search of free slots."""
+
+    def setUp(self):
+        self.client = Client()
+        create_people()
+        self.project = create_project()
+        self.first, self.second, self.third = Employee.objects.order_by("id")[:3]
+        # A Monday
+        self.day = datetime.date(2026, 11, 2)
+
+    def at(self, hour: int, minute: int = 0, days: int = 0) -> datetime.datetime:
+        return timezone.make_aware(datetime.datetime.combine(self.day + datetime.timedelta(days=days), datetime.time(hour, minute)))
+
+    def schedule(self, members, hour: int, minute: int = 0, duration: int = 60) -> Meeting:
+        return scheduling.schedule([member.id for member in members], self.day, datetime.time(hour, minute), duration)
+
+    def test_attendances_follow_meetings(self):
+        meeting = self.schedule([self.first], 10)
+        meeting.members.add(self.second)
+        self.third.meeting_set.add(meeting)
+        self.assertEqual(3, MeetingAttendance.objects.filter(meeting=meeting, starts_at=self.at(10), ends_at=self.at(11)).count())
+
+        meeting.time, meeting.duration = datetime.time(14), 30
+        meeting.save()
+        meeting.members.remove(self.first)
+        self.assertEqual(
+            {self.second.id, self.third.id},
+            set(MeetingAttendance.objects.filter(starts_at=self.at(14), ends_at=self.at(14, 30)).values_list("employee_id", flat=True)),
+        )
+
+        MeetingAttendance.objects.all().delete()
+        self.assertEqual(2, scheduling.rebuild())
+
+    def test_conflicts(self):
+        meeting = self.schedule([self.first, self.second], 10, duration=90)
+
+        self.assertEqual({self.second.id: [meeting.id]}, scheduling.conflicts([self.second.id, self.third.id], self.at(11), self.at(12)))
+        # Back to back meetings do not overlap
+        self.assertEqual({}, scheduling.conflicts([self.first.id], self.at(11, 30), self.at(12)))
+        self.assertEqual({}, scheduling.conflicts([self.first.id], self.at(9), self.at(10)))
+
+        with self.assertRaises(scheduling.SchedulingConflict):
+            self.schedule([self.third, self.first], 9, 30)
+        # Moving a meeting does not conflict with itself
+        scheduling.schedule([self.first.id], self.day, datetime.time(10, 30), 60, meeting=meeting)
+        self.assertEqual([self.first.id], list(meeting.members.values_list("id", flat=True)))
+
+    def test_next_free_slot(self):
+        self.schedule([self.first], 9)
+        self.schedule([self.second], 9, 30, duration=90)
+        members = [self.first.id, self.second.id]
+
+        with self.assertNumQueries(1):
+            slot = scheduling.next_free_slot(members, datetime.timedelta(hours=1), after=self.at(8))
+        self.assertEqual(self.at(11), slot)
+        self.assertEqual(self.at(10), scheduling.next_free_slot([self.third.id, self.first.id], datetime.timedelta(minutes=30), after=self.at(9, 20)))
+        # Not overlapping the closing time, nor on the weekend
+        self.assertEqual(self.at(9, days=1), scheduling.next_free_slot(members, datetime.timedelta(hours=1), after=self.at(17, 10)))
+        self.assertEqual(self.at(9, days=7), scheduling.next_free_slot(members, datetime.timedelta(hours=1), after=self.at(18, days=4)))
+        self.assertIsNone(scheduling.next_free_slot(members, datetime.timedelta(hours=1), after=self.at(9), horizon=datetime.timedelta(hours=2)))
+
+    def test_schedule_view(self):
+        self.schedule([self.second], 10)
+        self.client.force_login(self.first)
+        url = reverse("project:schedule_meeting", args=[self.project.id])
+
+        response = self.client.post(url, {"members": [self.first.id, self.second.id], "date": self.day, "time": "10:30", "duration": 60})
+        self.assertContains(response, "Already in a meeting at this time")
+
+        response = self.client.post(url, {"members": [self.first.id, self.second.id], "date": self.day, "time": "11:00", "duration": 60})
+        self.assertEqual(302, response.status_code)
+        self.project.refresh_from_db()
+        self.assertEqual(datetime.time(11), self.project.meeting.time)
+        self.assertEqual(2, self.project.meeting.attendances.count())
+
+        response = self.client.post(url, {"members": [self.first.id], "duration": 30, "find_slot": ""})
+        self.assertEqual(200, response.status_code)
+        self.assertTrue(response.context["form"]["date"].value())
+
+
+class AuditTestCase(TestCase):
+    """Tests the audit log of the status changes and the time spent in each status."""
+
+    def setUp(self):
+        self.client = Client()
+        create_people()
+        self.project = create_project()
+        self.csm = Employee.objects.get(username="csm1")
+
+    def history(self, project) -> list:
+        return [
+            (event.source_status, event.target_status, event.actor)
+            for event in ProjectEvent.objects.filter(project=project).order_by("timestamp", "id")
+        ]
+
+    def test_transitions_recorded(self):
+        self.assertTrue(self.project.transition("cs_approved", by=self.csm))
+        self.assertFalse(self.project.transition("cs_rejected", by=self.csm))
+        self.assertEqual([("pending", "cs_approved", self.csm)], self.history(self.project))
+
+        other = Project.objects.create(title="Other", status="pending")
+        Project.bulk_transition([self.project.id, other.id], "cs_rejected", by=self.csm)
+        self.assertEqual([("pending", "cs_rejected", self.csm)], self.history(other))
+        self.assertEqual(1, len(self.history(self.project)))
+
+        event = ProjectEvent.objects.get(project=other)
+        with self.assertRaises(ValueError):
+            event.save()
+
+    def test_project_creation_recorded(self):
+        cse = Employee.objects.get(username="cse1")
+        self.client.force_login(cse)
+        request = create_request()
+        url = reverse("project:project_from_raw", args=[request.id])
+        data = {"title": "Event", "description": "An event", "estimated_budget": 1000}
+
+        self.client.post(url, {**data, "save_draft": ""})
+        self.client.post(url, {**data, "save_draft": ""})
+        self.client.post(url, {**data, "publish_project": ""})
+
+        self.assertEqual([(None, "draft", cse), ("draft", "pending", cse)], self.history(request.project))
+
+        # A replayed form cannot record a change outside of the workflow
+        request.project.transition("cs_approved", by=self.csm)
+        self.client.post(url, {**data, "save_draft": ""})
+        history = self.history(request.project)
+        self.assertEqual(("pending", "cs_approved", self.csm), history[-1])
+        self.assertTrue(all(target in Project.TRANSITIONS[source] for source, target, _ in history[1:]))
+
+    def test_time_in_status(self):
+        start = timezone.now() - datetime.timedelta(days=10)
+        for days_pending, project in enumerate([self.project, *(Project.objects.create(title=f"P{i}") for i in range(3))], start=1):
+            ProjectEvent.objects.bulk_create([
+                ProjectEvent(project=project, timestamp=start, target=ProjectEvent.code("pending")),
+                ProjectEvent(project=project, timestamp=start + datetime.timedelta(days=days_pending), source=1, target=ProjectEvent.code("cs_approved")),
+            ])
+
+        with self.assertNumQueries(1):
+            statistics = audit.time_in_status(percents=(50, 100))
+        self.assertEqual({"count": 4, "p50": datetime.timedelta(days=2), "p100": datetime.timedelta(days=4)}, statistics["pending"])
+        self.assertNotIn("cs_approved", statistics)
+        self.assertEqual(4, audit.time_in_status(ongoing=True)["cs_approved"]["count"])
+
+        events = list(audit.timeline(self.project.id))
+        self.assertEqual(datetime.timedelta(days=1), events[0].left_at - events[0].timestamp)
+        self.assertGreaterEqual(events[1].left_at - events[1].timestamp, datetime.timedelta(days=9))
+
+        self.client.force_login(self.csm)
+        self.assertContains(self.client.get(reverse("project:project_timeline", args=[self.project.id])), "(current)")
+        self.csm.is_staff = True
+        self.csm.save()
+        response = self.client.get(reverse("project:time_in_status"))
+        self.assertEqual(2 * 24 * 3600, response.json()["pending"]["p50"])
+
+
+class SLATestCase(TestCase):
+    """Tests the rollups of the audit log and the reports of the workflow."""
+
+    def setUp(self):
+        self.client = Client()
+        create_people()
+        self.csm = Employee.objects.get(username="csm1")
+        self.adm = Employee.objects.get(username="adm1")
+        # A Monday, 4 weeks ago
+        self.start = timezone.make_aware(datetime.datetime.combine(sla.week_of(timezone.localdate()) - datetime.timedelta(weeks=4), datetime.time(9)))
+
+    def walk(self, project, *steps):
+        """Records the events of a project: (days after the start, status, actor)."""
+
+        previous = None
+        for days, status, actor in steps:
+            ProjectEvent.objects.create(
+                project=project, timestamp=self.start + datetime.timedelta(days=days),
+                source=ProjectEvent.code(previous), target=ProjectEvent.code(status), actor=actor,
+            )
+            previous = status
+
+    def rollups(self) -> tuple:
+        return tuple(
+            sorted(model.objects.values_list(*fields))
+            for model, fields in (
+                (StatusFlowRollup, ("day", "status", "entered", "left")),
+                (StayRollup, ("week", "metric", "bucket", "stays", "seconds")),
+                (ThroughputRollup, ("week", "role", "target", "transitions")),
+            )
+        )
+
+    def test_reports(self):
+        for index in range(4):
+            project = Project.objects.create(title=f"Project {index}")
+            self.walk(project, (0, "pending", None), (index + 1, "cs_approved", self.csm), (index + 2, "fin_review", None), (8, "admin_approved", self.adm))
+        self.walk(Project.objects.create(title="Waiting"), (1, "pending", None))
+
+        self.assertEqual(17, sla.refresh(until=timezone.now()))
+        self.assertEqual(0, sla.refresh(until=timezone.now()))
+
+        with self.assertNumQueries(5):
+            report = sla.report(weeks=6)
+
+        pending = report["time_in_status"]["pending"]
+        self.assertEqual(4, pending["count"])
+        self.assertEqual(datetime.timedelta(days=2.5), pending["mean"])
+        self.assertAlmostEqual(2, pending["p50"] / datetime.timedelta(days=1), delta=0.2)
+        self.assertAlmostEqual(4, pending["p90"] / datetime.timedelta(days=1), delta=0.4)
+        self.assertEqual(4, report["time_in_status"]["pending>admin_approved"]["count"])
+
+        depths = list(report["queue_depth"].values())
+        self.assertEqual({"pending": 1, "admin_approved": 4}, {status: count for status, count in depths[-1].items() if count})
+        week = sla.week_of(self.start.date())
+        self.assertEqual({"": 9, "CSM": 4}, report["throughput"][week])
+        self.assertEqual({"ADM": 4}, report["throughput"][week + datetime.timedelta(weeks=1)])
+
+    def test_incremental_refresh(self):
+        project = Project.objects.create(title="Project")
+        self.walk(project, (0, "pending", None), (1, "cs_approved", self.csm))
+        sla.refresh(until=timezone.now())
+
+        ProjectEvent.objects.create(project=project, timestamp=self.start + datetime.timedelta(days=3), source=2, target=4)
+        self.assertEqual(1, sla.refresh(until=timezone.now()))
+        incremental = self.rollups()
+
+        sla.rebuild()
+        self.assertEqual(incremental, self.rollups())
+
+    def test_refresh_stops_at_unsettled_event(self):
+        """The events after one not settled yet wait for it, rather than moving the watermark past it."""
+
+        project = Project.objects.create(title="Project")
+        until = timezone.now()
+        ProjectEvent.objects.create(project=project, timestamp=until + datetime.timedelta(seconds=10), target=0)
+        ProjectEvent.objects.create(project=project, timestamp=until - datetime.timedelta(seconds=10), source=0, target=1)
+
+        self.assertEqual(0, sla.refresh(until=until))
+        self.assertEqual(2, sla.refresh(until=until + datetime.timedelta(minutes=1)))
+        self.assertEqual(2, sum(StatusFlowRollup.objects.values_list("entered", flat=True)))
+
+    def test_dashboard_and_command(self):
+        self.walk(Project.objects.create(title="Project"), (0, "pending", None), (1, "cs_rejected", self.csm))
+
+        out = io.StringIO()
+        call_command("sla_report", "--rebuild", stdout=out)
+        self.assertIn("2 event(s) aggregated", out.getvalue())
+        with self.assertRaises(CommandError):
+            call_command("sla_report", "--weeks", "0", stdout=io.StringIO())
+
+        self.client.force_login(self.csm)
+        self.assertEqual(302, self.client.get(reverse("project:sla_dashboard")).status_code)
+        self.csm.is_staff = True
+        self.csm.save()
+        response = self.client.get(reverse("project:sla_dashboard"))
+        self.assertContains(response, "Time in status")
+        self.assertEqual(1, response.context["time_in_status"]["pending"]["count"])
+
+        # The dashboard only reads the rollups, the new events wait for the command
+        self.walk(Project.objects.create(title="Other"), (0, "pending", None))
+        position = RollupWatermark.objects.get(name=sla.WATERMARK).position
+        response = self.client.get(reverse("project:sla_dashboard"))
+        self.assertEqual(1, response.context["time_in_status"]["pending"]["count"])
+        self.assertEqual(position, RollupWatermark.objects.get(name=sla.WATERMARK).position)
+
+
+class RollupTestCase(TestCase):
+    """Tests the daily rollups: the incremental refresh gives the same rows as a rebuild."""
+
+    def setUp(self):
+        create_people()
+        self.project = create_project()
+        self.manager = Employee.objects.get(username="sdm1")
+        self.team = self.manager.managed_teams.first()
+        self.member = self.team.members.first()
+        self.old = timezone.now() - datetime.timedelta(days=40)
+
+    def rows(self, name: str) -> list:
+        rollup = rollups.ROLLUPS[name]
+        return sorted(rollup.model.objects.values_list(*rollup.fields()), key=str)
+
+    def all_rows(self) -> dict:
+        return {name: self.rows(name) for name in rollups.ROLLUPS}
+
+    def create_task(self, completed: bool = True) -> Task:
+        return Task.objects.create(
+            project=self.project, assignee=self.member, subject="Task", description="A task",
+            due_date=datetime.date.today(), completed=completed,
+        )
+
+    def test_refresh_matches_rebuild(self):
+        old_project = Project.objects.create(title="Old", status="pending", estimated_budget=500)
+        Project.objects.filter(id=old_project.id).update(created_at=self.old)
+        FinancialRequest.objects.create(project=self.project, requesting_department="prod", amount=100, reason="Chairs")
+        done, reopened = self.create_task(), self.create_task()
+        for name, rollup in rollups.ROLLUPS.items():
+            self.assertIsNone(rollups.refresh(rollup, until=timezone.now()))
+
+        self.assertIn((self.old.date(), "pending", 1, 500), self.rows("projects"))
+        self.assertEqual([(timezone.localdate(), self.team.id, 2)], self.rows("tasks"))
+
+        old_project = Project.objects.get(id=old_project.id)
+        old_project.transition("cs_approved")
+        FinancialRequest.objects.create(project=self.project, requesting_department="prod", amount=250, reason="Tables")
+        reopened.completed = False
+        reopened.save()
+        self.create_task(completed=False)
+
+        until = timezone.now()
+        self.assertEqual(1, rollups.refresh(rollups.ROLLUPS["projects"], until=until))
+        self.assertEqual(1, rollups.refresh(rollups.ROLLUPS["financial-requests"], until=until))
+        self.assertEqual(1, rollups.refresh(rollups.ROLLUPS["tasks"], until=until))
+        self.assertEqual(0, rollups.refresh(rollups.ROLLUPS["tasks"], until=until))
+        incremental = self.all_rows()
+
+        for rollup in rollups.ROLLUPS.values():
+            rollups.rebuild(rollup)
+        self.assertEqual(incremental, self.all_rows())
+        self.assertIn((self.old.date(), "cs_approved", 1, 500), incremental["projects"])
+        self.assertEqual([(timezone.localdate(), self.team.id, 1)], incremental["tasks"])
+        self.assertEqual(done.completed_at, Task.objects.get(id=done.id).completed_at)
+
+    def test_series(self):
+        FinancialRequest.objects.create(project=self.project, requesting_department="prod", amount=100, reason="Chairs")
+        FinancialRequest.objects.create(project=self.project, requesting_department="serv", amount=300, reason="Food")
+        self.create_task()
+        for rollup in rollups.ROLLUPS.values():
+            rollups.rebuild(rollup)
+
+        today = timezone.localdate()
+        self.assertEqual(
+            [{"period": today.replace(day=1), "client_id": self.project.client_id, "requests": 2, "amount": 400}],
+            list(rollups.budget_per_client_per_month()),
+        )
+        self.assertEqual(
+            [{"period": today - datetime.timedelta(days=today.weekday()), "team_id": self.team.id, "completed": 1}],
+            list(rollups.tasks_completed_per_team_per_week()),
+        )
+
+        out = io.StringIO()
+        call_command("refresh_rollups", stdout=out)
+        self.assertIn("Tasks rollup refreshed", out.getvalue())
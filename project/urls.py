@@ -6,13 +6,26 @@ app_name = "project"
 urlpatterns = [
     path('', views.project_list, name="project_list"),                                      # View for a list of all projects
     path('<int:project_id>', views.project_detail, name="project_detail"),                  # View for the detail of a project
+    path('<int:project_id>/timeline', views.project_timeline, name="project_timeline"),  # View for the history of the status changes of a project
+    path('time-in-status', views.time_in_status, name="time_in_status"),                   # View for the staff: percentiles of the time spent in each status, as JSON
+    path('sla', views.sla_dashboard, name="sla_dashboard"),                                # View for the staff: queue depth, time in status & throughput of the workflow
+    path('financial-totals', views.financial_totals, name="financial_totals"),                # View for the totals of the financial requests, as JSON
+    path('search', views.search, name="search"),                                            # View for the full-text search over projects, requests and customers
+    path('export/<slug:name>.<slug:format>', views.export, name="export"),                  # View for the staff to download a full extract as CSV or JSONL
     path('from-raw/<int:id>', views.create_project_from_raw, name="project_from_raw"),      # View for the CS employee to format a request into a potential project
     path('<int:project_id>/csm-action', views.csm_action, name="csm_action"),               # View for the CSM to approve/reject a project
     path('<int:project_id>/fin-action', views.fin_action, name="fin_action"),               # View for the Finance Manager to write feedback on the project
     path('<int:project_id>/adm-action', views.adm_action, name="adm_action"),  # View for the Admin to approve/reject a project
+    path('bulk/csm-action', views.csm_bulk_action, name="csm_bulk_action"),  # View for the CSM to approve/reject several projects at once
+    path('bulk/adm-action', views.adm_bulk_action, name="adm_bulk_action"),  # View for the Admin to approve/reject several projects at once
+    path('bulk/fin-request-action', views.fin_request_bulk_action, name="fin_request_bulk_action"),  # View for the Finance Manager to approve/reject several financial requests
     path('<int:project_id>/psdm-action', views.psdm_action, name="psdm_action"),  # View for the P/SDM to navigate to tasks assignment per team
     path('<int:project_id>/psdm-action/<int:team_id>/', views.psdm_team_action, name="psdm_team_action"),  # View for the P/SDM to assign tasks to a team's members
     path('<int:project_id>/tasks/<int:task_id>', views.task_detail, name="task_detail"),
+    path('<int:project_id>/meeting', views.schedule_meeting, name="schedule_meeting"),  # View to schedule the client meeting, checking the members are free
     path('<int:project_id>/fin-request', views.financial_request, name="financial_request"),
-    path('recruitment/new', views.recruitement_request, name="recruitement_request")
+    path('recruitment/new', views.recruitement_request, name="recruitement_request"),
+    path('async/', views.project_list_async, name="project_list_async"),  # Async versions of the read-heavy views, for ASGI servers
+    path('async/<int:project_id>', views.project_detail_async, name="project_detail_async"),
+    path('async/<int:project_id>/tasks/<int:task_id>', views.task_detail_async, name="task_detail_async"),
 ]
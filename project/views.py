@@ -1,17 +1,35 @@
+import asyncio
+import datetime
+
+from asgiref.sync import sync_to_async
 from django.core.handlers.asgi import HttpResponseBadRequest
-from django.http import HttpResponseRedirect, HttpResponse
+from django.http import HttpResponseRedirect, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.template.loader import get_template, render_to_string
 from django.urls import reverse
-from django.shortcuts import render, get_object_or_404
+from django.shortcuts import render, get_object_or_404, aget_object_or_404
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
+from django.db import transaction
+from django.utils import timezone
+from django.views.decorators.http import require_POST
 
-from project.models import RawRequest, Project, Task
-from project.forms import ProjectInitialForm, FinancialFeedbackForm, TaskAssignmentForm, RecruitmentRequestForm, FinancialRequestForm
+from project.models import FinancialRequest, RawRequest, Project, Task
+from project.forms import ProjectInitialForm, FinancialFeedbackForm, TaskAssignmentForm, RecruitmentRequestForm, FinancialRequestForm, MeetingForm
+from project.pagination import akeyset_page, keyset_page
+from project import audit, exports, finance, scheduling, sla, search as project_search
 
+from SEP import roles
 from SEP.models import Customer, Team
 
+# Number of projects rendered at once when streaming the project list
+STREAM_CHUNK_SIZE = 500
+# Placeholder replaced by the streamed rows in the project list page
+STREAMED_ROWS_MARKER = "<!-- streamed rows -->"
+
 
 @login_required
+@roles.role_required("create_project")
 def create_project_from_raw(request, id: int):
     """Allows a CS employee to create a new project based on a raw request."""
 
@@ -23,9 +41,14 @@ def create_project_from_raw(request, id: int):
         project = None
 
     if request.method == "POST":
+        if project is not None and project.status != "draft":
+            messages.error(request, "You cannot modify this request anymore.")
+            return HttpResponseRedirect(reverse("employee_home"))
+
         project_form = ProjectInitialForm(request.POST, instance=project)
 
         if project_form.is_valid():
+            created = project is None
             # Do not commit to avoid IntegrityError
             project = project_form.save(commit=False)
             project.created_by = request.user
@@ -33,14 +56,28 @@ def create_project_from_raw(request, id: int):
             if project.initial_request is None:
                 project.initial_request = raw_request
 
-            # Either save the project as a draft or send it to the CS manager
-            if "save_draft" in request.POST:
-                project.status = "draft"
-                messages.success(request, "Draft saved !")
-            elif "publish_project" in request.POST:
-                project.status = "pending"
-                messages.success(request, "Project sent to the CS manager !")
-            project.save()
+            # The customer is only created once the project is actually saved
+            if project.client is None:
+                project.client = Customer.from_request(raw_request)
+
+            with transaction.atomic():
+                if created:
+                    project.status = "draft"
+                    project.save()
+                    audit.record_creation(project, by=request.user)
+                elif project.update_in_status():
+                    # Still a draft, the other columns are written but the status, only changed by the workflow
+                    project.save(update_fields={*project_form.fields, "created_by", "client", "initial_request", "updated_at"})
+                else:
+                    messages.error(request, "You cannot modify this request anymore.")
+                    return HttpResponseRedirect(reverse("employee_home"))
+
+                # Either keep the project as a draft or send it to the CS manager
+                if "publish_project" in request.POST:
+                    project.transition("pending", by=request.user)
+                    messages.success(request, "Project sent to the CS manager !")
+                else:
+                    messages.success(request, "Draft saved !")
 
             return HttpResponseRedirect(reverse("employee_home"))
         else:
@@ -56,12 +93,7 @@ def create_project_from_raw(request, id: int):
     else:  # Create a new empty form that will create a new project once submitted
         project_form = ProjectInitialForm(initial={
             "estimated_budget": raw_request.available,  # Set the estimated budget to the available budget to avoid a step for the cs employee
-            "client": Customer.objects.get_or_create(  # try to find the customer, create it if it doesn't exist
-                name=raw_request.name,
-                email=raw_request.email,
-                phone=raw_request.phone,
-                address=raw_request.address,
-            )[0],
+            "client": Customer.find(raw_request.email, raw_request.phone),  # Read-only, a new customer is created on submit
         })
 
     context = {
@@ -71,10 +103,117 @@ def create_project_from_raw(request, id: int):
 
     return render(request, "raw_request.html", context=context)
 
+def filtered_project_list(request) -> tuple:
+    """The projects of the list & the context of the page, filtered by the GET parameters.
+
+        Raises a ValueError if a filter is invalid.
+    """
+
+    projects = Project.objects.select_related("client").only(
+        "title", "status", "estimated_budget", "created_at", "client__name"
+    )
+
+    status = request.GET.get("status")
+    if status:
+        if status not in dict(Project.STATUS_CHOICES):
+            raise ValueError("Invalid status.")
+        projects = projects.filter(status=status)
+
+    client = request.GET.get("client")
+    if client:
+        if not client.isdigit():
+            raise ValueError("Invalid client.")
+        projects = projects.filter(client_id=client)
+
+    context = {
+        "status_choices": Project.STATUS_CHOICES,
+        "status": status,
+        "client": client,
+    }
+
+    return projects, context
+
+
 @login_required
 def project_list(request):
-    projects = Project.objects.all().order_by("created_at")
-    return render(request, "project_list.html", context={"projects": projects})
+    """Lists the projects, one page at a time using keyset pagination.
+
+        The `status` & `client` GET parameters filter the list. With `stream=1` the whole
+        list is rendered incrementally instead of being paginated.
+    """
+
+    try:
+        projects, context = filtered_project_list(request)
+    except ValueError as e:
+        return HttpResponseBadRequest(str(e))
+
+    if request.GET.get("stream") == "1":
+        return StreamingHttpResponse(stream_project_list(request, projects, context))
+
+    try:
+        context["projects"], context["next_cursor"] = keyset_page(projects, request.GET.get("cursor"))
+    except ValueError:
+        return HttpResponseBadRequest("Invalid cursor.")
+
+    return render(request, "project_list.html", context=context)
+
+
+@login_required
+async def project_list_async(request):
+    """Async version of `project_list`."""
+
+    try:
+        projects, context = filtered_project_list(request)
+    except ValueError as e:
+        return HttpResponseBadRequest(str(e))
+
+    if request.GET.get("stream") == "1":
+        return StreamingHttpResponse(astream_project_list(request, projects, context))
+
+    try:
+        context["projects"], context["next_cursor"] = await akeyset_page(projects, request.GET.get("cursor"))
+    except ValueError:
+        return HttpResponseBadRequest("Invalid cursor.")
+
+    return await sync_to_async(render)(request, "project_list.html", context=context)
+
+
+def stream_project_list(request, projects, context: dict):
+    """Renders the project list page, yielding the rows chunk by chunk."""
+
+    page = render_to_string("project_list.html", context={**context, "rows_marker": STREAMED_ROWS_MARKER}, request=request)
+    head, tail = page.split(STREAMED_ROWS_MARKER)
+
+    yield head
+    rows_template = get_template("project_list_rows.html")
+    chunk = []
+    for project in projects.order_by("created_at", "id").iterator(chunk_size=STREAM_CHUNK_SIZE):
+        chunk.append(project)
+        if len(chunk) == STREAM_CHUNK_SIZE:
+            yield rows_template.render({"projects": chunk})
+            chunk = []
+    if chunk:
+        yield rows_template.render({"projects": chunk})
+    yield tail
+
+
+async def astream_project_list(request, projects, context: dict):
+    """Async version of `stream_project_list`."""
+
+    page = await sync_to_async(render_to_string)("project_list.html", context={**context, "rows_marker": STREAMED_ROWS_MARKER}, request=request)
+    head, tail = page.split(STREAMED_ROWS_MARKER)
+
+    yield head
+    rows_template = get_template("project_list_rows.html")
+    chunk = []
+    async for project in projects.order_by("created_at", "id").aiterator(chunk_size=STREAM_CHUNK_SIZE):
+        chunk.append(project)
+        if len(chunk) == STREAM_CHUNK_SIZE:
+            yield rows_template.render({"projects": chunk})
+            chunk = []
+    if chunk:
+        yield rows_template.render({"projects": chunk})
+    yield tail
 
 @login_required
 def project_detail(request, project_id: int):
@@ -84,14 +223,153 @@ def project_detail(request, project_id: int):
     """
 
     project = get_object_or_404(Project, id=project_id)
-    return render(request, "project_detail.html", context={"project": project})
+    return render(request, "project_detail.html", context={"project": project, "totals": finance.project_totals(project)})
 
 
 @login_required
+async def project_detail_async(request, project_id: int):
+    """Async version of `project_detail`."""
+
+    project = await aget_object_or_404(Project.objects.select_related("client", "meeting"), id=project_id)
+    totals = await sync_to_async(finance.project_totals)(project)
+    return await sync_to_async(render)(request, "project_detail.html", context={"project": project, "totals": totals})
+
+
+@login_required
+def financial_totals(request):
+    """Totals of the financial requests by department and the projects whose budget is overrun, as JSON.
+
+        With a `project` GET parameter, the totals of this project only.
+    """
+
+    project_id = request.GET.get("project")
+    if project_id:
+        if not project_id.isdigit():
+            return HttpResponseBadRequest("Invalid project.")
+        project = get_object_or_404(Project.objects.only("estimated_budget"), id=project_id)
+        totals = finance.project_totals(project)
+        return JsonResponse({
+            "project": project.id,
+            **totals._asdict(),
+            "remaining": totals.remaining,
+            "overrun": totals.overrun,
+            "over_budget": totals.over_budget,
+        })
+
+    return JsonResponse({
+        "departments": list(finance.department_totals()),
+        "over_budget": [
+            {
+                "project": row["project"],
+                "title": row["project__title"],
+                "budget": row["project__estimated_budget"],
+                **{status: row[status] for status in finance.STATUSES},
+                "overrun": row["overrun"],
+            }
+            for row in finance.over_budget_projects()
+        ],
+    })
+
+
+@login_required
+def project_timeline(request, project_id: int):
+    """History of the status changes of a project, with the time spent in each status."""
+
+    project = get_object_or_404(Project.objects.only("title", "status"), id=project_id)
+    return render(request, "project_timeline.html", context={"project": project, "events": audit.timeline(project.id)})
+
+
+@staff_member_required
+def time_in_status(request):
+    """Percentiles of the time spent by the projects in each status, in seconds, as JSON.
+
+        With `ongoing=1`, the stays in the current status of the projects count until now.
+    """
+
+    statistics = audit.time_in_status(ongoing=request.GET.get("ongoing") == "1")
+    return JsonResponse({
+        status: {name: value if name == "count" else value.total_seconds() for name, value in values.items()}
+        for status, values in statistics.items()
+    })
+
+
+@staff_member_required
+def sla_dashboard(request):
+    """Queue depth, time in each status & throughput by role of the project workflow over the last weeks.
+
+        Only reads the rollups, which the `sla_report` command refreshes periodically.
+    """
+
+    weeks = request.GET.get("weeks", "12")
+    if not weeks.isdigit() or not 1 <= int(weeks) <= 520:
+        return HttpResponseBadRequest("Invalid number of weeks.")
+
+    report = sla.report(int(weeks))
+    role_codes = sorted({role for counts in report["throughput"].values() for role in counts})
+
+    context = {
+        **report,
+        "refreshed_at": sla.refreshed_at(),
+        "weeks": weeks,
+        "roles": role_codes,
+        "depth_rows": [(day, list(depth.values())) for day, depth in report["queue_depth"].items()],
+        "throughput_rows": [(week, [counts.get(role, 0) for role in role_codes]) for week, counts in report["throughput"].items()],
+    }
+    return render(request, "sla_dashboard.html", context=context)
+
+
+@login_required
+def search(request):
+    """Full-text search over the projects, raw requests and customers, ranked & paginated.
+
+        The `kind` GET parameter restricts the results to one kind of document.
+    """
+
+    query = request.GET.get("q", "")
+
+    kind = request.GET.get("kind")
+    if kind and kind not in project_search.SOURCES:
+        return HttpResponseBadRequest("Invalid kind.")
+
+    page = request.GET.get("page", "1")
+    if not page.isdigit() or int(page) < 1:
+        return HttpResponseBadRequest("Invalid page.")
+    page = int(page)
+
+    hits = project_search.search(query, kinds=[kind] if kind else None, page=page)
+
+    context = {
+        "query": query,
+        "kind": kind,
+        "kinds": project_search.SOURCES,
+        "hits": hits,
+        "page": page,
+        "has_next": len(hits) == project_search.PAGE_SIZE,
+    }
+
+    return render(request, "search.html", context=context)
+
+
+@staff_member_required
+def export(request, name: str, format: str):
+    """Streams a full extract of the projects, tasks or financial requests as CSV or JSON lines."""
+
+    if name not in exports.EXPORTS or format not in exports.FORMATS:
+        return HttpResponseBadRequest("Unknown export.")
+
+    content_type, _ = exports.FORMATS[format]
+    response = StreamingHttpResponse(exports.chunks(name, format), content_type=content_type)
+    response["Content-Disposition"] = f'attachment; filename="{name}.{format}"'
+    return response
+
+
+@login_required
+@roles.role_required("review_project")
 def csm_action(request, project_id: int):
     """Allows the CSM to approve or reject a project"""
 
-    project = get_object_or_404(Project, id=project_id)
+    # Only the status is needed to apply the transition
+    project = get_object_or_404(Project.objects.only("status"), id=project_id)
     action = request.GET.get("approve", None)
 
     if action is None:
@@ -101,19 +379,22 @@ def csm_action(request, project_id: int):
 
     if action == "1":
         # Approve the project, push it to the next step.
-        project.status = "cs_approved"
-        project.save()
-        messages.success(request, "Project approved !")
+        if project.transition("cs_approved", by=request.user):
+            messages.success(request, "Project approved !")
+        else:
+            messages.error(request, "This project is not waiting for approval anymore.")
     else:
         # Reject the project
-        project.status = "cs_rejected"
-        project.save()
-        messages.success(request, "Project rejected !")
+        if project.transition("cs_rejected", by=request.user):
+            messages.success(request, "Project rejected !")
+        else:
+            messages.error(request, "This project is not waiting for approval anymore.")
 
     return HttpResponseRedirect(reverse("employee_home"))
 
 
 @login_required
+@roles.role_required("financial_feedback")
 def fin_action(request, project_id: int):
     """Allows the finance manager to write feedback on the project before sending it to the administration manager"""
 
@@ -122,19 +403,24 @@ def fin_action(request, project_id: int):
     if request.method == "POST":
         form = FinancialFeedbackForm(request.POST)
         if form.is_valid():
-            project.financial_feedback = form.cleaned_data.get("feedback", None)
+            feedback = form.cleaned_data.get("feedback", None)
 
             if "save_draft" in request.POST:
-                # Just save the project as a draft
-                messages.success(request, "The feedback draft has been saved.")
-                project.financial_feedback_draft_status = True  # This is for visual porposes only
+                # Just save the project as a draft, the feedback can only be written before the review
+                saved = project.can_transition("fin_review") and project.update_in_status(
+                    financial_feedback=feedback,
+                    financial_feedback_draft_status=True,  # This is for visual porposes only
+                )
+                success_message = "The feedback draft has been saved."
             else:
                 # Save the feedback and forward the project to the administration manager
-                messages.success(request, "The feedback has been saved and sent to the administration departmenent.")
-                project.financial_feedback_draft_status = False
-                project.status = "fin_review"
+                saved = project.transition("fin_review", by=request.user, financial_feedback=feedback, financial_feedback_draft_status=False)
+                success_message = "The feedback has been saved and sent to the administration departmenent."
 
-            project.save()
+            if saved:
+                messages.success(request, success_message)
+            else:
+                messages.error(request, "This project is not waiting for financial feedback anymore.")
             return HttpResponseRedirect(reverse("employee_home"))
         else:
             messages.error(request, "Please correct the error(s) below")
@@ -146,10 +432,12 @@ def fin_action(request, project_id: int):
 
 
 @login_required
+@roles.role_required("approve_project")
 def adm_action(request, project_id: int):
     """Allows the ADM to approve or reject a project"""
 
-    project = get_object_or_404(Project, id=project_id)
+    # Only the status is needed to apply the transition
+    project = get_object_or_404(Project.objects.only("status"), id=project_id)
     action = request.GET.get("approve", None)
 
     if action is None:
@@ -159,31 +447,94 @@ def adm_action(request, project_id: int):
 
     if action == "1":
         # Approve the project, push it to the next step.
-        project.status = "admin_approved"
-        project.save()
-        messages.success(request, "Project approved !")
+        if project.transition("admin_approved", by=request.user):
+            messages.success(request, "Project approved !")
+        else:
+            messages.error(request, "This project is not waiting for approval anymore.")
     else:
         # Reject the project
-        project.status = "admin_rejected"
-        project.save()
-        messages.success(request, "Project rejected !")
+        if project.transition("admin_rejected", by=request.user):
+            messages.success(request, "Project rejected !")
+        else:
+            messages.error(request, "This project is not waiting for approval anymore.")
+
+    return HttpResponseRedirect(reverse("employee_home"))
+
+
+def bulk_transition_response(request, model, approve_target: str, reject_target: str, label: str):
+    """Approves (`approve=1`) or rejects (`approve=0`) the rows posted in `ids`, reporting the outcome of each id.
+
+        Answers in JSON to clients that do not accept HTML, otherwise redirects to the
+        employee's home page with a summary message.
+    """
+
+    action = request.POST.get("approve")
+    ids = request.POST.getlist("ids")
+
+    if action not in ("0", "1"):
+        return HttpResponseBadRequest("Invalid action.")
+    if not all(pk.isdigit() for pk in ids):
+        return HttpResponseBadRequest("Invalid ids.")
+
+    target = approve_target if action == "1" else reject_target
+    results = model.bulk_transition([int(pk) for pk in ids], target, by=request.user) if ids else {}
+
+    if not request.accepts("text/html"):
+        return JsonResponse({"target": target, "results": results})
+
+    done = sum(result == "done" for result in results.values())
+    if not ids:
+        messages.error(request, "Nothing selected.")
+    if done:
+        messages.success(request, f"{done} {label}(s) {'approved' if action == '1' else 'rejected'} !")
+    if done < len(ids):
+        messages.error(request, f"{len(ids) - done} {label}(s) could not be processed.")
 
     return HttpResponseRedirect(reverse("employee_home"))
 
 
 @login_required
+@require_POST
+@roles.role_required("review_project")
+def csm_bulk_action(request):
+    """Allows the CSM to approve or reject several projects at once"""
+
+    return bulk_transition_response(request, Project, "cs_approved", "cs_rejected", "project")
+
+
+@login_required
+@require_POST
+@roles.role_required("approve_project")
+def adm_bulk_action(request):
+    """Allows the ADM to approve or reject several projects at once"""
+
+    return bulk_transition_response(request, Project, "admin_approved", "admin_rejected", "project")
+
+
+@login_required
+@require_POST
+@roles.role_required("review_financial_request")
+def fin_request_bulk_action(request):
+    """Allows the finance manager to approve or reject several financial requests at once"""
+
+    return bulk_transition_response(request, FinancialRequest, "approved", "rejected", "financial request")
+
+
+@login_required
+@roles.role_required("assign_tasks")
 def psdm_action(request, project_id):
     project = get_object_or_404(Project, id=project_id)
 
     context = {}
     context["project"] = project
     context["teams"] = Team.objects.filter(manager=request.user)
-    context["dept"] = "Services" if request.user.role.id == "SDM" else "Production"
+    context["dept"] = "Services" if request.user.role_id == "SDM" else "Production"
 
     return render(request, "psdm_project_view.html", context=context)
 
 
 @login_required
+@roles.role_required("assign_tasks")
 def psdm_team_action(request, project_id, team_id):
     project = get_object_or_404(Project, id=project_id)
     team = get_object_or_404(Team, id=team_id)
@@ -226,6 +577,73 @@ def task_detail(request, project_id: int, task_id: int):
 
 
 @login_required
+async def task_detail_async(request, project_id: int, task_id: int):
+    """Async version of `task_detail`, fetching the project & the task concurrently."""
+
+    project, task = await asyncio.gather(
+        aget_object_or_404(Project.objects.only("id"), id=project_id),
+        aget_object_or_404(Task.objects.select_related("sender"), id=task_id),
+    )
+
+    if task.project_id != project.id:
+        return HttpResponseBadRequest("Invalid tak & project id combination")
+
+    return await sync_to_async(render)(request, "task_detail.html", context={"task": task})
+
+
+@login_required
+@roles.role_required("schedule_meeting")
+def schedule_meeting(request, project_id: int):
+    """Schedules (or moves) the meeting of a project with the client.
+
+        The "find a slot" button fills the form with the next slot where all the members chosen are free.
+    """
+
+    project = get_object_or_404(Project.objects.select_related("meeting"), id=project_id)
+
+    if request.method == "POST" and "find_slot" in request.POST:
+        form = MeetingForm(request.POST, instance=project.meeting)
+        members, duration = form["members"].value(), form["duration"].value()
+        try:
+            slot = scheduling.next_free_slot(members, datetime.timedelta(minutes=int(duration or 60)))
+        except (ValueError, TypeError):
+            slot = None
+        if slot is None:
+            messages.error(request, "No free slot found in the next 30 days.")
+        else:
+            slot = timezone.localtime(slot)
+            data = request.POST.copy()
+            data["date"], data["time"] = slot.date().isoformat(), slot.time().strftime("%H:%M")
+            form = MeetingForm(data, instance=project.meeting)
+            messages.success(request, "Next free slot found, submit to schedule it.")
+
+    elif request.method == "POST":
+        form = MeetingForm(request.POST, instance=project.meeting)
+        if form.is_valid():
+            data = form.cleaned_data
+            try:
+                meeting = scheduling.schedule(
+                    [member.pk for member in data["members"]], data["date"], data["time"], data["duration"], meeting=project.meeting,
+                )
+            except scheduling.SchedulingConflict:
+                # Scheduled concurrently since the form was validated
+                form.add_error(None, "A member has just been booked at this time, please choose another slot.")
+            else:
+                if project.meeting_id != meeting.id:
+                    project.meeting = meeting
+                    project.save(update_fields=["meeting"])
+                messages.success(request, "Meeting scheduled successfully.")
+                return HttpResponseRedirect(reverse("project:project_detail", args=[project_id]))
+        messages.error(request, "Please correct the error(s) below.")
+
+    else:
+        form = MeetingForm(instance=project.meeting)
+
+    return render(request, "meeting_schedule.html", context={"project": project, "form": form})
+
+
+@login_required
+@roles.role_required("request_recruitment")
 def recruitement_request(request):
     if request.method == "POST":
         form = RecruitmentRequestForm(request.POST)
@@ -243,6 +661,7 @@ def recruitement_request(request):
 
 
 @login_required
+@roles.role_required("request_budget")
 def financial_request(request, project_id: int):
     project = get_object_or_404(Project, id=project_id)
 
@@ -0,0 +1,190 @@
+"""Workload index of the employees: their open tasks weighted by priority & by how soon they are due.
+
+Like the task counters of the projects, the stored workload is updated with
+`F()` expressions whenever a task is saved or deleted. It only weighs the
+tasks by priority: a task gets closer to its due date without being saved,
+so the extra weight of the tasks due soon is added when the members of a
+team are ranked, by a subquery over their open tasks due within the last
+`DUE_MULTIPLIERS` period (a range of the open tasks index).
+"""
+
+import datetime
+from collections import Counter, defaultdict
+
+from django.db import IntegrityError, transaction
+from django.db.models import Case, Count, F, IntegerField, OuterRef, QuerySet, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+from django.db.models.signals import post_delete, post_save
+from django.utils import timezone
+
+from project import counters
+from project.models import EmployeeWorkload, Task
+from SEP.seeding import batched
+
+FIELDS = ("open_tasks", "load")
+
+# Weight of an open task by priority: LOW, MEDIUM, HIGH, CRITICAL
+PRIORITY_WEIGHTS = (1, 2, 4, 8)
+# Multipliers of the weight of a task due within (or past) a number of days, the later ones count once
+DUE_MULTIPLIERS = ((2, 3), (7, 2))
+
+
+def weight(priority: int) -> int:
+    """Weight of an open task in the stored workload of its assignee."""
+
+    return PRIORITY_WEIGHTS[min(max(priority, 0), len(PRIORITY_WEIGHTS) - 1)]
+
+
+def weight_expression() -> Case:
+    """`weight` of the tasks as an SQL expression, to compute the workloads in bulk."""
+
+    return Case(
+        *(When(priority=priority, then=Value(value)) for priority, value in enumerate(PRIORITY_WEIGHTS)),
+        default=Value(PRIORITY_WEIGHTS[-1]),
+    )
+
+
+def score_expression(today: datetime.date) -> Case:
+    """Weight of the tasks multiplied by how soon they are due as of `today`, as an SQL expression."""
+
+    multiplier = Case(
+        *(When(due_date__lte=today + datetime.timedelta(days=days), then=Value(multiplier)) for days, multiplier in DUE_MULTIPLIERS),
+        default=Value(1),
+    )
+    return weight_expression() * multiplier
+
+
+def urgency(today: datetime.date | None = None) -> Coalesce:
+    """Weight added to the stored workload of each employee by their open tasks due soon, to annotate employees."""
+
+    today = today or timezone.localdate()
+    due_soon = (
+        Task.objects.filter(
+            assignee=OuterRef("pk"), completed=False, due_date__lte=today + datetime.timedelta(days=max(days for days, _ in DUE_MULTIPLIERS)),
+        )
+        .order_by().values("assignee")
+        .annotate(extra=Sum(score_expression(today) - weight_expression(), output_field=IntegerField()))
+        .values("extra")
+    )
+    return Coalesce(Subquery(due_soon, output_field=IntegerField()), 0)
+
+
+def contribution(values: dict) -> tuple[int | None, Counter]:
+    """Assignee of a task & what it adds to their stored workload, from its tracked fields."""
+
+    if values["completed"]:
+        return values["assignee_id"], Counter()
+    return values["assignee_id"], Counter(open_tasks=1, load=weight(int(values["priority"] or 0)))
+
+
+def aggregates() -> dict:
+    """Aggregates over the open tasks, named `<field>_total` not to clash with the fields of the tasks."""
+
+    return {
+        "open_tasks_total": Count("id"),
+        "load_total": Coalesce(Sum(weight_expression(), output_field=IntegerField()), 0),
+    }
+
+
+def recompute(employee_id: int):
+    """Computes the workload of an employee from scratch, creating it if missing."""
+
+    totals = Task.objects.filter(assignee_id=employee_id, completed=False).aggregate(**aggregates())
+    values = {field: totals[f"{field}_total"] for field in FIELDS}
+    if EmployeeWorkload.objects.filter(employee_id=employee_id).update(**values):
+        return
+    try:
+        with transaction.atomic():
+            EmployeeWorkload.objects.create(employee_id=employee_id, **values)
+    except IntegrityError:  # Created concurrently
+        EmployeeWorkload.objects.filter(employee_id=employee_id).update(**values)
+
+
+def apply(changes: dict[int, Counter], create: bool = True):
+    """Adds the changes to the workload of each employee, see `counters.apply`."""
+
+    for employee_id, change in changes.items():
+        expressions = {field: F(field) + change[field] for field in FIELDS if change[field]}
+        if not expressions or employee_id is None:
+            continue
+        if not EmployeeWorkload.objects.filter(employee_id=employee_id).update(**expressions) and create:
+            recompute(employee_id)
+
+
+def task_saved(sender, instance: Task, created: bool, **kwargs):
+    loaded = getattr(instance, "_loaded", None)
+    if not created and (loaded is None or None in loaded.values()):
+        # Updated without having been loaded (or with deferred fields), the previous state is unknown
+        recompute(instance.assignee_id)
+        return
+
+    changes = defaultdict(Counter)
+    employee_id, added = contribution(instance.tracked_state())
+    changes[employee_id].update(added)
+    if loaded is not None:
+        employee_id, removed = contribution(loaded)
+        changes[employee_id].subtract(removed)
+    apply(changes)
+
+
+def task_deleted(sender, instance: Task, **kwargs):
+    employee_id, removed = contribution(getattr(instance, "_loaded", None) or instance.tracked_state())
+
+    changes = defaultdict(Counter)
+    changes[employee_id].subtract(removed)
+    apply(changes, create=False)
+
+
+post_save.connect(task_saved, sender=Task)
+post_delete.connect(task_deleted, sender=Task)
+
+
+def actual_workloads(task_model=Task):
+    """The workloads as they should be, by employee, ordered by employee."""
+
+    return (
+        task_model.objects.filter(completed=False)
+        .values("assignee_id")
+        .annotate(**aggregates())
+        .order_by("assignee_id")
+        .values_list("assignee_id", *(f"{field}_total" for field in FIELDS))
+    )
+
+
+def rebuild(workload_model=EmployeeWorkload, task_model=Task, batch_size: int = 5000) -> int:
+    """Replaces all the workloads by computing them in bulk, returns the number of employees.
+
+        The models can be given for the migrations.
+    """
+
+    total = 0
+    with transaction.atomic():
+        workload_model.objects.all().delete()
+        for batch in batched(actual_workloads(task_model).iterator(chunk_size=batch_size), batch_size):
+            workload_model.objects.bulk_create(
+                [workload_model(employee_id=employee_id, **dict(zip(FIELDS, values))) for employee_id, *values in batch]
+            )
+            total += len(batch)
+    return total
+
+
+def drift():
+    """Yields the employees whose workload differs from their tasks: id, stored workload & actual one."""
+
+    stored = EmployeeWorkload.objects.order_by("employee_id").values_list("employee_id", *FIELDS)
+    return counters.compare(stored.iterator(chunk_size=5000), actual_workloads().iterator(chunk_size=5000), FIELDS)
+
+
+def ranked_members(team, today: datetime.date | None = None) -> QuerySet:
+    """Members of a team annotated with their workload as of `today`, the least loaded first."""
+
+    return team.members.select_related("role").annotate(
+        load=Coalesce("workload__load", 0) + urgency(today),
+        open_tasks=Coalesce("workload__open_tasks", 0),
+    ).order_by("load", "id")
+
+
+def least_loaded(team):
+    """The member of a team with the lowest workload, in one query, None for an empty team."""
+
+    return ranked_members(team).first()